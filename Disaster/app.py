@@ -1,16 +1,33 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
 from supabase import create_client, Client
-import overpy
+from postgrest.exceptions import APIError
 import os
 import time
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from urllib.parse import quote
+import heapq
+import queue
+import threading
+import json
+from itertools import islice
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import Config
+from weather_cache import WeatherCache, normalize_location
+from weather_scheduler import PeriodicTask
+from weather_providers import provider_from_config, provider_spec_from_config
+from weather_monitor import scan_sharded
+from shelter_index import ShelterIndex
+from overpass_tiles import OverpassTileCache
+from osm_shelters import OfflineShelters, OsmShelterStore
+from geocoding import GeocodingService
+from weather_rules import classify
+from weather_scanner import scan_locations
+from monitored_locations import load_monitored_locations, plan_incremental_scan
+from weather_retention import run_weather_maintenance
+from batch_loaders import load_latest_updates
+from fanout import fan_out
+from emergency_directory import EmergencyHeadDirectory
+import metrics
+from metrics import InstrumentedClient
+from keyset import DATA_VIEW_TABLES, InvalidCursor, RowCounts, csv_lines, fetch_page, iter_rows, ndjson_lines
 
 app = Flask(__name__)
 app.secret_key = Config.SECRET_KEY
@@ -19,11 +36,20 @@ app.secret_key = Config.SECRET_KEY
 signup_attempts = {}
 
 # Supabase client setup
-if not Config.is_supabase_configured():
+if Config.SUPABASE_BACKEND != "fake" and not Config.is_supabase_configured():
     print("Warning: SUPABASE_URL or SUPABASE_KEY is not set. Set them in environment or .env file.")
     print("Database features will be disabled.")
 
-supabase: Client = create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY) if Config.is_supabase_configured() else None
+# Wrapped so every table/RPC query is timed and counted per route (see /metrics)
+if Config.SUPABASE_BACKEND == "fake":
+    print("🧪 Using the in-process fake Supabase backend (SUPABASE_BACKEND=fake)")
+    import fake_supabase
+    supabase: Client = InstrumentedClient(fake_supabase.client_from_config(Config))
+else:
+    supabase: Client = InstrumentedClient(create_client(Config.SUPABASE_URL, Config.SUPABASE_KEY)) if Config.is_supabase_configured() else None
+
+metrics.configure(enabled=Config.METRICS_ENABLED, slow_seconds=Config.SLOW_QUERY_MS / 1000.0)
+metrics.init_app(app)
 
 # Helpers
 def sb_available() -> bool:
@@ -44,193 +70,157 @@ def require_role(required_role):
     return decorator
 
 def fetch_weather_data(location):
-    """Resilient weather data fetching via wttr.in using city name directly."""
-    try:
-        # Build a resilient session with retries once
-        global _weather_session
-        if '_weather_session' not in globals():
-            retry = Retry(
-                total=3,
-                backoff_factor=0.5,
-                status_forcelist=[429, 500, 502, 503, 504],
-                allowed_methods=frozenset(["GET"]) 
-            )
-            _weather_session = requests.Session()
-            adapter = HTTPAdapter(max_retries=retry, pool_connections=20, pool_maxsize=20)
-            _weather_session.mount("http://", adapter)
-            _weather_session.mount("https://", adapter)
-            _weather_session.headers.update({
-                "User-Agent": "DisasterManagement/1.0 (+wttr fetch)",
-                "Accept": "application/json"
-            })
-
-        # Query wttr.in directly by location name (avoids geocoding failures/rate limits)
-        q = quote(location)
-        weather_url = f"https://wttr.in/{q}?format=j1"
-
-        response = _weather_session.get(weather_url, timeout=(3, 8))
-        response.raise_for_status()
-        weather_data = response.json()
-
-        if not weather_data:
-            return None
-
-        # Extract weather information from wttr.in response
-        current_condition = (weather_data.get('current_condition') or [{}])[0]
-        temp_c = current_condition.get('temp_C')
-        humidity = current_condition.get('humidity')
-        wind_speed = current_condition.get('windspeedKmph')
-        weather_desc = (current_condition.get('weatherDesc') or [{}])[0].get('value', 'Unknown')
-
-        # Optional coordinates from nearest_area, if present
-        nearest = (weather_data.get('nearest_area') or [{}])
-        nearest0 = nearest[0] if nearest else {}
-        lat_str = (nearest0.get('latitude') or [None])
-        lon_str = (nearest0.get('longitude') or [None])
-        try:
-            lat = float(lat_str if isinstance(lat_str, str) else (lat_str[0] if lat_str else None)) if lat_str else None
-            lon = float(lon_str if isinstance(lon_str, str) else (lon_str[0] if lon_str else None)) if lon_str else None
-        except Exception:
-            lat = None
-            lon = None
-
-        # Convert to numeric values
-        temp = float(temp_c) if temp_c not in (None, "") else None
-        humidity = int(humidity) if humidity not in (None, "") else None
-        wind_speed = float(wind_speed) if wind_speed not in (None, "") else None
-
-        # Determine if weather is extreme
-        is_extreme = False
-        weather_alert = None
-
-        if temp is not None:
-            if temp > 40 or temp < -10:
-                is_extreme = True
-                weather_alert = f"Extreme temperature: {temp}°C"
-            elif temp > 35 or temp < -5:
-                weather_alert = f"High temperature: {temp}°C"
-
-        if wind_speed and wind_speed > 20:
-            is_extreme = True
-            weather_alert = f"High wind speed: {wind_speed} km/h"
-
-        severe_conditions = ['thunder', 'storm', 'tornado', 'hurricane', 'cyclone']
-        if isinstance(weather_desc, str) and any(condition in weather_desc.lower() for condition in severe_conditions):
-            is_extreme = True
-            weather_alert = f"Severe weather: {weather_desc}"
-
-        return {
-            'location': location,
-            'temperature': temp,
-            'humidity': humidity,
-            'wind_speed': wind_speed,
-            'weather_condition': weather_desc,
-            'weather_description': weather_desc,
-            'is_extreme': is_extreme,
-            'weather_alert': weather_alert,
-            'coordinates': {'lat': lat, 'lon': lon}
-        }
+    """Weather data for a location, served from the shared TTL cache when possible."""
+    weather_data = weather_cache.get(location)
+    if not weather_data:
+        return None
+    # Copy so callers can't mutate the cached reading, and keep the caller's spelling
+    return dict(weather_data, location=location)
 
+def _fetch_weather_uncached(location):
+    """Resilient weather data fetching through the configured provider (wttr.in by default)."""
+    try:
+        return weather_provider.fetch(location)
     except Exception as e:
         print(f"Error fetching weather data: {e}")
         return None
 
-def fetch_multiple_locations_weather():
-    """Ultra-fast weather data fetching for major Indian cities using optimized parallel processing"""
-    # Expanded list of major Indian cities covering all regions
-    locations = [
-        # Northern India
-        "Delhi, India",
-        "Jaipur, Rajasthan, India",
-        "Lucknow, Uttar Pradesh, India",
-        "Chandigarh, India",
-        "Dehradun, Uttarakhand, India",
-        "Amritsar, Punjab, India",
-        "Jammu, Jammu and Kashmir, India",
-        "Srinagar, Jammu and Kashmir, India",
-        "Shimla, Himachal Pradesh, India",
-        
-        # Western India
-        "Mumbai, Maharashtra, India",
-        "Pune, Maharashtra, India",
-        "Nagpur, Maharashtra, India",
-        "Ahmedabad, Gujarat, India",
-        "Surat, Gujarat, India",
-        "Vadodara, Gujarat, India",
-        "Bhopal, Madhya Pradesh, India",
-        "Indore, Madhya Pradesh, India",
-        "Jodhpur, Rajasthan, India",
-        "Udaipur, Rajasthan, India",
-        "Goa, India",
-        
-        # Southern India
-        "Bangalore, Karnataka, India",
-        "Mysore, Karnataka, India",
-        "Hyderabad, Telangana, India",
-        "Chennai, Tamil Nadu, India",
-        "Coimbatore, Tamil Nadu, India",
-        "Madurai, Tamil Nadu, India",
-        "Kochi, Kerala, India",
-        "Thiruvananthapuram, Kerala, India",
-        "Visakhapatnam, Andhra Pradesh, India",
-        "Vijayawada, Andhra Pradesh, India",
-        "Pondicherry, India",
-        
-        # Eastern India
-        "Kolkata, West Bengal, India",
-        "Howrah, West Bengal, India",
-        "Patna, Bihar, India",
-        "Ranchi, Jharkhand, India",
-        "Bhubaneswar, Odisha, India",
-        "Cuttack, Odisha, India",
-        "Guwahati, Assam, India",
-        "Shillong, Meghalaya, India",
-        "Imphal, Manipur, India",
-        "Agartala, Tripura, India",
-        "Kohima, Nagaland, India",
-        
-        # Central India
-        "Raipur, Chhattisgarh, India",
-        "Bilaspur, Chhattisgarh, India",
-        "Jabalpur, Madhya Pradesh, India",
-        "Gwalior, Madhya Pradesh, India"
-    ]
-    
-    print(f"🚀 Starting ultra-fast parallel weather fetch for {len(locations)} major Indian cities...")
+weather_provider = provider_from_config(Config)
+
+weather_cache = WeatherCache(
+    _fetch_weather_uncached,
+    ttl=Config.WEATHER_CACHE_TTL,
+    stale_ttl=Config.WEATHER_CACHE_STALE_TTL,
+    max_entries=Config.WEATHER_CACHE_MAX_ENTRIES,
+)
+
+def scan_weather(locations, on_reading=None):
+    """Fetch weather for many locations with the async bulk scanner; returns all successful readings.
+
+    Readings are classified by the alert rules in one pass over the whole scan. With
+    ``on_reading(weather_data)``, they are instead classified and handed over every
+    WEATHER_SCAN_CLASSIFY_INTERVAL seconds while the scan runs.
+    """
+    print(f"🚀 Starting async weather scan for {len(locations)} Indian cities...")
     start_time = time.time()
     
-    # Use ThreadPoolExecutor for parallel processing
-    extreme_weather_locations = []
-    successful_fetches = 0
+    readings = []
+    pending = []
+    extreme_count = 0
+    last_flush = float('-inf')  # hand the first readings over straight away
     
-    with ThreadPoolExecutor(max_workers=10) as executor:  # Increased workers for more cities
-        # Submit all weather fetch tasks
-        future_to_location = {executor.submit(fetch_weather_data, location): location for location in locations}
-        
-        # Process completed tasks
-        for future in as_completed(future_to_location):
-            location = future_to_location[future]
-            try:
-                weather_data = future.result()
-                if weather_data:
-                    successful_fetches += 1
-                    if weather_data['is_extreme']:
-                        extreme_weather_locations.append(weather_data)
-                        print(f"⚠ Extreme weather in {location}: {weather_data['weather_alert']}")
-                    else:
-                        print(f"✅ Normal weather in {location}")
-                else:
-                    print(f"❌ Failed to fetch weather for {location}")
-            except Exception as e:
-                print(f"Error fetching weather for {location}: {e}")
+    def flush():
+        nonlocal extreme_count, last_flush
+        classify(pending)
+        for weather_data in pending:
+            weather_cache.set(weather_data['location'], weather_data)
+            if on_reading is not None:
+                on_reading(weather_data)
+            if weather_data['is_extreme']:
+                extreme_count += 1
+                print(f"⚠ Extreme weather in {weather_data['location']}: {weather_data['weather_alert']}")
+            else:
+                print(f"✅ Normal weather in {weather_data['location']}")
+        pending.clear()
+        last_flush = time.monotonic()
+    
+    def handle_result(location, weather_data):
+        if weather_data:
+            readings.append(weather_data)
+            pending.append(weather_data)
+            if on_reading is not None and time.monotonic() - last_flush >= Config.WEATHER_SCAN_CLASSIFY_INTERVAL:
+                flush()
+        else:
+            print(f"❌ Failed to fetch weather for {location}")
+    
+    options = dict(
+        retries=Config.WEATHER_FETCH_RETRIES,
+        backoff=Config.WEATHER_FETCH_BACKOFF,
+        concurrency=Config.WEATHER_SCAN_CONCURRENCY,
+        rate_per_host=Config.WEATHER_SCAN_RATE_PER_HOST,
+        request_timeout=Config.WEATHER_SCAN_REQUEST_TIMEOUT,
+        deadline=Config.WEATHER_SCAN_DEADLINE,
+    )
+    try:
+        if Config.WEATHER_SCAN_SHARDS > 1 and len(locations) >= Config.WEATHER_SCAN_SHARD_MIN_LOCATIONS:
+            # Large location sets: one async scanner per worker process, merged into one stream
+            scan_sharded(
+                locations,
+                shards=Config.WEATHER_SCAN_SHARDS,
+                shard_rate_share=Config.WEATHER_SCAN_SHARD_RATE_SHARE,
+                on_result=handle_result,
+                provider_spec=provider_spec_from_config(Config),
+                **options
+            )
+        else:
+            scan_locations(locations, on_result=handle_result, provider=weather_provider, **options)
+    except Exception as e:
+        print(f"Error scanning weather: {e}")
+    if pending:
+        flush()
     
     end_time = time.time()
     duration = end_time - start_time
     
     print(f"⚡ Weather fetch completed in {duration:.2f} seconds!")
-    print(f"📊 Results: {successful_fetches}/{len(locations)} successful, {len(extreme_weather_locations)} extreme weather events found")
+    print(f"📊 Results: {len(readings)}/{len(locations)} successful, {extreme_count} extreme weather events found")
     
-    return extreme_weather_locations
+    return readings
+
+def fetch_multiple_locations_weather():
+    """Fast weather data fetching for all monitored Indian cities; returns only extreme readings"""
+    locations = load_monitored_locations(supabase if sb_available() else None, Config.MONITORED_LOCATIONS_FILE)
+    return [w for w in scan_weather(locations) if w['is_extreme']]
+
+def scan_and_save_extreme_weather():
+    """Scan all monitored cities, saving each extreme reading (and its alert) while the scan runs.
+
+    Returns ``(extreme_readings, summary)`` with ``summary`` as from ``save_weather_data_batch``.
+    """
+    locations = load_monitored_locations(supabase if sb_available() else None, Config.MONITORED_LOCATIONS_FILE)
+    saver = WeatherSaver()
+    readings = scan_weather(locations, on_reading=lambda w: saver.add(w) if w['is_extreme'] else None)
+    summary = saver.close()
+    log_save_failures(summary)
+    return [w for w in readings if w['is_extreme']], summary
+
+def run_incremental_weather_scan():
+    """Scan only monitored cities whose latest weather_data row is older than their refresh window.
+
+    Every reading is saved so its fetched_at drives the next scan. Cities that already
+    have an active alert use the shorter WEATHER_SCAN_ALERT_WINDOW and don't get a
+    duplicate announcement. Returns ``(extreme_readings, skipped_count)``.
+    """
+    if not sb_available():
+        return fetch_multiple_locations_weather(), 0
+    
+    locations = load_monitored_locations(supabase, Config.MONITORED_LOCATIONS_FILE)
+    due, alerted = plan_incremental_scan(
+        supabase,
+        locations,
+        fresh_window=Config.WEATHER_SCAN_FRESH_WINDOW,
+        alert_window=Config.WEATHER_SCAN_ALERT_WINDOW,
+    )
+    print(f"🔁 Incremental scan: {len(due)} of {len(locations)} cities due, {len(alerted)} with active alerts")
+    if not due:
+        return [], len(locations)
+    
+    saver = WeatherSaver(skip_alert_locations=alerted)
+    readings = scan_weather(due, on_reading=saver.add)
+    log_save_failures(saver.close())
+    return [w for w in readings if w['is_extreme']], len(locations) - len(due)
+
+def _weather_row(weather_data):
+    """weather_data table row for a fetched reading"""
+    return {
+        'location': weather_data['location'],
+        'temperature': weather_data['temperature'],
+        'humidity': weather_data['humidity'],
+        'wind_speed': weather_data['wind_speed'],
+        'weather_condition': weather_data['weather_condition'],
+        'is_extreme': weather_data['is_extreme'],
+        'weather_alert': weather_data['weather_alert']
+    }
 
 def save_weather_data(weather_data):
     """Save weather data to database"""
@@ -238,17 +228,7 @@ def save_weather_data(weather_data):
         return None
     
     try:
-        payload = {
-            'location': weather_data['location'],
-            'temperature': weather_data['temperature'],
-            'humidity': weather_data['humidity'],
-            'wind_speed': weather_data['wind_speed'],
-            'weather_condition': weather_data['weather_condition'],
-            'is_extreme': weather_data['is_extreme'],
-            'weather_alert': weather_data['weather_alert']
-        }
-        
-        result = supabase.table('weather_data').insert(payload).execute()
+        result = supabase.table('weather_data').insert(_weather_row(weather_data)).execute()
         if result and result.data:
             weather_id = result.data[0]['id']
             
@@ -263,49 +243,186 @@ def save_weather_data(weather_data):
         print(f"Error saving weather data: {e}")
         return None
 
+# Postgres data exceptions (22xxx) and constraint violations (23xxx): one bad row
+# rejected the whole statement, so nothing was written and the rest can be retried
+ROW_REJECTED_CODE_CLASSES = ('22', '23')
+
+def _rejected_by_database(error):
+    return isinstance(error, APIError) and str(error.code or '')[:2] in ROW_REJECTED_CODE_CLASSES
+
+def _insert_rows(table, rows):
+    """Insert rows in one request; if a bad row made the database reject the batch, retry row by row.
+
+    Any other failure (timeout, dropped connection, unreadable response) may have
+    happened after the insert committed, so those rows are reported as failed
+    rather than inserted a second time.
+    Returns a list aligned with ``rows`` of ``(inserted_row_or_None, error_or_None)``.
+    """
+    try:
+        result = supabase.table(table).insert(rows).execute()
+        data = result.data if result and result.data else []
+        if len(data) == len(rows):
+            return [(row, None) for row in data]
+        error = f"expected {len(rows)} inserted rows, got {len(data)}"
+        print(f"Batch insert into {table} returned {len(data)} of {len(rows)} rows, not retrying")
+        return [(None, error) for _ in rows]
+    except Exception as batch_err:
+        if not _rejected_by_database(batch_err):
+            print(f"Batch insert into {table} failed ({batch_err}), not retrying: it may have been written")
+            return [(None, str(batch_err)) for _ in rows]
+        print(f"Batch insert into {table} rejected ({batch_err}), retrying row by row")
+
+    outcomes = []
+    for row in rows:
+        try:
+            result = supabase.table(table).insert(row).execute()
+            if result and result.data:
+                outcomes.append((result.data[0], None))
+            else:
+                outcomes.append((None, "no row returned"))
+        except Exception as e:
+            outcomes.append((None, str(e)))
+    return outcomes
+
+def save_weather_data_batch(weather_list, skip_alert_locations=None):
+    """Save many readings with one weather_data insert and one announcements insert.
+
+    Returns ``{'saved': [...ids], 'announcements': [...ids], 'failed': [{'location', 'error'}],
+    'failed_announcements': [{'location', 'error'}]}``; a bad row is reported in ``failed``
+    (or ``failed_announcements`` for its alert) without aborting the rest of the batch.
+    Extreme readings for normalized locations in ``skip_alert_locations`` are saved
+    without creating another announcement.
+    """
+    summary = {'saved': [], 'announcements': [], 'failed': [], 'failed_announcements': []}
+    weather_list = [w for w in (weather_list or []) if w]
+    if not sb_available() or not weather_list:
+        return summary
+    
+    try:
+        outcomes = _insert_rows('weather_data', [_weather_row(w) for w in weather_list])
+    except Exception as e:
+        print(f"Error saving weather data batch: {e}")
+        summary['failed'] = [{'location': w['location'], 'error': str(e)} for w in weather_list]
+        return summary
+    
+    extreme = []
+    for weather_data, (row, error) in zip(weather_list, outcomes):
+        if row is None:
+            summary['failed'].append({'location': weather_data['location'], 'error': error})
+            continue
+        summary['saved'].append(row['id'])
+        if weather_data['is_extreme'] and normalize_location(weather_data['location']) not in (skip_alert_locations or ()):
+            extreme.append((weather_data, row['id']))
+    
+    if extreme:
+        try:
+            admin_id = get_alert_admin_id()
+            if admin_id:
+                payloads = [build_weather_alert_announcement(w, wid, admin_id) for w, wid in extreme]
+                for (weather_data, _), (row, error) in zip(extreme, _insert_rows("announcements", payloads)):
+                    if row is None:
+                        summary['failed_announcements'].append({'location': weather_data['location'], 'error': error})
+                    else:
+                        summary['announcements'].append(row['id'])
+                print(f"Auto-created {len(summary['announcements'])} weather alert announcements")
+        except Exception as e:
+            print(f"Error creating weather alert announcements: {e}")
+            summary['failed_announcements'] = [{'location': w['location'], 'error': str(e)} for w, _ in extreme]
+    
+    return summary
+
+def log_save_failures(summary):
+    for failure in summary['failed']:
+        print(f"❌ Could not save weather for {failure['location']}: {failure['error']}")
+    for failure in summary['failed_announcements']:
+        print(f"❌ Could not create weather alert for {failure['location']}: {failure['error']}")
+
+class WeatherSaver:
+    """Saves scan readings on a worker thread while the scan is still running.
+
+    Whatever arrived since the previous write goes out as one ``save_weather_data_batch``
+    call, so an extreme reading and its alert are stored within one insert of being fetched.
+    """
+
+    def __init__(self, skip_alert_locations=None):
+        self.skip_alert_locations = skip_alert_locations
+        self.summary = {'saved': [], 'announcements': [], 'failed': [], 'failed_announcements': []}
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="weather-saver", daemon=True)
+        self._thread.start()
+
+    def add(self, weather_data):
+        self._queue.put(weather_data)
+
+    def close(self):
+        """Wait until everything added has been saved; returns the merged summary"""
+        self._queue.put(None)
+        self._thread.join()
+        return self.summary
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = None in batch
+            batch = [w for w in batch if w is not None]
+            if batch:
+                try:
+                    result = save_weather_data_batch(batch, skip_alert_locations=self.skip_alert_locations)
+                except Exception as e:
+                    result = {'failed': [{'location': w['location'], 'error': str(e)} for w in batch]}
+                for key, values in result.items():
+                    self.summary[key].extend(values)
+            if closing:
+                return
+
+def get_alert_admin_id():
+    """Admin user that owns automatically created weather alerts"""
+    # You might want to store this in environment or config
+    admin_resp = supabase.table("users").select("id").eq("role", "admin").limit(1).execute()
+    return admin_resp.data[0]['id'] if admin_resp and admin_resp.data else None
+
+def build_weather_alert_announcement(weather_data, weather_id, admin_id):
+    """announcements row for an extreme weather reading"""
+    # Determine severity based on weather conditions (see weather_rules.json)
+    severity = weather_data.get('severity') or classify([dict(weather_data)])[0]['severity'] or "high"
+    
+    # Create announcement title and description
+    title = f"Extreme Weather Alert - {weather_data['location']}"
+    description = f"Extreme weather conditions detected in {weather_data['location']}. "
+    
+    if weather_data['weather_alert']:
+        description += f"Alert: {weather_data['weather_alert']}. "
+    
+    description += f"Current conditions: {weather_data['weather_condition']}, Temperature: {weather_data['temperature']}°C"
+    if weather_data['wind_speed']:
+        description += f", Wind Speed: {weather_data['wind_speed']} m/s"
+    
+    description += ". Please take necessary precautions and stay safe."
+    
+    return {
+        "admin_id": admin_id,
+        "title": title,
+        "description": description,
+        "severity": severity,
+        "is_weather_alert": True,
+        "weather_data_id": weather_id
+    }
+
 def create_weather_alert_announcement(weather_data, weather_id):
     """Automatically create a weather alert announcement"""
     if not sb_available():
         return None
     
     try:
-        # Determine severity based on weather conditions
-        severity = "critical"
-        if weather_data['weather_condition'] in ['Thunderstorm', 'Tornado', 'Hurricane']:
-            severity = "critical"
-        elif weather_data['temperature'] and (weather_data['temperature'] > 40 or weather_data['temperature'] < -10):
-            severity = "critical"
-        elif weather_data['wind_speed'] and weather_data['wind_speed'] > 20:
-            severity = "high"
-        else:
-            severity = "high"
-        
-        # Create announcement title and description
-        title = f"Extreme Weather Alert - {weather_data['location']}"
-        description = f"Extreme weather conditions detected in {weather_data['location']}. "
-        
-        if weather_data['weather_alert']:
-            description += f"Alert: {weather_data['weather_alert']}. "
-        
-        description += f"Current conditions: {weather_data['weather_condition']}, Temperature: {weather_data['temperature']}°C"
-        if weather_data['wind_speed']:
-            description += f", Wind Speed: {weather_data['wind_speed']} m/s"
-        
-        description += ". Please take necessary precautions and stay safe."
-        
-        # Get admin user ID (you might want to store this in environment or config)
-        admin_resp = supabase.table("users").select("id").eq("role", "admin").limit(1).execute()
-        admin_id = admin_resp.data[0]['id'] if admin_resp and admin_resp.data else None
+        admin_id = get_alert_admin_id()
         
         if admin_id:
-            payload = {
-                "admin_id": admin_id,
-                "title": title,
-                "description": description,
-                "severity": severity,
-                "is_weather_alert": True,
-                "weather_data_id": weather_id
-            }
+            payload = build_weather_alert_announcement(weather_data, weather_id, admin_id)
             
             ann_result = supabase.table("announcements").insert(payload).execute()
             if ann_result and ann_result.data:
@@ -325,7 +442,7 @@ def check_and_update_weather_alerts():
     
     try:
         # Get all weather alert announcements
-        ann_resp = supabase.table("announcements").select(", weather_data()").eq("is_weather_alert", True).execute()
+        ann_resp = supabase.table("announcements").select("*, weather_data(*)").eq("is_weather_alert", True).execute()
         weather_alerts = ann_resp.data if ann_resp and ann_resp.data else []
         
         if not weather_alerts:
@@ -365,6 +482,49 @@ def check_and_update_weather_alerts():
     except Exception as e:
         print(f"Error checking weather alerts: {e}")
 
+weather_alert_scheduler = PeriodicTask(
+    check_and_update_weather_alerts,
+    Config.WEATHER_ALERT_CHECK_INTERVAL,
+    name="weather-alert-reconciler",
+)
+
+weather_scan_scheduler = PeriodicTask(
+    run_incremental_weather_scan,
+    Config.WEATHER_SCAN_INTERVAL,
+    name="weather-incremental-scan",
+)
+
+weather_maintenance_scheduler = PeriodicTask(
+    lambda: run_weather_maintenance(supabase, Config.WEATHER_RETENTION_DAYS, Config.WEATHER_PRUNE_BATCH_SIZE),
+    Config.WEATHER_MAINTENANCE_INTERVAL,
+    name="weather-maintenance",
+)
+
+shelter_index = ShelterIndex(
+    cell_deg=Config.SHELTER_INDEX_CELL_DEG,
+    full_reload_interval=Config.SHELTER_INDEX_FULL_RELOAD_INTERVAL,
+)
+
+shelter_index_refresher = PeriodicTask(
+    lambda: shelter_index.refresh(supabase),
+    Config.SHELTER_INDEX_REFRESH_INTERVAL,
+    name="shelter-index-refresh",
+)
+
+@app.before_request
+def start_background_workers():
+    """Start the background workers in the process that actually serves requests"""
+    if Config.WEATHER_ALERT_SCHEDULER_ENABLED and sb_available():
+        weather_alert_scheduler.start()
+        if Config.WEATHER_SCAN_INTERVAL > 0:
+            weather_scan_scheduler.start()
+        if Config.WEATHER_MAINTENANCE_INTERVAL > 0:
+            weather_maintenance_scheduler.start()
+    if sb_available() and Config.SHELTER_INDEX_REFRESH_INTERVAL > 0:
+        shelter_index_refresher.start()
+    if sb_available() and Config.OVERPASS_PREFETCH_INTERVAL > 0:
+        shelter_tile_prefetcher.start()
+
 def delete_announcement(announcement_id):
     """Delete an announcement by ID"""
     if not sb_available():
@@ -389,6 +549,69 @@ def delete_incident(incident_id):
         print(f"Error deleting incident: {e}")
         return False
 
+geocoder = GeocodingService(
+    Config.GEOCODE_CACHE_PATH,
+    max_entries=Config.GEOCODE_CACHE_MAX_ENTRIES,
+    min_interval=Config.GEOCODE_MIN_INTERVAL,
+    negative_ttl=Config.GEOCODE_NEGATIVE_TTL,
+)
+
+def geocode_location(query):
+    """Geocode a free-text location via the cached, rate-limited Nominatim service"""
+    return geocoder.geocode(query)
+
+overpass_tiles = OverpassTileCache(
+    precision=Config.OVERPASS_TILE_PRECISION,
+    ttl=Config.OVERPASS_TILE_TTL,
+    max_tiles=Config.OVERPASS_MAX_TILES,
+)
+
+def prefetch_incident_shelter_tiles():
+    """Warm the Overpass tiles around pending incidents so shelter searches there are local.
+
+    Only incidents whose location is already geocoded are covered: background work must not
+    spend the shared one-request-per-second Nominatim budget that user searches depend on.
+    """
+    if not sb_available():
+        return 0
+    try:
+        resp = supabase.table("incidents").select("location, pincode").eq("status", "pending").execute()
+    except Exception as e:
+        print(f"Error loading incidents for shelter prefetch: {e}")
+        return 0
+    points, uncached = [], 0
+    for incident in resp.data or []:
+        query = incident.get("location") or (f"{incident['pincode']}, India" if incident.get("pincode") else None)
+        location = geocoder.cached(query) if query else None
+        if location:
+            points.append((location.latitude, location.longitude))
+        elif query:
+            uncached += 1
+    covered = overpass_tiles.prefetch(dict.fromkeys(points), Config.SHELTER_SEARCH_RADIUS_KM)
+    print(f"🗺️ Prefetched {covered} shelter tiles around {len(points)} pending incidents ({uncached} not geocoded yet)")
+    return covered
+
+offline_shelters = OfflineShelters(OsmShelterStore(Config.OSM_SHELTER_DB_PATH), cell_deg=Config.SHELTER_INDEX_CELL_DEG)
+
+shelter_tile_prefetcher = PeriodicTask(
+    prefetch_incident_shelter_tiles,
+    Config.OVERPASS_PREFETCH_INTERVAL,
+    name="shelter-tile-prefetch",
+)
+
+head_directory = EmergencyHeadDirectory(ttl=Config.EMERGENCY_HEADS_TTL, check_interval=Config.EMERGENCY_HEADS_CHECK_INTERVAL)
+
+def _rows(resp):
+    return resp.data if resp and resp.data else []
+
+def fetch_dashboard_data(queries):
+    """Run a dashboard's independent queries concurrently; anything that fails or is late comes back empty"""
+    outcome = fan_out(queries, deadline=Config.DASHBOARD_QUERY_DEADLINE, default=list, max_workers=Config.DASHBOARD_QUERY_WORKERS)
+    if outcome.errors:
+        failed = ", ".join(f"{name} ({error})" for name, error in outcome.errors.items())
+        flash(f"Some data could not be loaded: {failed}", "warning")
+    return outcome.results
+
 # Routes
 @app.route("/")
 def home():
@@ -462,6 +685,7 @@ def signup():
                 "role": role,
             }
             supabase.table("users").upsert(payload, on_conflict="id").execute()
+            head_directory.invalidate()
             flash("Signup successful! Please log in.", "success")
         except Exception as err:
             flash(f"Profile save error: {err}", "warning")
@@ -546,6 +770,7 @@ def signin():
                         "role": (meta.get("role") or "user").lower(),
                     }
                     supabase.table("users").upsert(payload, on_conflict="id").execute()
+                    head_directory.invalidate()
                     prof = supabase.table("users").select("id,name,email,role").eq("id", user_id).limit(1).execute()
                 except Exception:
                     pass
@@ -585,9 +810,6 @@ def dashboard():
         weather_alerts = []
         if sb_available():
             try:
-                # Check and update weather alerts (remove resolved ones)
-                check_and_update_weather_alerts()
-                
                 # Get all recent announcements
                 ann_resp = supabase.table("announcements").select(", weather_data!announcements_weather_data_id_fkey()").order("timestamp", desc=True).limit(5).execute()
                 announcements = ann_resp.data if ann_resp and ann_resp.data else []
@@ -607,21 +829,15 @@ def admin_dashboard():
     announcements = []
     weather_data = []
     if sb_available():
-        try:
-            # Check and update weather alerts (remove resolved ones)
-            check_and_update_weather_alerts()
-            
-            inc_resp = supabase.table("incidents").select("*").order("timestamp", desc=True).limit(10).execute()
-            incidents = inc_resp.data if inc_resp and inc_resp.data else []
-            
-            ann_resp = supabase.table("announcements").select("*").order("timestamp", desc=True).limit(5).execute()
-            announcements = ann_resp.data if ann_resp and ann_resp.data else []
-            
+        data = fetch_dashboard_data({
+            "incidents": lambda: _rows(supabase.table("incidents").select("*").order("timestamp", desc=True, nullsfirst=False).limit(10).execute()),
+            "announcements": lambda: _rows(supabase.table("announcements").select("*").order("timestamp", desc=True).limit(5).execute()),
             # Get recent weather data, prioritizing extreme weather and most recent
-            weather_resp = supabase.table("weather_data").select("*").order("fetched_at", desc=True).order("is_extreme", desc=True).limit(15).execute()
-            weather_data = weather_resp.data if weather_resp and weather_resp.data else []
-        except Exception as err:
-            flash(f"Error loading data: {err}", "danger")
+            "weather data": lambda: _rows(supabase.table("weather_data").select("*").order("fetched_at", desc=True).order("is_extreme", desc=True).limit(15).execute()),
+        })
+        incidents = data["incidents"]
+        announcements = data["announcements"]
+        weather_data = data["weather data"]
     
     return render_template("admin_dashboard.html", incidents=incidents, announcements=announcements, weather_data=weather_data)
 
@@ -653,19 +869,23 @@ def fetch_weather():
 @require_role("admin")
 def fetch_extreme_weather():
     """Fetch weather data for multiple Indian cities and show only extreme weather"""
+    if request.form.get("incremental") == "on":
+        extreme_weather_locations, skipped = run_incremental_weather_scan()
+        flash(f"✅ Incremental scan completed! {skipped} recently refreshed cities skipped, {len(extreme_weather_locations)} with extreme weather.", "success")
+        return redirect(url_for("admin_dashboard"))
+    
     flash("Fetching weather data for all monitored Indian cities...", "info")
     
-    extreme_weather_locations = fetch_multiple_locations_weather()
+    # Extreme readings are saved (and alerted) as they arrive, not after the whole scan
+    extreme_weather_locations, summary = scan_and_save_extreme_weather()
     
     if extreme_weather_locations:
-        # Save all extreme weather data to database
-        saved_count = 0
-        for weather_data in extreme_weather_locations:
-            weather_id = save_weather_data(weather_data)
-            if weather_id:
-                saved_count += 1
-        
+        saved_count = len(summary['saved'])
         flash(f"✅ Scan completed! Found {len(extreme_weather_locations)} Indian cities with extreme weather. {saved_count} records saved.", "success")
+        if summary['failed']:
+            flash(f"{len(summary['failed'])} weather records could not be saved.", "warning")
+        if summary['failed_announcements']:
+            flash(f"{len(summary['failed_announcements'])} weather alert announcements could not be created.", "warning")
     else:
         flash("✅ Scan completed! No extreme weather conditions detected in monitored Indian cities.", "info")
     
@@ -715,27 +935,27 @@ def government_dashboard():
     emergency_heads = []
     emergency_units = []
     if sb_available():
-        try:
-            req_resp = supabase.table("requests").select("id, incident_id, status, timestamp, incidents(*)").order("timestamp", desc=True).limit(50).execute()
-            requests = req_resp.data if req_resp and req_resp.data else []
-            
-            team_resp = supabase.table("team_allocations").select("*").order("assigned_at", desc=True).limit(10).execute()
-            team_allocations = team_resp.data if team_resp and team_resp.data else []
-            # Recent emergency assignments (single requests relation with nested incidents)
-            em_resp = supabase.table("emergency_assignments").select("*, requests(id, incident_id, incidents(location))").order("assigned_at", desc=True).limit(10).execute()
-            emergency_assignments = em_resp.data if em_resp and em_resp.data else []
-            # Emergency heads and units (tolerate projects without is_emergency_head column)
+        def load_heads():
+            # Tolerate projects without is_emergency_head column
             try:
-                heads_resp = supabase.table("users").select("id, name, email, is_emergency_head").eq("role", "emergency").eq("is_emergency_head", True).execute()
-                emergency_heads = heads_resp.data if heads_resp and heads_resp.data else []
+                return _rows(supabase.table("users").select("id, name, email, is_emergency_head").eq("role", "emergency").eq("is_emergency_head", True).execute())
             except Exception:
                 # Fallback: if the column doesn't exist yet, list all emergency users as selectable heads
-                heads_resp = supabase.table("users").select("id, name, email").eq("role", "emergency").execute()
-                emergency_heads = heads_resp.data if heads_resp and heads_resp.data else []
-            units_resp = supabase.table("emergency_units").select("*, users(name)").order("unit_name").execute()
-            emergency_units = units_resp.data if units_resp and units_resp.data else []
-        except Exception as err:
-            flash(f"Error loading data: {err}", "danger")
+                return _rows(supabase.table("users").select("id, name, email").eq("role", "emergency").execute())
+
+        data = fetch_dashboard_data({
+            "requests": lambda: _rows(supabase.table("requests").select("id, incident_id, status, timestamp, incidents(*)").order("timestamp", desc=True).limit(50).execute()),
+            "team allocations": lambda: _rows(supabase.table("team_allocations").select("*").order("assigned_at", desc=True).limit(10).execute()),
+            # Recent emergency assignments (single requests relation with nested incidents)
+            "emergency assignments": lambda: _rows(supabase.table("emergency_assignments").select("*, requests(id, incident_id, incidents(location))").order("assigned_at", desc=True).limit(10).execute()),
+            "emergency heads": load_heads,
+            "emergency units": lambda: _rows(supabase.table("emergency_units").select("*, users(name)").order("unit_name").execute()),
+        })
+        requests = data["requests"]
+        team_allocations = data["team allocations"]
+        emergency_assignments = data["emergency assignments"]
+        emergency_heads = data["emergency heads"]
+        emergency_units = data["emergency units"]
     
     return render_template("government_dashboard.html", requests=requests, team_allocations=team_allocations, emergency_assignments=emergency_assignments, emergency_heads=emergency_heads, emergency_units=emergency_units)
 
@@ -926,44 +1146,61 @@ def admin_data_view():
         return redirect(url_for("admin_dashboard"))
     
     try:
-        # Fetch all data from Supabase
-        incidents = []
-        donations = []
-        users = []
-        announcements = []
-        medical_requests = []
-        
-        # Get incidents
-        inc_resp = supabase.table("incidents").select("*").order("timestamp", desc=True).execute()
-        incidents = inc_resp.data if inc_resp and inc_resp.data else []
-        
-        # Get donations
-        don_resp = supabase.table("donations").select("*").order("timestamp", desc=True).execute()
-        donations = don_resp.data if don_resp and don_resp.data else []
-        
-        # Get users (excluding sensitive info)
-        usr_resp = supabase.table("users").select("id, name, email, role, created_at").order("created_at", desc=True).execute()
-        users = usr_resp.data if usr_resp and usr_resp.data else []
-        
-        # Get announcements
-        ann_resp = supabase.table("announcements").select("*").order("timestamp", desc=True).execute()
-        announcements = ann_resp.data if ann_resp and ann_resp.data else []
-        
-        # Get medical requests
-        med_resp = supabase.table("medical_requests").select("*").order("created_at", desc=True).execute()
-        medical_requests = med_resp.data if med_resp and med_resp.data else []
+        # One keyset page per table (each table has its own cursor) plus cached, estimated totals
+        cursors = {f"{table}_cursor": request.args[f"{table}_cursor"] for table in DATA_VIEW_TABLES if request.args.get(f"{table}_cursor")}
+        pages, page_links, totals = {}, {}, {}
+        for table, (columns, order_column) in DATA_VIEW_TABLES.items():
+            key = f"{table}_cursor"
+            pages[table], next_cursor = fetch_page(supabase, table, columns, order_column, cursors.get(key), Config.ADMIN_DATA_PAGE_SIZE)
+            totals[table] = data_view_counts.get(supabase, table)
+            # Paging one table keeps the other tables where they are
+            others = {k: v for k, v in cursors.items() if k != key}
+            page_links[table] = {
+                "first": url_for("admin_data_view", **others) if key in cursors else None,
+                "next": url_for("admin_data_view", **others, **{key: next_cursor}) if next_cursor else None,
+            }
         
         return render_template("admin_data_view.html", 
-                             incidents=incidents, 
-                             donations=donations, 
-                             users=users, 
-                             announcements=announcements,
-                             medical_requests=medical_requests)
+                             incidents=pages["incidents"], 
+                             donations=pages["donations"], 
+                             users=pages["users"], 
+                             announcements=pages["announcements"],
+                             medical_requests=pages["medical_requests"],
+                             page_links=page_links,
+                             totals=totals)
         
+    except InvalidCursor as err:
+        flash(f"{err}, showing the first page.", "warning")
+        return redirect(url_for("admin_data_view"))
     except Exception as err:
         flash(f"Error fetching data: {err}", "danger")
         return redirect(url_for("admin_dashboard"))
 
+data_view_counts = RowCounts(ttl=Config.ADMIN_DATA_COUNT_TTL)
+
+@app.route("/admin/data_view/export/<table>")
+@require_role("admin")
+def admin_data_export(table):
+    """Stream a whole table as CSV (default) or NDJSON, reading it in fixed-size chunks"""
+    if table not in DATA_VIEW_TABLES:
+        flash("Unknown table.", "warning")
+        return redirect(url_for("admin_data_view"))
+    if not sb_available():
+        flash("Database is not configured.", "danger")
+        return redirect(url_for("admin_dashboard"))
+    
+    columns, order_column = DATA_VIEW_TABLES[table]
+    rows = iter_rows(supabase, table, columns, order_column, Config.ADMIN_EXPORT_CHUNK_SIZE)
+    if request.args.get("format") == "ndjson":
+        body, mimetype, extension = ndjson_lines(rows), "application/x-ndjson", "ndjson"
+    else:
+        body, mimetype, extension = csv_lines(rows), "text/csv", "csv"
+    # stream_with_context keeps the request (and its metrics route label) while the body is generated
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename={table}.{extension}",
+        "X-Accel-Buffering": "no",
+    })
+
 @app.route("/allocate_team", methods=["POST"])
 @require_role("government")
 def allocate_team():
@@ -1005,40 +1242,12 @@ def notify_emergency_head():
         flash("Database is not configured.", "danger")
         return redirect(url_for("government_dashboard"))
     try:
-        # Determine recipients without requiring email
-        # 1) Heads
-        heads = []
-        try:
-            resp = supabase.table("users").select("id, role, is_emergency_head").execute()
-            rows = resp.data or []
-            # prefer explicit heads
-            for r in rows:
-                if r.get("is_emergency_head"):
-                    heads.append({"id": r.get("id")})
-            # then add any role containing 'emergency'
-            if not heads:
-                for r in rows:
-                    role_val = (r.get("role") or "").lower()
-                    if "emergency" in role_val:
-                        heads.append({"id": r.get("id")})
-        except Exception:
-            heads = []
-        if not heads:
-            # 2) fallback: notify owners of units
-            try:
-                unit_resp = supabase.table("emergency_units").select("head_id").execute()
-                hid_set = {}
-                for r in (unit_resp.data or []):
-                    hid = r.get("head_id")
-                    if hid:
-                        hid_set[hid] = True
-                heads = [{"id": k} for k in hid_set.keys()]
-            except Exception:
-                heads = []
+        # Recipients from the cached head directory (filtered queries, not the whole users table)
+        heads = [{"id": head_id} for head_id in head_directory.head_ids(supabase)]
         if not heads:
             flash("No emergency team users found to notify.", "danger")
             return redirect(url_for("government_dashboard"))
-        # Insert one notification per head
+        # One bulk insert, one notification per head
         payloads = [
             {"request_id": int(request_id), "gov_id": session.get("user_id"), "head_id": h["id"], "status": "Pending"}
             for h in heads
@@ -1057,22 +1266,23 @@ def emergency_dashboard():
     my_units = []
     updates_map = {}
     if sb_available():
-        try:
+        user_id = session.get("user_id")
+        data = fetch_dashboard_data({
             # Assignments for this emergency team user
-            asg_resp = supabase.table("emergency_assignments").select("*, requests(incidents(location, description))").eq("team_lead_id", session.get("user_id")).order("assigned_at", desc=True).execute()
-            assignments = asg_resp.data if asg_resp and asg_resp.data else []
+            "assignments": lambda: _rows(supabase.table("emergency_assignments").select("*, requests(incidents(location, description))").eq("team_lead_id", user_id).order("assigned_at", desc=True).execute()),
             # Notifications to me if I am head
-            notif_resp = supabase.table("emergency_notifications").select("*, requests(incidents(location, description))").eq("head_id", session.get("user_id")).order("created_at", desc=True).execute()
-            notifications = notif_resp.data if notif_resp and notif_resp.data else []
+            "notifications": lambda: _rows(supabase.table("emergency_notifications").select("*, requests(incidents(location, description))").eq("head_id", user_id).order("created_at", desc=True).execute()),
             # Units under me if I am head
-            units_resp = supabase.table("emergency_units").select("*").eq("head_id", session.get("user_id")).order("unit_name").execute()
-            my_units = units_resp.data if units_resp and units_resp.data else []
-            # Recent updates per assignment
-            for a in assignments:
-                up_resp = supabase.table("emergency_updates").select("*").eq("assignment_id", a.get("id")).order("created_at", desc=True).limit(3).execute()
-                updates_map[a.get("id")] = up_resp.data if up_resp and up_resp.data else []
+            "units": lambda: _rows(supabase.table("emergency_units").select("*").eq("head_id", user_id).order("unit_name").execute()),
+        })
+        assignments = data["assignments"]
+        notifications = data["notifications"]
+        my_units = data["units"]
+        try:
+            # Recent updates per assignment, batched instead of one query per assignment
+            updates_map = load_latest_updates(supabase, [a.get("id") for a in assignments], per_assignment=3)
         except Exception as err:
-            flash(f"Error loading assignments: {err}", "danger")
+            flash(f"Error loading assignment updates: {err}", "danger")
     return render_template("emergency_dashboard.html", assignments=assignments, updates_map=updates_map, notifications=notifications, my_units=my_units)
 
 @app.route("/create_unit", methods=["POST"])
@@ -1094,11 +1304,18 @@ def create_unit():
             "status": "Free",
         } for cat in categories]
         supabase.table("emergency_units").insert(payloads).execute()
+        head_directory.invalidate()
         flash("Team created with Rescue, Escort, Medical, and ResourceCollector subteams.", "success")
     except Exception as err:
         flash(f"Error creating unit: {err}", "danger")
     return redirect(url_for("emergency_dashboard"))
 
+ASSIGN_UNIT_ERRORS = {
+    "unit_not_free": "That unit is no longer free; it may have just been dispatched.",
+    "unit_not_found": "Unit not found",
+    "request_not_found": "Request not found",
+}
+
 @app.route("/head_assign_unit", methods=["POST"])
 @require_role("emergency")
 def head_assign_unit():
@@ -1112,37 +1329,17 @@ def head_assign_unit():
         flash("Database is not configured.", "danger")
         return redirect(url_for("emergency_dashboard"))
     try:
-        # Verify unit belongs to me and is Free
-        u_resp = supabase.table("emergency_units").select("*, users(id)").eq("id", int(unit_id)).limit(1).execute()
-        if not u_resp or not u_resp.data:
-            flash("Unit not found", "danger")
-            return redirect(url_for("emergency_dashboard"))
-        unit = u_resp.data[0]
-        # Mark unit Busy
-        supabase.table("emergency_units").update({"status": "Busy", "last_update": None}).eq("id", int(unit_id)).execute()
-        # Fetch incident location
-        req_resp = supabase.table("requests").select("incident_id").eq("id", int(request_id)).limit(1).execute()
-        incident_id = req_resp.data[0]["incident_id"] if req_resp and req_resp.data else None
-        loc_text = None
-        if incident_id:
-            inc_resp = supabase.table("incidents").select("location").eq("id", incident_id).limit(1).execute()
-            loc_text = inc_resp.data[0]["location"] if inc_resp and inc_resp.data else None
-        # Create assignment under my user as lead
-        payload = {
-            "request_id": int(request_id),
-            "team_name": unit["unit_name"],
-            "team_type": unit["unit_category"],
-            "team_lead_id": session.get("user_id"),
-            "location_text": loc_text,
-            "notes": f"Assigned unit #{unit['id']}",
-            "status": "Assigned",
-        }
-        supabase.table("emergency_assignments").insert(payload).execute()
-        # Mark notification acknowledged if exists
-        supabase.table("emergency_notifications").update({"status": "Acknowledged"}).eq("request_id", int(request_id)).eq("head_id", session.get("user_id")).execute()
+        # One round trip: the database claims the unit only if it is still Free, creates the
+        # assignment and acknowledges my notification in a single transaction
+        supabase.rpc("head_assign_unit", {
+            "p_request_id": int(request_id),
+            "p_unit_id": int(unit_id),
+            "p_head_id": session.get("user_id"),
+        }).execute()
         flash("Unit assigned and government notified.", "success")
     except Exception as err:
-        flash(f"Error assigning unit: {err}", "danger")
+        reason = next((message for code, message in ASSIGN_UNIT_ERRORS.items() if code in str(err)), None)
+        flash(reason or f"Error assigning unit: {err}", "warning" if reason else "danger")
     return redirect(url_for("emergency_dashboard"))
 
 @app.route("/emergency_update", methods=["POST"])
@@ -1222,124 +1419,205 @@ def gov_delete_incident(incident_id: int):
         flash(f"Error deleting incident: {err}", "danger")
     return redirect(url_for("government_dashboard"))
 
+def shelter_card(shelter, distance_km=None):
+    """Card dict for a shelter from the shelters table"""
+    return {
+        "name": shelter["name"],
+        "type": "Database Shelter",
+        "address": shelter["location"],
+        "capacity": f"{shelter['available']}/{shelter['capacity']}",
+        "distance_km": distance_km,
+        "lat": shelter.get("latitude") or 0,
+        "lon": shelter.get("longitude") or 0
+    }
+
+def osm_shelter_card(element, distance_km):
+    """Card dict for a shelter from OpenStreetMap"""
+    return {
+        "name": element["name"],
+        "type": element["type"],
+        "address": f"Lat: {element['latitude']:.4f}, Lon: {element['longitude']:.4f}",
+        "capacity": "Contact for details",
+        "distance_km": distance_km,
+        "lat": element["latitude"],
+        "lon": element["longitude"]
+    }
+
+def ensure_shelter_index():
+    """Load the shelter index on first use; the background refresher keeps it current after that"""
+    if not shelter_index.loaded and sb_available():
+        try:
+            shelter_index.refresh(supabase)
+        except Exception as err:
+            print(f"Error loading shelter index: {err}")
+
+def find_nearby_shelters(lat, lon, limit, offset=0, radius_km=None):
+    """One page of OSM and registered shelters near a point, nearest first.
+
+    Returns ``(cards, next_offset, live_map_ok)``; ``next_offset`` is ``None`` on the last page.
+    """
+    radius_km = radius_km or Config.SHELTER_SEARCH_RADIUS_KM
+    # Each source only needs its own top offset + limit (+1 to know if there is more)
+    wanted = offset + limit + 1
+    live_map_ok = True
+    osm = []
+    source = Config.SHELTER_OSM_SOURCE
+    if source == "offline" or (source == "auto" and offline_shelters.available()):
+        # Imported OSM extract: no external call at all
+        osm = [osm_shelter_card(e, d) for e, d in offline_shelters.search(lat, lon, radius_km, limit=wanted)]
+    else:
+        try:
+            found = overpass_tiles.search(lat, lon, radius_km, limit=wanted)
+        except Exception as err:
+            print(f"Overpass query failed: {err}")
+            found, live_map_ok = [], False
+        osm = [osm_shelter_card(e, d) for e, d in found]
+
+    ensure_shelter_index()
+    registered = [shelter_card(s, d) for s, d in shelter_index.within(lat, lon, radius_km, limit=wanted)]
+
+    merged = list(islice(heapq.merge(osm, registered, key=lambda card: card["distance_km"]), wanted))
+    page = merged[offset:offset + limit]
+    next_offset = offset + limit if len(merged) > offset + limit else None
+    return page, next_offset, live_map_ok
+
+def _page_args(args):
+    """(limit, offset) from request args, clamped to sane values"""
+    try:
+        limit = int(args.get("k", Config.SHELTER_PAGE_SIZE))
+        offset = int(args.get("offset", 0))
+    except ValueError:
+        limit, offset = Config.SHELTER_PAGE_SIZE, 0
+    return max(1, min(limit, Config.SHELTER_MAX_PAGE_SIZE)), max(0, offset)
+
 @app.route("/nearby_shelters", methods=["GET", "POST"])
 def nearby_shelters():
     shelters = []
-    user_location = ""
+    next_offset = None
+    user_location = request.form.get("location") if request.method == "POST" else request.args.get("location", "")
     
-    if request.method == "POST":
-        user_location = request.form.get("location")
-
+    if request.method == "POST" or user_location:
         if not user_location:
             flash("Please enter a location", "warning")
             return redirect(url_for("nearby_shelters"))
 
+        limit, offset = _page_args(request.args)
         try:
             # Get user coordinates using geopy
-            geolocator = Nominatim(user_agent="disaster_management")
-            location = geolocator.geocode(user_location)
+            location = geocode_location(user_location)
             
             if not location:
                 flash("Could not find the location. Please try a different address.", "warning")
                 return redirect(url_for("nearby_shelters"))
             
-            user_lat, user_lon = location.latitude, location.longitude
-            
-            # Search for shelters using Overpass API (OpenStreetMap)
-            api = overpy.Overpass()
-            
-            # Query for emergency shelters, community centers, schools, etc.
-            query = f"""
-            [out:json][timeout:25];
-            (
-              node["amenity"="shelter"](around:10000,{user_lat},{user_lon});
-              node["building"="school"](around:10000,{user_lat},{user_lon});
-              node["amenity"="community_centre"](around:10000,{user_lat},{user_lon});
-              node["building"="civic"](around:10000,{user_lat},{user_lon});
-              way["amenity"="shelter"](around:10000,{user_lat},{user_lon});
-              way["building"="school"](around:10000,{user_lat},{user_lon});
-              way["amenity"="community_centre"](around:10000,{user_lat},{user_lon});
-              way["building"="civic"](around:10000,{user_lat},{user_lon});
-            );
-            out body;
-            >;
-            out skel qt;
-            """
-            
-            result = api.query(query)
-            
-            # Process results
-            for node in result.nodes:
-                shelter_name = node.tags.get("name", "Emergency Shelter")
-                shelter_type = node.tags.get("amenity", node.tags.get("building", "shelter"))
-                
-                # Calculate distance
-                shelter_lat = float(node.lat)
-                shelter_lon = float(node.lon)
-                distance = geodesic((user_lat, user_lon), (shelter_lat, shelter_lon)).kilometers
-                
-                shelters.append({
-                    "name": shelter_name,
-                    "type": shelter_type,
-                    "address": f"Lat: {shelter_lat:.4f}, Lon: {shelter_lon:.4f}",
-                    "distance": f"{distance:.1f} km",
-                    "lat": shelter_lat,
-                    "lon": shelter_lon,
-                    "capacity": "Contact for details"
-                })
+            shelters, next_offset, live_map_ok = find_nearby_shelters(location.latitude, location.longitude, limit, offset)
+            if not live_map_ok:
+                flash("Live map data is unavailable right now. Showing registered shelters near you.", "warning")
             
-            # Also get shelters from database as backup
-            if sb_available():
-                try:
-                    resp = supabase.table("shelters").select("*").execute()
-                    db_shelters = resp.data if resp and resp.data else []
-                    
-                    for shelter in db_shelters:
-                        # Calculate distance to database shelter
-                        shelter_lat = 0  # You'd need to add lat/lon to your database
-                        shelter_lon = 0
-                        distance = geodesic((user_lat, user_lon), (shelter_lat, shelter_lon)).kilometers if shelter_lat != 0 else "N/A"
-                        
-                        shelters.append({
-                            "name": shelter["name"],
-                            "type": "Database Shelter",
-                            "address": shelter["location"],
-                            "capacity": f"{shelter['available']}/{shelter['capacity']}",
-                            "distance": f"{distance:.1f} km" if distance != "N/A" else "N/A",
-                            "lat": shelter_lat,
-                            "lon": shelter_lon
-                        })
-                except Exception as err:
-                    pass  # Continue with OSM results
-            
-            # Sort by distance
-            shelters.sort(key=lambda x: float(x["distance"].split()[0]) if x["distance"] != "N/A" else float('inf'))
-            
-            if not shelters:
+            if not shelters and offset == 0:
                 flash("No shelters found nearby. Try expanding your search area.", "info")
             
         except Exception as err:
             flash(f"Error fetching shelters: {err}", "danger")
             # Fallback to database shelters
-            if sb_available():
-                try:
-                    resp = supabase.table("shelters").select("*").execute()
-                    db_shelters = resp.data if resp and resp.data else []
-                    
-                    for shelter in db_shelters:
-                        shelters.append({
-                            "name": shelter["name"],
-                            "type": "Database Shelter",
-                            "address": shelter["location"],
-                            "capacity": f"{shelter['available']}/{shelter['capacity']}",
-                            "distance": "N/A",
-                            "lat": 0,
-                            "lon": 0
-                        })
-                except Exception:
-                    pass
+            ensure_shelter_index()
+            shelters = [shelter_card(shelter) for shelter in shelter_index.all()]
+            next_offset = None
+
+    return render_template("nearby_shelters.html", shelters=shelters, user_location=user_location, next_offset=next_offset)
+
+def _requested_point(args):
+    """(lat, lon) from ``?lat=..&lon=..`` or a geocoded ``?location=...``; ``None`` if it can't be found"""
+    if args.get("lat") and args.get("lon"):
+        return float(args["lat"]), float(args["lon"])
+    location = geocode_location(args.get("location", ""))
+    return (location.latitude, location.longitude) if location else None
+
+@app.route("/api/shelters/nearby")
+def api_nearby_shelters():
+    """JSON page of nearby shelters: ``?location=...`` or ``?lat=..&lon=..``, plus ``k`` and ``offset``"""
+    limit, offset = _page_args(request.args)
+    try:
+        point = _requested_point(request.args)
+        if not point:
+            return jsonify({"error": "Location not found"}), 404
+        lat, lon = point
+        shelters, next_offset, live_map_ok = find_nearby_shelters(lat, lon, limit, offset)
+    except ValueError:
+        return jsonify({"error": "lat and lon must be numbers"}), 400
+    except Exception as err:
+        print(f"Error in shelter API: {err}")
+        return jsonify({"error": "Could not search shelters"}), 500
+    return jsonify({
+        "lat": lat,
+        "lon": lon,
+        "shelters": shelters,
+        "offset": offset,
+        "next_offset": next_offset,
+        "live_map": live_map_ok,
+    })
+
+def stream_nearby_shelters(lat, lon, radius_km=None):
+    """Yield batches of shelter cards, each sorted by distance: local hits first, then live Overpass results.
+
+    The first batch merges registered shelters with offline/cached OSM shelters;
+    a second batch follows only if Overpass tiles had to be fetched.
+    """
+    radius_km = radius_km or Config.SHELTER_SEARCH_RADIUS_KM
+    ensure_shelter_index()
+    registered = [dict(shelter_card(s, d), source="registered") for s, d in shelter_index.within(lat, lon, radius_km)]
+
+    source = Config.SHELTER_OSM_SOURCE
+    if source == "offline" or (source == "auto" and offline_shelters.available()):
+        osm = [dict(osm_shelter_card(e, d), source="osm") for e, d in offline_shelters.search(lat, lon, radius_km)]
+        yield list(heapq.merge(registered, osm, key=lambda card: card["distance_km"]))
+        return
+
+    batches = overpass_tiles.iter_search(lat, lon, radius_km)
+    cached = [dict(osm_shelter_card(e, d), source="osm") for e, d in next(batches)]
+    yield list(heapq.merge(registered, cached, key=lambda card: card["distance_km"]))
+    for batch in batches:
+        yield [dict(osm_shelter_card(e, d), source="osm") for e, d in batch]
 
-    return render_template("nearby_shelters.html", shelters=shelters, user_location=user_location)
+@app.route("/api/shelters/nearby.ndjson")
+def api_nearby_shelters_stream():
+    """Nearby shelters as NDJSON, one per line, so map clients can draw markers as they arrive.
+
+    Lines come in distance order within each batch (local results, then live
+    Overpass results); the last line is ``{"done": true, ...}``, with an ``error`` if the local search failed.
+    """
+    try:
+        point = _requested_point(request.args)
+    except ValueError:
+        return jsonify({"error": "lat and lon must be numbers"}), 400
+    except Exception as err:
+        print(f"Error in shelter stream: {err}")
+        return jsonify({"error": "Could not search shelters"}), 500
+    if not point:
+        return jsonify({"error": "Location not found"}), 404
+    lat, lon = point
+
+    def generate():
+        count, live_map_ok, batches = 0, True, 0
+        done = {"done": True}
+        try:
+            for batch in stream_nearby_shelters(lat, lon):
+                for card in batch:
+                    count += 1
+                    yield json.dumps(card) + "\n"
+                batches += 1
+        except Exception as err:
+            # The first batch is local (registered shelters, offline/cached OSM); only later ones come from Overpass
+            if batches:
+                print(f"Overpass query failed: {err}")
+                live_map_ok = False
+            else:
+                print(f"Error loading local shelters: {err}")
+                done["error"] = "Could not search shelters"
+        done.update(count=count, lat=lat, lon=lon, live_map=live_map_ok)
+        yield json.dumps(done) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
 
 @app.route("/announcements")
 def announcements():
@@ -1350,9 +1628,6 @@ def announcements():
     announcements = []
     if sb_available():
         try:
-            # Check and update weather alerts (remove resolved ones)
-            check_and_update_weather_alerts()
-            
             resp = supabase.table("announcements").select(", weather_data!announcements_weather_data_id_fkey()").order("timestamp", desc=True).execute()
             announcements = resp.data if resp and resp.data else []
         except Exception as err:
@@ -1374,5 +1649,14 @@ def logout():
     flash("Logged out successfully!", "info")
     return redirect(url_for("home"))
 
+@app.route("/metrics", endpoint="metrics")
+def metrics_endpoint():
+    """Prometheus-style metrics for scrapers sending ``Authorization: Bearer <METRICS_TOKEN>``,
+    or for a signed-in admin. Without a token configured only admins can see them."""
+    scraper = bool(Config.METRICS_TOKEN) and request.headers.get("Authorization") == f"Bearer {Config.METRICS_TOKEN}"
+    if not scraper and session.get("user_role") != "admin":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
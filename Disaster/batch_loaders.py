@@ -0,0 +1,46 @@
+"""
+Batched loaders for one-to-many lookups.
+
+Instead of one Supabase query per parent row, the children of a whole set of
+parents are fetched with a single ``in`` filter and grouped (and capped) in
+memory. Ids are chunked to keep request URLs short, and results are paged past
+PostgREST's row cap, so the number of round trips depends on the amount of data
+rather than on the number of parents.
+"""
+
+
+def load_children(client, table, fk_column, parent_ids, per_parent=None, order_column=None, desc=True,
+                  columns="*", chunk_size=100, page_size=1000):
+    """``{parent_id: [rows]}`` for every id in ``parent_ids``, newest first when ordered by a timestamp.
+
+    ``per_parent`` keeps only the first N rows of each parent (in ``order_column``
+    order); parents without children map to an empty list.
+    """
+    ids = list(dict.fromkeys(i for i in parent_ids if i is not None))
+    grouped = {i: [] for i in ids}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        pending = set(chunk)
+        offset = 0
+        while pending:
+            query = client.table(table).select(columns).in_(fk_column, chunk)
+            if order_column:
+                query = query.order(order_column, desc=desc).order("id", desc=desc)
+            resp = query.range(offset, offset + page_size - 1).execute()
+            rows = resp.data or []
+            for row in rows:
+                bucket = grouped.setdefault(row.get(fk_column), [])
+                if per_parent is None or len(bucket) < per_parent:
+                    bucket.append(row)
+                    if per_parent is not None and len(bucket) >= per_parent:
+                        pending.discard(row.get(fk_column))
+            if len(rows) < page_size:
+                break
+            offset += page_size
+    return grouped
+
+
+def load_latest_updates(client, assignment_ids, per_assignment=3):
+    """Latest ``emergency_updates`` for each assignment id, in one request per 100 assignments"""
+    return load_children(client, "emergency_updates", "assignment_id", assignment_ids,
+                         per_parent=per_assignment, order_column="created_at")
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Query-plan benchmark for the indexes in supabase_schema.sql.
+
+Loads supabase_schema.sql into a scratch Postgres database (with a stand-in
+``auth.users`` table), fills it with synthetic data, then runs the SQL behind
+the app's hot routes under ``EXPLAIN (ANALYZE, BUFFERS)`` twice: once with every
+secondary index from the schema dropped and once with all of them created.
+Prints the median execution time and top plan node for each query.
+
+    python benchmark_indexes.py --dsn postgresql://postgres@localhost/disaster_bench
+    python benchmark_indexes.py --incidents 100000 --repeat 3
+
+Needs Postgres 13+ and the optional ``psycopg2`` package (``pip install psycopg2-binary``). Never
+point it at the production database: it creates tables and loads test rows.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "supabase_schema.sql")
+
+INDEX_RE = re.compile(r"^create index if not exists (\w+) on [^;]+;", re.IGNORECASE | re.MULTILINE)
+
+AUTH_STUB = """
+create schema if not exists auth;
+create table if not exists auth.users (id uuid primary key default gen_random_uuid());
+"""
+
+# Synthetic data, scaled from the incident count. Roughly: 1 user per 10 incidents,
+# 1 request per 20 incidents, 1 emergency head per 500 users.
+SEED_SQL = """
+insert into auth.users (id) select gen_random_uuid() from generate_series(1, %(users)s);
+
+insert into public.users (id, name, email, phone, role, is_emergency_head, created_at)
+select id, 'User ' || n, 'user' || n || '@example.com', lpad(n::text, 10, '9'),
+       case when n %% 500 = 0 then 'emergency' when n %% 5000 = 1 then 'government'
+            when n %% 5000 = 2 then 'admin' else 'user' end,
+       n %% 5000 = 0,
+       now() - (n || ' minutes')::interval
+from (select id, row_number() over () as n from auth.users) u;
+
+create temporary table bench_user_ids as
+select row_number() over () as n, id from public.users;
+alter table bench_user_ids add primary key (n);
+
+insert into public.incidents (user_id, location, pincode, description, status, timestamp)
+select (select id from bench_user_ids where n = 1 + (g::bigint * 7919) %% %(users)s),
+       'Location ' || g, lpad((g %% 999999)::text, 6, '0'), 'Synthetic incident ' || g,
+       case when g %% 20 = 0 then 'pending' else 'resolved' end,
+       now() - (g || ' seconds')::interval
+from generate_series(1, %(incidents)s) g;
+
+insert into public.requests (admin_id, incident_id, status, timestamp)
+select (select id from public.users where role = 'admin' limit 1), g * 20,
+       case when g %% 3 = 0 then 'accepted' else 'pending' end,
+       now() - (g || ' seconds')::interval
+from generate_series(1, %(requests)s) g;
+
+insert into public.team_allocations (gov_id, request_id, team_name, assigned_at)
+select (select id from public.users where role = 'government' limit 1), r.id, 'Team ' || r.id, r.timestamp
+from public.requests r where r.status = 'accepted';
+
+insert into public.emergency_units (head_id, unit_name, unit_category, status)
+select h.id, 'Unit ' || u, (array['Rescue', 'Escort', 'Medical', 'ResourceCollector'])[1 + u %% 4],
+       case when u %% 3 = 0 then 'Busy' else 'Free' end
+from public.users h cross join generate_series(1, 15) u where h.role = 'emergency';
+
+insert into public.emergency_notifications (request_id, gov_id, head_id, status, created_at)
+select r.id, (select id from public.users where role = 'government' limit 1), h.id,
+       case when r.id %% 4 = 0 then 'Acknowledged' else 'Pending' end, r.timestamp
+from public.requests r cross join lateral (
+  select id from public.users where role = 'emergency' order by id offset r.id %% 10 limit 1
+) h;
+
+insert into public.emergency_assignments (request_id, team_name, team_type, team_lead_id, status, assigned_at)
+select n.request_id, 'Unit ' || n.id, 'Rescue', n.head_id, 'Assigned', n.created_at
+from public.emergency_notifications n where n.status = 'Acknowledged';
+
+insert into public.emergency_updates (assignment_id, author_id, reached, message, created_at)
+select a.id, a.team_lead_id, u %% 2 = 0, 'Update ' || u, a.assigned_at + (u || ' minutes')::interval
+from public.emergency_assignments a cross join generate_series(1, 8) u;
+
+insert into public.donations (user_id, amount, method, timestamp)
+select (select id from bench_user_ids where n = 1 + (g::bigint * 104729) %% %(users)s), 100, 'upi',
+       now() - (g || ' seconds')::interval
+from generate_series(1, %(donations)s) g;
+
+insert into public.medical_requests (user_id, request_type, description, created_at)
+select (select id from bench_user_ids where n = 1 + (g::bigint * 15485863) %% %(users)s), 'First aid', 'Synthetic',
+       now() - (g || ' seconds')::interval
+from generate_series(1, %(donations)s) g;
+"""
+
+# Parameters picked from the loaded data so every query has a real target
+SAMPLES_SQL = {
+    "phone": "select phone from public.users where role = 'user' order by created_at limit 1 offset 1000",
+    "user_id": "select user_id from public.incidents group by user_id order by count(*) desc limit 1",
+    "head_id": "select head_id from public.emergency_notifications group by head_id order by count(*) desc limit 1",
+    "lead_id": "select team_lead_id from public.emergency_assignments group by team_lead_id order by count(*) desc limit 1",
+    "assignment_ids": "select array_agg(id) from (select id from public.emergency_assignments order by assigned_at desc limit 100) a",
+    "request_id": "select request_id from public.emergency_notifications order by created_at desc limit 1",
+    "cursor_ts": "select timestamp from public.incidents order by timestamp desc nulls last, id desc offset 5000 limit 1",
+    "cursor_id": "select id from public.incidents order by timestamp desc nulls last, id desc offset 5000 limit 1",
+}
+
+# (name, route, SQL equivalent of the PostgREST query the route issues)
+QUERIES = [
+    ("signin_phone", "signin", "select email from public.users where phone = %(phone)s limit 1"),
+    ("user_incidents", "user_dashboard",
+     "select * from public.incidents where user_id = %(user_id)s order by timestamp desc"),
+    ("user_donations", "user_dashboard",
+     "select * from public.donations where user_id = %(user_id)s order by timestamp desc"),
+    ("recent_incidents", "admin_dashboard",
+     "select * from public.incidents order by timestamp desc nulls last limit 10"),
+    ("incidents_keyset_page", "admin_data_view",
+     "select * from public.incidents where (timestamp < %(cursor_ts)s or (timestamp = %(cursor_ts)s and id < %(cursor_id)s)"
+     " or timestamp is null) order by timestamp desc nulls last, id desc limit 51"),
+    ("recent_requests", "government_dashboard",
+     "select * from public.requests order by timestamp desc limit 50"),
+    ("recent_allocations", "government_dashboard",
+     "select * from public.team_allocations order by assigned_at desc limit 50"),
+    ("head_notifications", "emergency_dashboard",
+     "select * from public.emergency_notifications where head_id = %(head_id)s order by created_at desc"),
+    ("lead_assignments", "emergency_dashboard",
+     "select * from public.emergency_assignments where team_lead_id = %(lead_id)s order by assigned_at desc"),
+    ("head_units", "emergency_dashboard",
+     "select * from public.emergency_units where head_id = %(head_id)s order by unit_name"),
+    ("latest_updates", "emergency_dashboard",
+     "select * from public.emergency_updates where assignment_id = any(%(assignment_ids)s)"
+     " order by assignment_id, created_at desc, id desc limit 1000"),
+    ("notification_for_request", "head_assign_unit",
+     "select id from public.emergency_notifications where request_id = %(request_id)s and head_id = %(head_id)s"),
+    ("emergency_heads", "notify_emergency_head",
+     "select id from public.users where is_emergency_head"),
+    ("emergency_role", "notify_emergency_head",
+     "select id from public.users where role = 'emergency'"),
+]
+
+
+def schema_indexes(schema_sql):
+    """``{name: create statement}`` for every secondary index in the schema"""
+    return {m.group(1): m.group(0) for m in INDEX_RE.finditer(schema_sql)}
+
+
+def connect(dsn):
+    try:
+        import psycopg2
+    except ImportError:
+        raise SystemExit("❌ benchmark_indexes.py needs psycopg2: pip install psycopg2-binary")
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    return conn
+
+
+def load(conn, schema_sql, scale, reload=False):
+    with conn.cursor() as cur:
+        cur.execute("select to_regclass('public.incidents') is not null")
+        exists = cur.fetchone()[0]
+        if exists and not reload:
+            cur.execute("select count(*) from public.incidents")
+            if cur.fetchone()[0]:
+                print("ℹ️ Reusing the data already loaded (pass --reload to start over)")
+                return
+        if exists:
+            cur.execute("drop schema public cascade; drop schema if exists auth cascade;")
+        cur.execute(AUTH_STUB)
+        cur.execute(schema_sql)
+        started = time.monotonic()
+        print(f"📦 Loading {scale['incidents']:,} incidents, {scale['users']:,} users...")
+        cur.execute(SEED_SQL, scale)
+        print(f"✅ Loaded in {time.monotonic() - started:.1f}s")
+
+
+def set_indexes(conn, indexes, present):
+    with conn.cursor() as cur:
+        for name, statement in indexes.items():
+            cur.execute(statement if present else f"drop index if exists public.{name}")
+        cur.execute("analyze")
+
+
+def samples(conn):
+    values = {}
+    with conn.cursor() as cur:
+        for key, sql in SAMPLES_SQL.items():
+            cur.execute(sql)
+            row = cur.fetchone()
+            values[key] = row[0] if row else None
+    return values
+
+
+def explain(conn, sql, params, repeat):
+    """Median execution time (ms) and the top plan node over ``repeat`` runs"""
+    times, node = [], None
+    with conn.cursor() as cur:
+        for _ in range(repeat):
+            cur.execute("explain (analyze, buffers, format json) " + sql, params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            times.append(plan[0]["Execution Time"])
+            node = _describe(plan[0]["Plan"])
+    return statistics.median(times), node
+
+
+def _describe(plan):
+    # Skip Limit/Sort wrappers down to the node that actually reads the table
+    while plan.get("Node Type") in ("Limit", "Sort", "Incremental Sort", "Gather", "Gather Merge") and plan.get("Plans"):
+        plan = plan["Plans"][0]
+    name = plan.get("Node Type", "?")
+    if plan.get("Index Name"):
+        name += f" ({plan['Index Name']})"
+    return name
+
+
+def run(conn, indexes, params, repeat, present):
+    set_indexes(conn, indexes, present)
+    return {name: explain(conn, sql, params, repeat) for name, _, sql in QUERIES}
+
+
+def report(before, after):
+    print(f"\n{'query':<26} {'route':<22} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan after")
+    for name, route, _ in QUERIES:
+        before_ms, _ = before[name]
+        after_ms, node = after[name]
+        speedup = before_ms / after_ms if after_ms else float("inf")
+        print(f"{name:<26} {route:<22} {before_ms:>10.2f} {after_ms:>10.2f} {speedup:>7.1f}x  {node}")
+    print("\nPlans before:")
+    for name, _, _ in QUERIES:
+        print(f"  {name:<26} {before[name][1]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the hot route queries with and without the schema's indexes")
+    parser.add_argument("--dsn", default=os.environ.get("BENCH_DATABASE_URL", "postgresql://postgres@localhost/disaster_bench"))
+    parser.add_argument("--schema", default=SCHEMA_PATH)
+    parser.add_argument("--incidents", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--reload", action="store_true", help="drop and reload the benchmark data")
+    args = parser.parse_args(argv)
+
+    with open(args.schema, encoding="utf-8") as f:
+        schema_sql = f.read()
+    indexes = schema_indexes(schema_sql)
+    scale = {
+        "incidents": args.incidents,
+        "users": max(args.incidents // 10, 5000),
+        "requests": max(args.incidents // 20, 1),
+        "donations": max(args.incidents // 5, 1),
+    }
+
+    conn = connect(args.dsn)
+    try:
+        load(conn, schema_sql, scale, args.reload)
+        params = samples(conn)
+        print(f"🔎 {len(QUERIES)} queries x {args.repeat} runs, {len(indexes)} indexes from {os.path.basename(args.schema)}")
+        before = run(conn, indexes, params, args.repeat, present=False)
+        after = run(conn, indexes, params, args.repeat, present=True)
+    finally:
+        conn.close()
+    report(before, after)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Offline route load test using the in-process fake Supabase backend.
+
+Seeds fake_supabase.FakeSupabaseClient with synthetic users, incidents,
+requests, units and updates, then drives the app's data routes through
+Flask's test client with a grid of thread counts. Reports throughput,
+latency percentiles, Supabase round trips per request and error flashes for
+each route. Every fake query sleeps ``--latency`` (+ up to ``--jitter``)
+seconds, so round trips cost what they would against a remote project.
+
+    python benchmark_routes.py --latency 0.03 --jitter 0.01
+    python benchmark_routes.py --routes admin_dashboard emergency_dashboard --threads 1 8 32
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+PASSWORD = "load-test-password"
+
+# name -> (method, path, session role or None, form data built from the seeded ids)
+ROUTES = {
+    "signin": ("POST", "/signin", None, lambda ids: {"email_or_phone": ids["user_phone"], "password": PASSWORD}),
+    "dashboard": ("GET", "/dashboard", "user", None),
+    "view_data": ("GET", "/view_data", "user", None),
+    "view_donations": ("GET", "/view_data?type=donations", "user", None),
+    "announcements": ("GET", "/announcements", "user", None),
+    "report_incident": ("POST", "/report_incident", "user", lambda ids: {
+        "location": "Load test", "pincode": "302001", "description": "Synthetic incident"}),
+    "admin_dashboard": ("GET", "/admin_dashboard", "admin", None),
+    "admin_data_view": ("GET", "/admin/data_view", "admin", None),
+    "export_incidents": ("GET", "/admin/data_view/export/incidents", "admin", None),
+    "forward_incident": ("POST", "/forward_incident", "admin", lambda ids: {"incident_id": ids["incident_id"]}),
+    "government_dashboard": ("GET", "/government_dashboard", "government", None),
+    "notify_emergency_head": ("POST", "/notify_emergency_head", "government", lambda ids: {"request_id": ids["request_id"]}),
+    "emergency_dashboard": ("GET", "/emergency_dashboard", "emergency", None),
+    "toggle_unit_status": ("POST", "/toggle_unit_status", "emergency", lambda ids: {"unit_id": ids["unit_id"]}),
+}
+
+
+def seed(fake, users=500, incidents=5000, heads=3):
+    """Fill the fake backend; returns the session and form ids the routes use"""
+    now = datetime.now(timezone.utc)
+    accounts = {}
+    data = {"auth.users": [], "users": []}
+
+    def account(n, role, is_head=False):
+        email = f"{role}{n}@example.com"
+        user_id = f"00000000-0000-4000-8000-{n:012d}"
+        data["auth.users"].append({"id": user_id, "email": email, "password": PASSWORD,
+                                   "user_metadata": {"name": f"{role.title()} {n}", "role": role}})
+        data["users"].append({"id": user_id, "name": f"{role.title()} {n}", "email": email, "phone": f"9{n:09d}",
+                              "role": role, "is_emergency_head": is_head, "created_at": now - timedelta(minutes=n)})
+        accounts.setdefault(role, []).append((user_id, email))
+
+    account(1, "admin")
+    account(2, "government")
+    for n in range(heads):
+        account(10 + n, "emergency", is_head=True)
+    for n in range(users):
+        account(1000 + n, "user")
+    admin, government = accounts["admin"][0][0], accounts["government"][0][0]
+    head_ids = [user_id for user_id, _ in accounts["emergency"]]
+    user_ids = [user_id for user_id, _ in accounts["user"]]
+
+    data["incidents"] = [{"user_id": user_ids[i % len(user_ids)], "location": f"Ward {i % 97}, Jaipur", "pincode": "302001",
+                          "description": f"Synthetic incident {i}", "status": "pending" if i % 10 == 0 else "resolved",
+                          "timestamp": now - timedelta(seconds=37 * i)} for i in range(incidents)]
+    data["donations"] = [{"user_id": user_ids[i % len(user_ids)], "amount": 100 + i % 900, "method": "upi",
+                          "timestamp": now - timedelta(seconds=53 * i)} for i in range(incidents // 2)]
+    data["medical_requests"] = [{"user_id": user_ids[i % len(user_ids)], "request_type": "First aid", "urgency": "high",
+                                 "created_at": now - timedelta(seconds=71 * i)} for i in range(incidents // 4)]
+    data["weather_data"] = [{"location": f"City {i}", "temperature": 30 + i % 15, "humidity": 60, "wind_speed": 12,
+                             "weather_condition": "Clear", "is_extreme": i % 10 == 0,
+                             "fetched_at": now - timedelta(minutes=i)} for i in range(100)]
+    data["announcements"] = [{"admin_id": admin, "title": f"Announcement {i}", "description": "Synthetic",
+                              "timestamp": now - timedelta(hours=i)} for i in range(50)]
+    request_count = max(incidents // 20, 1)
+    data["requests"] = [{"admin_id": admin, "incident_id": 1 + i * 20 % incidents, "status": "pending",
+                         "timestamp": now - timedelta(minutes=i)} for i in range(request_count)]
+    data["team_allocations"] = [{"gov_id": government, "request_id": i + 1, "team_name": f"Team {i}"}
+                                for i in range(0, request_count, 3)]
+    data["emergency_notifications"] = [{"request_id": i + 1, "gov_id": government, "head_id": head}
+                                       for i in range(request_count) for head in head_ids]
+    data["emergency_units"] = [{"head_id": head, "unit_name": f"Unit {h}-{u}", "unit_category": "Rescue"}
+                               for h, head in enumerate(head_ids) for u in range(15)]
+    data["emergency_assignments"] = [{"request_id": i + 1, "team_name": f"Unit {i}", "team_type": "Rescue",
+                                      "team_lead_id": head_ids[i % len(head_ids)]} for i in range(0, request_count, 2)]
+    data["emergency_updates"] = [{"assignment_id": a + 1, "author_id": head_ids[a % len(head_ids)], "message": f"Update {u}"}
+                                 for a in range(len(data["emergency_assignments"])) for u in range(5)]
+    fake.load(data)
+
+    return {
+        "roles": {role: entries[0] for role, entries in accounts.items()},
+        "user_phone": "9000001000",
+        "incident_id": 1,
+        "request_id": 1,
+        "unit_id": 1,
+    }
+
+
+def run_route(app, fake, name, ids, threads, total, flashes):
+    method, path, role, form = ROUTES[name]
+    per_thread = max(total // threads, 1)
+    latencies, statuses = [], []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        if role:
+            user_id, email = ids["roles"][role]
+            with client.session_transaction() as sess:
+                sess.update(user="Load", user_id=user_id, user_email=email, user_role=role)
+        mine = []
+        for _ in range(per_thread):
+            if role is None:
+                client = app.test_client()  # sign in from a fresh session every time
+            started = time.perf_counter()
+            resp = client.open(path, method=method, data=form(ids) if form else None)
+            resp.get_data()
+            mine.append((time.perf_counter() - started, resp.status_code))
+        with lock:
+            for seconds, status in mine:
+                latencies.append(seconds)
+                statuses.append(status)
+
+    flashes.clear()
+    calls_before = fake.stats["calls"]
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    seconds = time.perf_counter() - started
+    count = len(latencies)
+    latencies.sort()
+    return {
+        "route": name,
+        "threads": threads,
+        "requests": count,
+        "rps": count / seconds if seconds else 0.0,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[min(count - 1, int(count * 0.95))] * 1000,
+        "round_trips": (fake.stats["calls"] - calls_before) / count,
+        "errors": sum(1 for s in statuses if s >= 500) + len(flashes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", nargs="+", choices=sorted(ROUTES), default=list(ROUTES))
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=80, help="requests per route and thread count")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per fake Supabase round trip")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--incidents", type=int, default=5000)
+    parser.add_argument("--heads", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Before the app is imported: no live project, no network-bound background workers
+    os.environ["SUPABASE_BACKEND"] = "fake"
+    os.environ.setdefault("WEATHER_PROVIDER", "replay")
+    os.environ.setdefault("WEATHER_ALERT_SCHEDULER_ENABLED", "false")
+    os.environ.setdefault("SHELTER_INDEX_REFRESH_INTERVAL", "0")
+    os.environ.setdefault("OVERPASS_PREFETCH_INTERVAL", "0")
+    os.environ.setdefault("SLOW_QUERY_MS", "60000")
+
+    import app as web
+    from flask import message_flashed
+    from fake_supabase import FakeSupabaseClient
+    from metrics import InstrumentedClient
+
+    fake = FakeSupabaseClient(latency=args.latency, jitter=args.jitter, seed=args.seed)
+    started = time.perf_counter()
+    ids = seed(fake, users=args.users, incidents=args.incidents, heads=args.heads)
+    print(f"📦 Seeded {args.users} users, {args.incidents} incidents in {time.perf_counter() - started:.1f}s")
+    web.supabase = InstrumentedClient(fake)
+
+    flashes = []
+
+    def record_flash(sender, message, category, **extra):
+        if category in ("danger", "warning"):
+            flashes.append(message)
+
+    message_flashed.connect(record_flash, web.app)
+
+    print(f"📊 Route load test: latency {args.latency * 1000:.0f} ms ±{args.jitter * 1000:.0f} ms per round trip, "
+          f"{args.requests} requests per run")
+    print(f"{'route':<24} {'threads':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'trips':>6} {'errors':>6}")
+    for name in args.routes:
+        for threads in args.threads:
+            r = run_route(web.app, fake, name, ids, threads, args.requests, flashes)
+            print(f"{r['route']:<24} {r['threads']:>7} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+                  f"{r['round_trips']:>6.1f} {r['errors']:>6}")
+            if flashes:
+                print(f"   ⚠ {flashes[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Offline weather benchmark using the replay provider.
+
+Runs the monitored-city scan against recorded wttr.in payloads with simulated
+latency, errors and 429s, for a grid of concurrency and retry/backoff settings.
+With ``--shards`` it instead reports sharded (multi-process) scan completion
+time as a function of shard count, next to a single in-process scan under the
+same per-scanner rate and concurrency limits. With ``--reconcile`` it times the app's
+weather-alert reconciler against that many alert announcements held in the
+in-process fake Supabase backend.
+
+    python benchmark_weather.py --latency 0.3 --throttle-rate 0.1 --error-rate 0.05
+    python benchmark_weather.py --locations 750 --shards 1 2 4 8
+    python benchmark_weather.py --reconcile 50 200 --db-latency 0.03
+"""
+import argparse
+import os
+import time
+
+from monitored_locations import load_locations_file
+from weather_monitor import scan_sharded
+from weather_providers import ReplayWeatherProvider, WttrProvider
+from weather_rules import classify
+from weather_scanner import scan_locations
+
+
+def run_scan(locations, concurrency, retries, backoff, rate_per_host, args):
+    provider = ReplayWeatherProvider(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_requests_per_second=args.upstream_limit,
+        seed=args.seed,
+    )
+    start_time = time.perf_counter()
+    readings = scan_locations(
+        locations,
+        provider=provider,
+        concurrency=concurrency,
+        rate_per_host=rate_per_host,
+        retries=retries,
+        backoff=backoff,
+        deadline=args.deadline,
+    )
+    classify(readings)
+    duration = time.perf_counter() - start_time
+    return {
+        "concurrency": concurrency,
+        "retries": retries,
+        "backoff": backoff,
+        "seconds": duration,
+        "ok": len(readings),
+        "extreme": sum(1 for r in readings if r["is_extreme"]),
+        **provider.stats,
+    }
+
+
+def run_sharded(locations, shards, rate_per_host, args):
+    provider_spec = {
+        "name": "replay",
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "retries": args.retries[0],
+        "backoff": args.backoff[0],
+    }
+    start_time = time.perf_counter()
+    readings = scan_sharded(
+        locations,
+        shards=shards,
+        provider_spec=provider_spec,
+        concurrency=args.shard_concurrency,
+        rate_per_host=rate_per_host,
+        shard_rate_share=args.shard_rate_share,
+        retries=args.retries[0],
+        backoff=args.backoff[0],
+        deadline=args.deadline,
+    )
+    return time.perf_counter() - start_time, len(readings)
+
+
+def run_reconcile(web, locations, alerts, args):
+    from fake_supabase import FakeSupabaseClient
+
+    fake = FakeSupabaseClient(latency=args.db_latency, seed=args.seed)
+    admin_id = "00000000-0000-4000-8000-000000000001"
+    names = [f"{locations[i % len(locations)]} #{i}" for i in range(alerts)]
+    fake.load({
+        "auth.users": [{"id": admin_id, "email": "admin@example.com", "password": "benchmark"}],
+        "users": [{"id": admin_id, "name": "Admin", "email": "admin@example.com", "phone": "9000000001", "role": "admin"}],
+        "weather_data": [{"location": name, "temperature": 45, "humidity": 20, "wind_speed": 10,
+                          "weather_condition": "Sunny", "is_extreme": True} for name in names],
+        "announcements": [{"admin_id": admin_id, "title": f"Extreme Weather Alert - {name}", "description": "Synthetic",
+                           "is_weather_alert": True, "weather_data_id": i + 1} for i, name in enumerate(names)],
+    })
+    provider = ReplayWeatherProvider(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_requests_per_second=args.upstream_limit,
+        seed=args.seed,
+        retries=args.retries[0],
+        backoff=args.backoff[0],
+    )
+    web.supabase = fake
+    web.weather_provider = provider
+    web.weather_cache.invalidate()
+    start_time = time.perf_counter()
+    web.check_and_update_weather_alerts()
+    duration = time.perf_counter() - start_time
+    round_trips = fake.stats["calls"]
+    return {
+        "alerts": alerts,
+        "seconds": duration,
+        "removed": alerts - len(fake.table("announcements").select("id").eq("is_weather_alert", True).execute().data),
+        "round_trips": round_trips,
+        **provider.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=0, help="repeat the city list up to this many locations")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-limit", type=float, default=None, help="simulated upstream requests/second before 429")
+    parser.add_argument("--rate-per-host", type=float, default=None,
+                        help="scanner rate budget (0 = unlimited; default unlimited, or wttr.in's budget with --shards)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 25])
+    parser.add_argument("--retries", type=int, nargs="+", default=[2])
+    parser.add_argument("--backoff", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--shards", type=int, nargs="+", default=None, help="benchmark sharded scans with these shard counts")
+    parser.add_argument("--shard-concurrency", type=int, default=10, help="requests in flight per scanner (--shards)")
+    parser.add_argument("--shard-rate-share", type=float, default=1.0, help="fraction of the rate budget per shard (--shards)")
+    parser.add_argument("--reconcile", type=int, nargs="+", default=None, help="benchmark the alert reconciler with these alert counts")
+    parser.add_argument("--db-latency", type=float, default=0.02, help="seconds per fake Supabase round trip (--reconcile)")
+    parser.add_argument("--deadline", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    locations = load_locations_file()
+    if args.locations > len(locations):
+        locations = [f"{locations[i % len(locations)]} #{i}" for i in range(args.locations)]
+
+    print(f"📊 Replay benchmark: {len(locations)} locations, latency {args.latency}s ±{args.jitter}s, "
+          f"errors {args.error_rate:.0%}, 429s {args.throttle_rate:.0%}")
+    if args.shards:
+        # Both sides run under the limits a real scan would: wttr.in's per-host budget unless overridden
+        rate_per_host = WttrProvider.rate_per_host if args.rate_per_host is None else args.rate_per_host
+        print(f"Per-scanner concurrency {args.shard_concurrency}, rate budget {f'{rate_per_host:g}/s' if rate_per_host else 'unlimited'} "
+              f"per host, {args.shard_rate_share:g} of it per shard")
+        print(f"{'shards':>8} {'seconds':>8} {'ok':>5} {'loc/s':>7}")
+        r = run_scan(locations, args.shard_concurrency, args.retries[0], args.backoff[0], rate_per_host, args)
+        print(f"{'in-proc':>8} {r['seconds']:>8.2f} {r['ok']:>5} {len(locations) / r['seconds']:>7.1f}")
+        for shards in args.shards:
+            seconds, ok = run_sharded(locations, shards, rate_per_host, args)
+            print(f"{shards:>8} {seconds:>8.2f} {ok:>5} {len(locations) / seconds:>7.1f}")
+        return
+
+    if args.reconcile:
+        # Before the app is imported: fake backend, no background workers
+        os.environ["SUPABASE_BACKEND"] = "fake"
+        os.environ.setdefault("WEATHER_ALERT_SCHEDULER_ENABLED", "false")
+        os.environ.setdefault("SHELTER_INDEX_REFRESH_INTERVAL", "0")
+        os.environ.setdefault("OVERPASS_PREFETCH_INTERVAL", "0")
+        import app as web
+
+        print(f"Alert reconciler, fake Supabase latency {args.db_latency}s per round trip")
+        print(f"{'alerts':>6} {'seconds':>8} {'removed':>7} {'trips':>6} {'calls':>6} {'503':>5} {'429':>5}")
+        for alerts in args.reconcile:
+            r = run_reconcile(web, locations, alerts, args)
+            print(f"{r['alerts']:>6} {r['seconds']:>8.2f} {r['removed']:>7} {r['round_trips']:>6} "
+                  f"{r['calls']:>6} {r['errors']:>5} {r['throttled']:>5}")
+        return
+
+    print(f"{'conc':>5} {'retries':>7} {'backoff':>7} {'seconds':>8} {'ok':>5} {'extreme':>7} {'calls':>6} {'503':>5} {'429':>5}")
+    for concurrency in args.concurrency:
+        for retries in args.retries:
+            for backoff in args.backoff:
+                r = run_scan(locations, concurrency, retries, backoff, args.rate_per_host, args)
+                print(f"{r['concurrency']:>5} {r['retries']:>7} {r['backoff']:>7} {r['seconds']:>8.2f} {r['ok']:>5} "
+                      f"{r['extreme']:>7} {r['calls']:>6} {r['errors']:>5} {r['throttled']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,10 +16,105 @@ class Config:
     # Supabase Configuration
     SUPABASE_URL = os.environ.get('SUPABASE_URL', '')
     SUPABASE_KEY = os.environ.get('SUPABASE_KEY', '')
+    # 'supabase' (the project above) or 'fake' (in-process tables from supabase_schema.sql, for offline load tests)
+    SUPABASE_BACKEND = os.environ.get('SUPABASE_BACKEND', 'supabase').lower()
+    FAKE_SUPABASE_LATENCY = float(os.environ.get('FAKE_SUPABASE_LATENCY', '0'))
+    FAKE_SUPABASE_JITTER = float(os.environ.get('FAKE_SUPABASE_JITTER', '0'))
+    FAKE_SUPABASE_SEED = os.environ.get('FAKE_SUPABASE_SEED', '')
     
     # Weather API Configuration (Optional)
     WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY', '')
     
+    # Weather provider: 'wttr' (live wttr.in) or 'replay' (recorded payloads, for offline benchmarks)
+    WEATHER_PROVIDER = os.environ.get('WEATHER_PROVIDER', 'wttr')
+    WEATHER_FETCH_RETRIES = int(os.environ.get('WEATHER_FETCH_RETRIES', '3'))
+    WEATHER_FETCH_BACKOFF = float(os.environ.get('WEATHER_FETCH_BACKOFF', '0.5'))
+    WEATHER_REPLAY_DIR = os.environ.get('WEATHER_REPLAY_DIR', '')
+    WEATHER_REPLAY_LATENCY = float(os.environ.get('WEATHER_REPLAY_LATENCY', '0'))
+    WEATHER_REPLAY_ERROR_RATE = float(os.environ.get('WEATHER_REPLAY_ERROR_RATE', '0'))
+    WEATHER_REPLAY_THROTTLE_RATE = float(os.environ.get('WEATHER_REPLAY_THROTTLE_RATE', '0'))
+    
+    # Alert thresholds and severities (defaults to weather_rules.json)
+    WEATHER_RULES_FILE = os.environ.get('WEATHER_RULES_FILE', '')
+    
+    # Shelter search: radius and the in-memory spatial index over the shelters table
+    SHELTER_SEARCH_RADIUS_KM = float(os.environ.get('SHELTER_SEARCH_RADIUS_KM', '10'))
+    SHELTER_PAGE_SIZE = int(os.environ.get('SHELTER_PAGE_SIZE', '20'))
+    SHELTER_MAX_PAGE_SIZE = int(os.environ.get('SHELTER_MAX_PAGE_SIZE', '200'))
+    SHELTER_INDEX_CELL_DEG = float(os.environ.get('SHELTER_INDEX_CELL_DEG', '0.1'))
+    SHELTER_INDEX_REFRESH_INTERVAL = int(os.environ.get('SHELTER_INDEX_REFRESH_INTERVAL', '60'))
+    SHELTER_INDEX_FULL_RELOAD_INTERVAL = int(os.environ.get('SHELTER_INDEX_FULL_RELOAD_INTERVAL', '3600'))
+    
+    # Overpass (OpenStreetMap) shelter results, cached by geohash tile; prefetch around pending incidents if > 0
+    OVERPASS_TILE_PRECISION = int(os.environ.get('OVERPASS_TILE_PRECISION', '5'))
+    OVERPASS_TILE_TTL = int(os.environ.get('OVERPASS_TILE_TTL', '21600'))
+    OVERPASS_MAX_TILES = int(os.environ.get('OVERPASS_MAX_TILES', '20000'))
+    OVERPASS_PREFETCH_INTERVAL = int(os.environ.get('OVERPASS_PREFETCH_INTERVAL', '0'))
+    
+    # Offline OSM shelters imported with osm_shelters.py; 'auto' uses them instead of Overpass once imported
+    OSM_SHELTER_DB_PATH = os.environ.get('OSM_SHELTER_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'osm_shelters.sqlite3'))
+    SHELTER_OSM_SOURCE = os.environ.get('SHELTER_OSM_SOURCE', 'auto').lower()
+    
+    # Geocoding cache (Nominatim allows about one request per second)
+    GEOCODE_CACHE_PATH = os.environ.get('GEOCODE_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'geocode_cache.sqlite3'))
+    GEOCODE_CACHE_MAX_ENTRIES = int(os.environ.get('GEOCODE_CACHE_MAX_ENTRIES', '4096'))
+    GEOCODE_MIN_INTERVAL = float(os.environ.get('GEOCODE_MIN_INTERVAL', '1.0'))
+    GEOCODE_NEGATIVE_TTL = int(os.environ.get('GEOCODE_NEGATIVE_TTL', '86400'))
+    
+    # Weather Cache Configuration (seconds / entries)
+    WEATHER_CACHE_TTL = int(os.environ.get('WEATHER_CACHE_TTL', '300'))
+    WEATHER_CACHE_STALE_TTL = int(os.environ.get('WEATHER_CACHE_STALE_TTL', '1800'))
+    WEATHER_CACHE_MAX_ENTRIES = int(os.environ.get('WEATHER_CACHE_MAX_ENTRIES', '256'))
+    
+    # Background weather-alert reconciliation (disable to run weather_scheduler.py separately)
+    WEATHER_ALERT_SCHEDULER_ENABLED = os.environ.get('WEATHER_ALERT_SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    WEATHER_ALERT_CHECK_INTERVAL = int(os.environ.get('WEATHER_ALERT_CHECK_INTERVAL', '300'))
+    
+    # Bulk weather scanner limits
+    WEATHER_SCAN_CONCURRENCY = int(os.environ.get('WEATHER_SCAN_CONCURRENCY', '10'))
+    # Requests/second per upstream host; unset uses the provider's own budget (wttr.in: 20)
+    WEATHER_SCAN_RATE_PER_HOST = float(os.environ['WEATHER_SCAN_RATE_PER_HOST']) if os.environ.get('WEATHER_SCAN_RATE_PER_HOST') else None
+    WEATHER_SCAN_REQUEST_TIMEOUT = float(os.environ.get('WEATHER_SCAN_REQUEST_TIMEOUT', '8'))
+    WEATHER_SCAN_DEADLINE = float(os.environ.get('WEATHER_SCAN_DEADLINE', '60'))
+    # Readings saved during a scan are classified by the alert rules in batches at most this many seconds apart
+    WEATHER_SCAN_CLASSIFY_INTERVAL = float(os.environ.get('WEATHER_SCAN_CLASSIFY_INTERVAL', '0.5'))
+    # Split scans of at least WEATHER_SCAN_SHARD_MIN_LOCATIONS cities across this many worker processes
+    WEATHER_SCAN_SHARDS = int(os.environ.get('WEATHER_SCAN_SHARDS', '1'))
+    WEATHER_SCAN_SHARD_MIN_LOCATIONS = int(os.environ.get('WEATHER_SCAN_SHARD_MIN_LOCATIONS', '200'))
+    # Fraction of the per-host rate each shard may use (1 = every shard gets the full budget)
+    WEATHER_SCAN_SHARD_RATE_SHARE = float(os.environ.get('WEATHER_SCAN_SHARD_RATE_SHARE', '1'))
+    
+    # Incremental weather scans (seconds); interval 0 leaves periodic scanning off
+    MONITORED_LOCATIONS_FILE = os.environ.get('MONITORED_LOCATIONS_FILE', '')
+    WEATHER_SCAN_INTERVAL = int(os.environ.get('WEATHER_SCAN_INTERVAL', '0'))
+    WEATHER_SCAN_FRESH_WINDOW = int(os.environ.get('WEATHER_SCAN_FRESH_WINDOW', '1800'))
+    WEATHER_SCAN_ALERT_WINDOW = int(os.environ.get('WEATHER_SCAN_ALERT_WINDOW', '300'))
+    
+    # weather_data retention: raw readings older than this are pruned after being rolled up
+    WEATHER_RETENTION_DAYS = int(os.environ.get('WEATHER_RETENTION_DAYS', '30'))
+    WEATHER_PRUNE_BATCH_SIZE = int(os.environ.get('WEATHER_PRUNE_BATCH_SIZE', '5000'))
+    WEATHER_MAINTENANCE_INTERVAL = int(os.environ.get('WEATHER_MAINTENANCE_INTERVAL', '3600'))
+    
+    # Dashboards run their independent queries concurrently (per request, up to this many threads), waiting at most this many seconds
+    DASHBOARD_QUERY_WORKERS = int(os.environ.get('DASHBOARD_QUERY_WORKERS', '8'))
+    DASHBOARD_QUERY_DEADLINE = float(os.environ.get('DASHBOARD_QUERY_DEADLINE', '5'))
+    
+    # Instrumentation: Supabase/HTTP call metrics at /metrics (Bearer METRICS_TOKEN, or an admin session), slow calls logged
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '500'))
+    
+    # Seconds the emergency-head directory is cached (also cleared when users or units change here)
+    EMERGENCY_HEADS_TTL = int(os.environ.get('EMERGENCY_HEADS_TTL', '300'))
+    # Seconds between checks of emergency_heads_version, which catches role/head changes made outside the app
+    EMERGENCY_HEADS_CHECK_INTERVAL = float(os.environ.get('EMERGENCY_HEADS_CHECK_INTERVAL', '30'))
+    
+    # Admin data view: rows per page, and rows per chunk when streaming an export
+    ADMIN_DATA_PAGE_SIZE = int(os.environ.get('ADMIN_DATA_PAGE_SIZE', '50'))
+    ADMIN_EXPORT_CHUNK_SIZE = int(os.environ.get('ADMIN_EXPORT_CHUNK_SIZE', '1000'))
+    # Seconds the data view's (planner-estimated) table totals are cached
+    ADMIN_DATA_COUNT_TTL = int(os.environ.get('ADMIN_DATA_COUNT_TTL', '300'))
+    
     @classmethod
     def is_supabase_configured(cls):
         """Check if Supabase is properly configured"""
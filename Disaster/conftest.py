@@ -0,0 +1,49 @@
+"""
+Shared pytest fixtures: the in-process fake Supabase backend and the app wired to it.
+"""
+import importlib
+
+import pytest
+
+from fake_supabase import FakeSupabaseClient
+
+
+@pytest.fixture
+def fake():
+    """An empty fake Supabase project built from supabase_schema.sql"""
+    return FakeSupabaseClient()
+
+
+@pytest.fixture
+def add_users(fake):
+    """``add_users("admin", "emergency", ...)`` creates one public.users row per role and returns their ids"""
+    count = [0]
+
+    def add(*roles):
+        ids = []
+        for role in roles:
+            count[0] += 1
+            n = count[0]
+            user_id = f"00000000-0000-4000-8000-{n:012d}"
+            fake.load({"users": [{"id": user_id, "name": f"{role.title()} {n}", "email": f"{role}{n}@example.com",
+                                  "phone": f"9{n:09d}", "role": role, "is_emergency_head": role == "emergency"}]})
+            ids.append(user_id)
+        return ids
+
+    return add
+
+
+@pytest.fixture
+def web(fake, monkeypatch):
+    """The Flask app module talking to ``fake``, with its background workers off"""
+    # Only matters the first time app is imported; monkeypatch restores the environment afterwards
+    monkeypatch.setenv("SUPABASE_BACKEND", "fake")
+    monkeypatch.setenv("WEATHER_ALERT_SCHEDULER_ENABLED", "false")
+    monkeypatch.setenv("SHELTER_INDEX_REFRESH_INTERVAL", "0")
+    monkeypatch.setenv("OVERPASS_PREFETCH_INTERVAL", "0")
+    module = importlib.import_module("app")
+    monkeypatch.setattr(module, "supabase", fake)
+    monkeypatch.setattr(module.Config, "WEATHER_ALERT_SCHEDULER_ENABLED", False)
+    monkeypatch.setattr(module.Config, "SHELTER_INDEX_REFRESH_INTERVAL", 0)
+    monkeypatch.setattr(module.Config, "OVERPASS_PREFETCH_INTERVAL", 0)
+    return module
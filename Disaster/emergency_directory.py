@@ -0,0 +1,87 @@
+"""
+Cached directory of emergency heads.
+
+Resolves who gets notified about a request with filtered queries instead of
+reading the whole users table: explicit heads first (``is_emergency_head``), then
+users with the ``emergency`` role, then owners of emergency units. The result is
+cached for ``ttl`` seconds and invalidated when users or units change here.
+Changes made elsewhere bump the ``emergency_heads_version`` row (schema
+triggers), which is checked at most every ``check_interval`` seconds.
+"""
+import threading
+import time
+
+
+class EmergencyHeadDirectory:
+    def __init__(self, ttl=300, check_interval=30):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._head_ids = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        # Bumped by invalidate(); a resolve started in an older generation isn't cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._head_ids = None
+
+    def head_ids(self, client):
+        """Ids of the users to notify about a new request"""
+        with self._lock:
+            generation = self._generation
+            now = time.monotonic()
+            cached = self._head_ids if self._head_ids is not None and now - self._loaded_at < self.ttl else None
+            # Without the version table (older projects) only the TTL applies
+            if cached is not None and (self._version is None or now - self._checked_at < self.check_interval):
+                return list(cached)
+            cached_version = self._version
+
+        # Read before resolving, so a change made meanwhile shows up at the next check
+        version = self._read_version(client)
+        if cached is not None and version == cached_version:
+            with self._lock:
+                if self._generation == generation:
+                    self._checked_at = time.monotonic()
+            return list(cached)
+
+        head_ids = self._resolve(client)
+        # An empty result isn't cached, so the first head to sign up is picked up at once
+        with self._lock:
+            if head_ids and self._generation == generation:
+                self._head_ids = head_ids
+                self._version = version
+                self._loaded_at = self._checked_at = time.monotonic()
+        return list(head_ids)
+
+    def _read_version(self, client):
+        """The ``emergency_heads_version`` counter, or ``None`` on projects without it"""
+        try:
+            resp = client.table("emergency_heads_version").select("version").limit(1).execute()
+        except Exception as e:
+            print(f"Could not read the emergency-head version: {e}")
+            return None
+        rows = resp.data or []
+        return rows[0]["version"] if rows else 0
+
+    def _resolve(self, client):
+        try:
+            resp = client.table("users").select("id").eq("is_emergency_head", True).execute()
+            head_ids = [r["id"] for r in (resp.data or [])]
+            if head_ids:
+                return head_ids
+        except Exception as e:
+            # Projects created before the is_emergency_head column
+            print(f"Could not load explicit emergency heads: {e}")
+
+        resp = client.table("users").select("id").eq("role", "emergency").execute()
+        head_ids = [r["id"] for r in (resp.data or [])]
+        if head_ids:
+            return head_ids
+
+        # Fallback: owners of units
+        resp = client.table("emergency_units").select("head_id").execute()
+        return list(dict.fromkeys(r["head_id"] for r in (resp.data or []) if r.get("head_id")))
@@ -0,0 +1,947 @@
+"""
+In-process stand-in for the Supabase client, for offline load tests.
+
+Implements the parts of supabase-py the app uses against in-memory tables built
+from supabase_schema.sql: ``table()`` with select/insert/update/upsert/delete,
+the eq/neq/gt/gte/lt/lte/like/ilike/is_/in_/or_ filters, order/limit/range,
+``count="exact"``, embedded relations such as ``requests(incidents(location))``
+(resolved through the schema's foreign keys), ``rpc()`` for the schema's
+functions, its statement triggers and ``auth.sign_up``/``sign_in_with_password``/``sign_out``.
+
+Each ``execute()`` sleeps ``latency`` seconds (plus up to ``jitter``) like a
+network round trip, then runs under one lock; a write or function call that
+fails leaves the tables as they were. ``stats`` counts the round trips.
+Constraint violations and unknown tables/columns raise the same ``APIError``
+codes PostgREST would.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+
+from postgrest.exceptions import APIError
+
+try:
+    from supabase_auth.errors import AuthApiError
+except ImportError:  # supabase < 2.10 ships the auth client as gotrue
+    from gotrue.errors import AuthApiError
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "supabase_schema.sql")
+
+NOW = object()  # column default: now()
+
+FakeResponse = namedtuple("FakeResponse", ["data", "count"])
+FakeUser = namedtuple("FakeUser", ["id", "email", "user_metadata", "created_at"])
+FakeSession = namedtuple("FakeSession", ["access_token", "user"])
+FakeAuthResponse = namedtuple("FakeAuthResponse", ["user", "session"])
+
+_INT_TYPES = ("bigserial", "serial", "bigint", "integer", "smallint")
+_FLOAT_TYPES = ("numeric", "double", "real")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Column:
+    def __init__(self, name, type_, default=None, not_null=False):
+        self.name = name
+        self.type = type_
+        self.default = default
+        self.not_null = not_null
+
+    def normalize(self, value):
+        """Store values the way Postgres would return them through PostgREST"""
+        if value is None:
+            return None
+        try:
+            return self._convert(value)
+        except (TypeError, ValueError):
+            raise APIError({"message": f'invalid input syntax for type {self.type}: "{value}"', "code": "22P02"})
+
+    def _convert(self, value):
+        if self.type in _INT_TYPES:
+            return int(value)
+        if self.type in _FLOAT_TYPES:
+            return float(value)
+        if self.type == "boolean":
+            return value if isinstance(value, bool) else str(value).lower() in ("true", "t", "1", "yes")
+        if self.type == "timestamptz":
+            stamp = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+            if stamp.tzinfo is None:
+                stamp = stamp.replace(tzinfo=timezone.utc)
+            return stamp.astimezone(timezone.utc).isoformat()
+        return str(value)
+
+
+class TableSchema:
+    def __init__(self, name):
+        self.name = name
+        self.columns = {}
+        self.primary_key = ("id",)
+        self.serial = None
+        self.foreign_keys = {}  # column -> (referenced table, on delete cascade)
+        self.unique = []
+
+    def add_definition(self, item, if_missing=False):
+        if not item:
+            return
+        lowered = item.lower()
+        if lowered.startswith("primary key"):
+            self.primary_key = tuple(c.strip() for c in re.search(r"\((.*?)\)", item).group(1).split(","))
+            return
+        if lowered.startswith(("constraint", "unique", "check", "foreign key")):
+            return
+        name, type_ = re.match(r"(\w+)\s+(\w+)", item).groups()
+        if if_missing and name in self.columns:
+            return
+        default = None
+        match = re.search(r"\bdefault\s+('(?:[^']|'')*'|[\w.]+(?:\(\))?)", item, re.IGNORECASE)
+        if match:
+            default = _literal(match.group(1))
+        column = Column(name, type_.lower(), default, "not null" in lowered or "primary key" in lowered)
+        self.columns[name] = column
+        if "primary key" in lowered:
+            self.primary_key = (name,)
+        if column.type in ("bigserial", "serial"):
+            self.serial = name
+            column.not_null = False
+        if re.search(r"\bunique\b", lowered):
+            self.unique.append((name,))
+        ref = re.search(r"references public\.(\w+)", item, re.IGNORECASE)
+        if ref:
+            self.foreign_keys[name] = (ref.group(1), "on delete cascade" in lowered)
+
+
+def _literal(token):
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+    lowered = token.lower()
+    if lowered == "now()":
+        return NOW
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered == "null":
+        return None
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+def _split_top(text, sep=","):
+    """Split on ``sep`` outside parentheses and double quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    escaped = False
+    for ch in text:
+        if escaped:
+            current.append(ch)
+            escaped = False
+            continue
+        if ch == "\\" and quoted:
+            escaped = True
+        elif ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == sep:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append("".join(current))
+    return parts
+
+
+def load_schema(path=SCHEMA_PATH):
+    """``{table: TableSchema}`` for the public tables in supabase_schema.sql"""
+    with open(path, encoding="utf-8") as f:
+        sql = re.sub(r"--[^\n]*", "", f.read())
+    tables = {}
+    for name, body in re.findall(r"create table if not exists public\.(\w+)\s*\((.*?)\n\);", sql, re.S | re.I):
+        table = tables.setdefault(name, TableSchema(name))
+        for item in _split_top(body):
+            table.add_definition(item.strip())
+    for name, clauses in re.findall(r"alter table if exists public\.(\w+)\s+(add column.*?);", sql, re.S | re.I):
+        for item in _split_top(clauses):
+            item = re.sub(r"^add column if not exists\s+", "", item.strip(), flags=re.I)
+            if name in tables:
+                tables[name].add_definition(item, if_missing=True)
+    return tables
+
+
+# -- select strings -----------------------------------------------------------
+
+Embed = namedtuple("Embed", ["relation", "hint", "alias", "inner", "items"])
+
+
+def parse_select(columns):
+    """``select()`` string -> list of column names and ``Embed``s ("*" stays "*")"""
+    items = []
+    for raw in _split_top(columns or "*"):
+        raw = raw.strip()
+        if not raw:
+            continue
+        alias = None
+        match = re.match(r"(\w+)\s*:(?!:)\s*(.*)$", raw, re.S)
+        if match:
+            alias, raw = match.groups()
+        if "(" in raw:
+            target, inner = raw.split("(", 1)
+            relation, _, hint = target.partition("!")
+            is_inner = hint == "inner" or hint.endswith("!inner")
+            hint = hint.replace("!inner", "") if hint != "inner" else ""
+            items.append(Embed(relation.strip(), hint or None, alias, is_inner, parse_select(inner[:-1]) if inner[:-1].strip() else []))
+        else:
+            items.append((raw.split("::")[0], alias))
+    return items
+
+
+# -- filters ------------------------------------------------------------------
+
+def _like(pattern, value, flags=0):
+    regex = "^" + ".*".join(re.escape(p) for p in re.split(r"[%*]", pattern)) + "$"
+    return re.match(regex, value, flags | re.S) is not None
+
+
+def _compare(op, current, value):
+    if op == "is":
+        return current is value if value in (None, True, False) else False
+    if op == "in":
+        return current is not None and current in value
+    if current is None or value is None:
+        return False
+    if op == "eq":
+        return current == value
+    if op == "neq":
+        return current != value
+    if op == "gt":
+        return current > value
+    if op == "gte":
+        return current >= value
+    if op == "lt":
+        return current < value
+    if op == "lte":
+        return current <= value
+    if op == "like":
+        return _like(value, str(current))
+    if op == "ilike":
+        return _like(value, str(current), re.IGNORECASE)
+    raise APIError({"message": f"unsupported operator: {op}", "code": "PGRST100"})
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _parse_value(op, raw):
+    if op == "is":
+        return {"null": None, "true": True, "false": False}.get(raw.lower(), raw)
+    if op == "in":
+        return [_unquote(v) for v in _split_top(raw.strip()[1:-1])] if raw.strip() else []
+    return _unquote(raw)
+
+
+def _parse_logic(expression, negate=False, conjunction=any):
+    """PostgREST ``or=(...)`` expression -> predicate over rows"""
+    conditions = []
+    for part in _split_top(expression):
+        part = part.strip()
+        if not part:
+            continue
+        negated = part.startswith("not.")
+        if negated:
+            part = part[4:]
+        if part.startswith(("and(", "or(")):
+            kind, inner = part.split("(", 1)
+            conditions.append(_parse_logic(inner[:-1], negated, all if kind == "and" else any))
+            continue
+        column, rest = part.split(".", 1)
+        if rest.startswith("not."):
+            negated, rest = not negated, rest[4:]
+        op, _, raw = rest.partition(".")
+        conditions.append(("cond", column, op, _parse_value(op, raw), negated))
+    return ("logic", conjunction, conditions, negate)
+
+
+class FakeQuery:
+    """A table request: the operation, filters and modifiers, run by ``execute()``"""
+
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+        self._returning = "representation"
+        self._filters = []
+        self._orders = []
+        self._limit = None
+        self._offset = 0
+        self._single = None
+        self._negate_next = False
+
+    # operations
+    def select(self, *columns, count=None, head=None):
+        if self._op == "select":
+            self._columns = ",".join(columns) or "*"
+            self._count = count
+        return self
+
+    def insert(self, json, *, count=None, returning="representation", upsert=False, default_to_null=True):
+        self._op = "upsert" if upsert else "insert"
+        self._payload = json if isinstance(json, list) else [json]
+        self._count = count
+        self._returning = getattr(returning, "value", returning)
+        return self
+
+    def upsert(self, json, *, count=None, returning="representation", ignore_duplicates=False, on_conflict="", default_to_null=True):
+        self.insert(json, count=count, returning=returning, upsert=True)
+        self._on_conflict = tuple(c.strip() for c in on_conflict.split(",") if c.strip()) or None
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json, *, count=None, returning="representation"):
+        self._op = "update"
+        self._payload = dict(json)
+        self._count = count
+        self._returning = getattr(returning, "value", returning)
+        return self
+
+    def delete(self, *, count=None, returning="representation"):
+        self._op = "delete"
+        self._count = count
+        self._returning = getattr(returning, "value", returning)
+        return self
+
+    # filters
+    def _add(self, column, op, value):
+        self._filters.append(("cond", column, op, value, self._negate_next))
+        self._negate_next = False
+        return self
+
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def eq(self, column, value):
+        return self._add(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._add(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._add(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._add(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._add(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._add(column, "lte", value)
+
+    def like(self, column, pattern):
+        return self._add(column, "like", pattern)
+
+    def ilike(self, column, pattern):
+        return self._add(column, "ilike", pattern)
+
+    def is_(self, column, value):
+        return self._add(column, "is", _parse_value("is", str(value)) if isinstance(value, str) else value)
+
+    def in_(self, column, values):
+        return self._add(column, "in", list(values))
+
+    def match(self, query):
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    def filter(self, column, operator, criteria):
+        negated = operator.startswith("not.")
+        op = operator[4:] if negated else operator
+        self._filters.append(("cond", column, op, _parse_value(op, str(criteria)), negated))
+        return self
+
+    def or_(self, filters, reference_table=None):
+        self._filters.append(_parse_logic(filters))
+        return self
+
+    # modifiers
+    def order(self, column, *, desc=False, nullsfirst=None, foreign_table=None):
+        if not foreign_table:
+            self._orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        if not foreign_table:
+            self._limit = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        if not foreign_table:
+            self._offset, self._limit = start, end - start + 1
+        return self
+
+    def single(self):
+        self._single = "single"
+        return self
+
+    def maybe_single(self):
+        self._single = "maybe"
+        return self
+
+    def execute(self):
+        self._client._round_trip(f"{self._table}.{self._op}")
+        with self._client._lock:
+            if self._op == "select":
+                return self._client._run_select(self)
+            return self._client._atomic(self._client._run_write, self)
+
+
+class FakeRpc:
+    def __init__(self, client, fn, params):
+        self._client = client
+        self._fn = fn
+        self._params = params or {}
+
+    def execute(self):
+        self._client._round_trip(f"rpc.{self._fn}")
+        function = RPC_FUNCTIONS.get(self._fn)
+        if function is None:
+            raise APIError({"message": f"Could not find the function public.{self._fn} in the schema cache", "code": "PGRST202"})
+        with self._client._lock:
+            return FakeResponse(self._client._atomic(function, self._client, **self._params), None)
+
+
+class FakeAuth:
+    """Email/password accounts kept next to the tables"""
+
+    def __init__(self, client):
+        self._client = client
+        self._users = {}  # email -> (FakeUser, password hash)
+        self._session = None
+
+    @staticmethod
+    def _hash(password):
+        return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+    def create_user(self, email, password, user_metadata=None, user_id=None):
+        """Add an account without the simulated latency (for seeding)"""
+        email = email.lower()
+        with self._client._lock:
+            if email in self._users:
+                raise AuthApiError("User already registered", 422, "user_already_exists")
+            user = FakeUser(user_id or str(uuid.uuid4()), email, dict(user_metadata or {}), _now())
+            self._users[email] = (user, self._hash(password))
+        return user
+
+    def sign_up(self, credentials):
+        self._client._round_trip("auth.sign_up")
+        options = credentials.get("options") or {}
+        user = self.create_user(credentials["email"], credentials["password"], options.get("data"))
+        self._session = FakeSession(uuid.uuid4().hex, user)
+        return FakeAuthResponse(user, self._session)
+
+    def sign_in_with_password(self, credentials):
+        self._client._round_trip("auth.sign_in_with_password")
+        with self._client._lock:
+            account = self._users.get((credentials.get("email") or "").lower())
+        if account is None or account[1] != self._hash(credentials.get("password") or ""):
+            raise AuthApiError("Invalid login credentials", 400, "invalid_credentials")
+        self._session = FakeSession(uuid.uuid4().hex, account[0])
+        return FakeAuthResponse(account[0], self._session)
+
+    def sign_out(self, options=None):
+        self._client._round_trip("auth.sign_out")
+        self._session = None
+
+    def get_session(self):
+        return self._session
+
+    def get_user(self, jwt=None):
+        return FakeAuthResponse(self._session.user, self._session) if self._session else None
+
+
+class FakeSupabaseClient:
+    """Drop-in replacement for ``supabase.Client`` backed by in-memory tables"""
+
+    def __init__(self, schema_path=SCHEMA_PATH, latency=0.0, jitter=0.0, seed=0):
+        self.schema = load_schema(schema_path)
+        self.latency = latency
+        self.jitter = jitter
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._rows = {name: {} for name in self.schema}  # table -> {primary key tuple: row}
+        self._unique = {name: {columns: {} for columns in s.unique} for name, s in self.schema.items()}
+        self._sequences = Counter()
+        self.auth = FakeAuth(self)
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        return FakeRpc(self, fn, params)
+
+    def _round_trip(self, key):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats[key] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def load(self, data):
+        """Bulk-load ``{table: [rows]}`` (constraints checked, no latency). An ``auth.users``
+        entry of ``{"email", "password", "id", "user_metadata"}`` dicts creates accounts."""
+        for account in data.get("auth.users", []):
+            self.auth.create_user(account["email"], account["password"], account.get("user_metadata"), account.get("id"))
+        with self._lock:
+            for table, rows in data.items():
+                if table != "auth.users":
+                    self._insert_rows(table, rows)
+
+    # -- helpers (called with the lock held) --
+
+    def _atomic(self, run, *args, **kwargs):
+        """Run one statement; like Postgres, a failed statement leaves no rows behind"""
+        rows = {table: dict(stored) for table, stored in self._rows.items()}
+        unique = {table: {columns: dict(index) for columns, index in indexes.items()} for table, indexes in self._unique.items()}
+        try:
+            return run(*args, **kwargs)
+        except Exception:
+            self._rows.update(rows)
+            self._unique.update(unique)
+            raise
+
+    def _schema(self, table):
+        schema = self.schema.get(table)
+        if schema is None:
+            raise APIError({"message": f"Could not find the table 'public.{table}' in the schema cache", "code": "PGRST205"})
+        return schema
+
+    def _column(self, schema, name):
+        column = schema.columns.get(name)
+        if column is None:
+            raise APIError({"message": f"column {schema.name}.{name} does not exist", "code": "42703"})
+        return column
+
+    def _key(self, schema, row):
+        return tuple(row.get(c) for c in schema.primary_key)
+
+    def _normalize_filter(self, schema, node):
+        if node[0] == "logic":
+            _, conjunction, conditions, negate = node
+            return ("logic", conjunction, [self._normalize_filter(schema, c) for c in conditions], negate)
+        _, name, op, value, negate = node
+        column = self._column(schema, name)
+        if op == "in":
+            value = [column.normalize(v) for v in value]
+        elif op not in ("is", "like", "ilike"):
+            value = column.normalize(value)
+        return ("cond", name, op, value, negate)
+
+    def _matches(self, row, node):
+        if node[0] == "logic":
+            _, conjunction, conditions, negate = node
+            return conjunction(self._matches(row, c) for c in conditions) != negate
+        _, name, op, value, negate = node
+        return _compare(op, row.get(name), value) != negate
+
+    def _filtered(self, query):
+        schema = self._schema(query._table)
+        filters = [self._normalize_filter(schema, f) for f in query._filters]
+        rows = self._rows[query._table]
+        # Primary-key lookups don't scan the table
+        key_filter = next((f for f in filters if f[0] == "cond" and f[2] == "eq" and not f[4]
+                           and schema.primary_key == (f[1],)), None)
+        candidates = [rows[(key_filter[3],)]] if key_filter and (key_filter[3],) in rows else [] if key_filter else rows.values()
+        return schema, [row for row in candidates if all(self._matches(row, f) for f in filters)]
+
+    def _ordered(self, rows, orders):
+        rows = list(rows)
+        # One stable sort per key, last key first; nulls go last ascending and first descending by default
+        for column, desc, nullsfirst in reversed(orders):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=desc)
+            rows = missing + present if nullsfirst else present + missing
+        return rows
+
+    def _prepare(self, schema, values, existing=None):
+        """Validate and normalize a row being written; fills defaults on insert"""
+        row = dict(existing) if existing else {}
+        for name, value in values.items():
+            row[name] = self._column_for_write(schema, name).normalize(value)
+        if existing is None:
+            for name, column in schema.columns.items():
+                if name in row:
+                    continue
+                if name == schema.serial:
+                    self._sequences[schema.name] += 1
+                    row[name] = self._sequences[schema.name]
+                else:
+                    row[name] = _now() if column.default is NOW else column.default
+            if schema.serial:
+                self._sequences[schema.name] = max(self._sequences[schema.name], row[schema.serial])
+            row = {name: row.get(name) for name in schema.columns}
+        for name, column in schema.columns.items():
+            if column.not_null and row.get(name) is None:
+                raise APIError({"message": f'null value in column "{name}" of relation "{schema.name}" violates not-null constraint', "code": "23502"})
+        for name, (ref_table, _) in schema.foreign_keys.items():
+            value = row.get(name)
+            if value is not None and ref_table in self._rows and (value,) not in self._rows[ref_table]:
+                raise APIError({"message": f'insert or update on table "{schema.name}" violates foreign key constraint "{schema.name}_{name}_fkey"', "code": "23503"})
+        return row
+
+    def _column_for_write(self, schema, name):
+        column = schema.columns.get(name)
+        if column is None:
+            raise APIError({"message": f"Could not find the '{name}' column of '{schema.name}' in the schema cache", "code": "PGRST204"})
+        return column
+
+    def _check_unique(self, schema, row, ignore_key=None):
+        key = self._key(schema, row)
+        if key != ignore_key and key in self._rows[schema.name]:
+            raise APIError({"message": f'duplicate key value violates unique constraint "{schema.name}_pkey"', "code": "23505"})
+        for columns, index in self._unique[schema.name].items():
+            holder = index.get(tuple(row.get(c) for c in columns))
+            if holder is not None and holder != ignore_key:
+                raise APIError({"message": f'duplicate key value violates unique constraint "{schema.name}_{"_".join(columns)}_key"', "code": "23505"})
+
+    def _store(self, schema, row, old_key=None):
+        if old_key is not None:
+            self._unstore(schema, old_key)
+        key = self._key(schema, row)
+        self._rows[schema.name][key] = row
+        for columns, index in self._unique[schema.name].items():
+            values = tuple(row.get(c) for c in columns)
+            if None not in values:
+                index[values] = key
+
+    def _unstore(self, schema, key):
+        row = self._rows[schema.name].pop(key)
+        for columns, index in self._unique[schema.name].items():
+            index.pop(tuple(row.get(c) for c in columns), None)
+
+    def _find(self, schema, columns, values):
+        """The row whose ``columns`` equal those in ``values`` (the upsert conflict target)"""
+        wanted = tuple(self._column(schema, c).normalize(values.get(c)) for c in columns)
+        rows = self._rows[schema.name]
+        if columns == schema.primary_key:
+            return rows.get(wanted)
+        if columns in self._unique[schema.name]:
+            key = self._unique[schema.name][columns].get(wanted)
+            return rows.get(key) if key is not None else None
+        return next((r for r in rows.values() if tuple(r.get(c) for c in columns) == wanted), None)
+
+    def _insert_rows(self, table, payload, on_conflict=None, ignore_duplicates=False):
+        schema = self._schema(table)
+        written = []
+        for values in payload:
+            existing = self._find(schema, on_conflict, values) if on_conflict is not None else None
+            if existing is not None:
+                if ignore_duplicates:
+                    continue
+                old_key = self._key(schema, existing)
+                row = self._prepare(schema, values, existing)
+                self._check_unique(schema, row, ignore_key=old_key)
+                self._store(schema, row, old_key)
+            else:
+                row = self._prepare(schema, values)
+                self._check_unique(schema, row)
+                self._store(schema, row)
+            written.append(row)
+        return written
+
+    def _delete_rows(self, schema, doomed):
+        for row in doomed:
+            key = self._key(schema, row)
+            if key not in self._rows[schema.name]:
+                continue
+            for child in self.schema.values():
+                for column, (ref_table, cascade) in child.foreign_keys.items():
+                    if ref_table != schema.name or len(key) != 1:
+                        continue
+                    dependants = [r for r in self._rows[child.name].values() if r.get(column) == key[0]]
+                    if dependants and not cascade:
+                        raise APIError({"message": f'update or delete on table "{schema.name}" violates foreign key constraint "{child.name}_{column}_fkey" on table "{child.name}"', "code": "23503"})
+                    self._delete_rows(child, dependants)
+            self._unstore(schema, key)
+
+    def _result(self, query, rows, count=None):
+        if query._returning == "minimal":
+            rows = []
+        if query._single:
+            if len(rows) != 1 and not (query._single == "maybe" and not rows):
+                raise APIError({"message": "JSON object requested, multiple (or no) rows returned", "code": "PGRST116",
+                                "details": f"The result contains {len(rows)} rows"})
+            return FakeResponse(rows[0] if rows else None, count)
+        return FakeResponse(rows, count)
+
+    # -- embedding --
+
+    def _relationship(self, schema, embed):
+        """``(kind, column, target)``: ``one`` when this table holds the foreign key, ``many`` otherwise"""
+        relation, hint = embed.relation, embed.hint
+        if relation in schema.foreign_keys:
+            return "one", relation, self.schema[schema.foreign_keys[relation][0]]
+        target = self._schema(relation)
+        candidates = [("one", c, target) for c, (ref, _) in schema.foreign_keys.items() if ref == relation]
+        candidates += [("many", c, target) for c, (ref, _) in target.foreign_keys.items() if ref == schema.name]
+        if hint:
+            candidates = [c for c in candidates if hint in (c[1], f"{schema.name if c[0] == 'one' else relation}_{c[1]}_fkey")]
+        if not candidates:
+            raise APIError({"message": f"Could not find a relationship between '{schema.name}' and '{relation}' in the schema cache", "code": "PGRST200"})
+        if len(candidates) > 1:
+            raise APIError({"message": f"Could not embed because more than one relationship was found for '{schema.name}' and '{relation}'", "code": "PGRST201"})
+        return candidates[0]
+
+    def _shape(self, schema, rows, items):
+        """Project ``rows`` onto the parsed select ``items``, resolving embeds"""
+        columns = [i for i in items if not isinstance(i, Embed)]
+        embeds = [i for i in items if isinstance(i, Embed)]
+        if not columns and not any(e.items for e in embeds):
+            columns = [("*", None)]
+        for name, _ in columns:
+            if name != "*":
+                self._column(schema, name)
+
+        resolved = []
+        for embed in embeds:
+            kind, column, target = self._relationship(schema, embed)
+            if kind == "one":
+                keys = {r.get(column) for r in rows if r.get(column) is not None}
+                related = {k: self._rows[target.name][(k,)] for k in keys if (k,) in self._rows[target.name]}
+                shaped = dict(zip(related, self._shape(target, list(related.values()), embed.items))) if embed.items else related
+                resolved.append((embed, lambda row, c=column, s=shaped: s.get(row.get(c))))
+            else:
+                parent_keys = {r.get(schema.primary_key[0]) for r in rows}
+                children = [r for r in self._rows[target.name].values() if r.get(column) in parent_keys]
+                shaped_children = self._shape(target, children, embed.items) if embed.items else [{}] * len(children)
+                groups = {}
+                for child, shaped in zip(children, shaped_children):
+                    groups.setdefault(child.get(column), []).append(shaped)
+                resolved.append((embed, lambda row, s=groups, k=schema.primary_key[0]: list(s.get(row.get(k), []))))
+
+        out = []
+        for row in rows:
+            shaped = {}
+            for name, alias in columns:
+                if name == "*":
+                    shaped.update(row)
+                else:
+                    shaped[alias or name] = row.get(name)
+            keep = True
+            for embed, lookup in resolved:
+                value = lookup(row)
+                if embed.inner and not value:
+                    keep = False
+                if embed.items:
+                    shaped[embed.alias or embed.relation] = value
+            if keep:
+                out.append(shaped)
+        return out
+
+    # -- operations --
+
+    def _run_select(self, query):
+        schema, rows = self._filtered(query)
+        count = len(rows) if query._count else None
+        rows = self._ordered(rows, query._orders)
+        rows = rows[query._offset:]
+        if query._limit is not None:
+            rows = rows[:query._limit]
+        return self._result(query, self._shape(schema, rows, parse_select(query._columns)), count)
+
+    def _run_write(self, query):
+        """Run an insert/upsert/update/delete, then the table's statement triggers"""
+        response = getattr(self, f"_run_{query._op}")(query)
+        for columns, trigger in TRIGGERS.get(query._table, ()):
+            if query._op != "update" or columns is None or set(columns) & set(query._payload):
+                trigger(self)
+        return response
+
+    def _run_insert(self, query):
+        rows = self._insert_rows(query._table, query._payload)
+        return self._result(query, [dict(r) for r in rows], len(rows) if query._count else None)
+
+    def _run_upsert(self, query):
+        schema = self._schema(query._table)
+        rows = self._insert_rows(query._table, query._payload, query._on_conflict or schema.primary_key, query._ignore_duplicates)
+        return self._result(query, [dict(r) for r in rows], len(rows) if query._count else None)
+
+    def _run_update(self, query):
+        schema, rows = self._filtered(query)
+        updated = []
+        for existing in rows:
+            old_key = self._key(schema, existing)
+            row = self._prepare(schema, query._payload, existing)
+            self._check_unique(schema, row, ignore_key=old_key)
+            self._store(schema, row, old_key)
+            updated.append(dict(row))
+        return self._result(query, updated, len(updated) if query._count else None)
+
+    def _run_delete(self, query):
+        schema, rows = self._filtered(query)
+        deleted = [dict(r) for r in rows]
+        self._delete_rows(schema, rows)
+        return self._result(query, deleted, len(deleted) if query._count else None)
+
+
+# -- database functions from supabase_schema.sql --------------------------------
+
+def _head_assign_unit(client, p_request_id, p_unit_id, p_head_id):
+    units = client._rows["emergency_units"]
+    unit = units.get((int(p_unit_id),))
+    if unit is None or unit["head_id"] != str(p_head_id):
+        raise APIError({"message": "unit_not_found", "code": "P0001"})
+    if unit["status"] != "Free":
+        raise APIError({"message": "unit_not_free", "code": "P0001"})
+    request = client._rows["requests"].get((int(p_request_id),))
+    if request is None:
+        raise APIError({"message": "request_not_found", "code": "P0001"})
+    incident = client._rows["incidents"].get((request["incident_id"],))
+    assignment = client._insert_rows("emergency_assignments", [{
+        "request_id": request["id"],
+        "team_name": unit["unit_name"],
+        "team_type": unit["unit_category"],
+        "team_lead_id": unit["head_id"],
+        "location_text": incident["location"] if incident else None,
+        "notes": f"Assigned unit #{unit['id']}",
+        "status": "Assigned",
+    }])[0]
+    unit.update(status="Busy", last_update=_now())
+    for notification in client._rows["emergency_notifications"].values():
+        if notification["request_id"] == request["id"] and notification["head_id"] == unit["head_id"]:
+            notification["status"] = "Acknowledged"
+    return dict(assignment)
+
+
+def _bucket(stamp, granularity):
+    moment = datetime.fromisoformat(stamp)
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        moment = moment.replace(hour=0)
+    return moment.isoformat()
+
+
+def _rollup_weather_data(client, p_granularity, p_since=None):
+    if p_granularity not in ("hour", "day"):
+        raise APIError({"message": f"unsupported granularity: {p_granularity}", "code": "P0001"})
+    state = client._rows["weather_rollup_state"]
+    watermark = state.get((p_granularity,), {}).get("rolled_up_to")
+    starts = [s for s in (Column("p_since", "timestamptz").normalize(p_since), watermark) if s]
+    if not starts:
+        starts = [r["fetched_at"] for r in client._rows["weather_data"].values() if r["fetched_at"]]
+    if not starts:
+        return 0
+    since = _bucket(min(starts), p_granularity)
+    groups = {}
+    for row in client._rows["weather_data"].values():
+        if row["fetched_at"] and row["fetched_at"] >= since:
+            groups.setdefault((row["location"], _bucket(row["fetched_at"], p_granularity)), []).append(row)
+
+    def values(rows, name):
+        return [r[name] for r in rows if r[name] is not None]
+
+    def average(items):
+        return round(sum(items) / len(items), 2) if items else None
+
+    rollups = []
+    for (location, bucket_start), rows in groups.items():
+        temperatures, winds = values(rows, "temperature"), values(rows, "wind_speed")
+        rollups.append({
+            "location": location,
+            "granularity": p_granularity,
+            "bucket_start": bucket_start,
+            "samples": len(rows),
+            "extreme_count": sum(1 for r in rows if r["is_extreme"]),
+            "temperature_min": min(temperatures, default=None),
+            "temperature_avg": average(temperatures),
+            "temperature_max": max(temperatures, default=None),
+            "humidity_avg": average(values(rows, "humidity")),
+            "wind_speed_avg": average(winds),
+            "wind_speed_max": max(winds, default=None),
+        })
+    client._insert_rows("weather_data_rollups", rollups, on_conflict=("location", "granularity", "bucket_start"))
+    until = _bucket(_now(), p_granularity)
+    client._insert_rows("weather_rollup_state", [{"granularity": p_granularity, "rolled_up_to": max(until, watermark or until)}],
+                        on_conflict=("granularity",))
+    return len(rollups)
+
+
+def _prune_weather_data(client, p_before, p_batch_size=5000):
+    watermarks = [client._rows["weather_rollup_state"].get((g,), {}).get("rolled_up_to") for g in ("hour", "day")]
+    if None in watermarks:
+        return 0
+    before = min(Column("p_before", "timestamptz").normalize(p_before), *watermarks)
+    referenced = {a["weather_data_id"] for a in client._rows["announcements"].values()}
+    old = sorted((r for r in client._rows["weather_data"].values()
+                  if r["fetched_at"] and r["fetched_at"] < before and r["id"] not in referenced),
+                 key=lambda r: r["fetched_at"])[:int(p_batch_size)]
+    client._delete_rows(client.schema["weather_data"], old)
+    return len(old)
+
+
+def _latest_weather_fetches(client, p_since, p_after=None, p_limit=1000):
+    since = Column("p_since", "timestamptz").normalize(p_since)
+    latest = {}
+    for row in client._rows["weather_data"].values():
+        location, fetched_at = row["location"], row["fetched_at"]
+        if fetched_at and fetched_at >= since and (p_after is None or location > p_after):
+            if location not in latest or fetched_at > latest[location]:
+                latest[location] = fetched_at
+    return [{"location": location, "fetched_at": latest[location]} for location in sorted(latest)][:int(p_limit)]
+
+
+RPC_FUNCTIONS = {
+    "head_assign_unit": _head_assign_unit,
+    "rollup_weather_data": _rollup_weather_data,
+    "prune_weather_data": _prune_weather_data,
+    "latest_weather_fetches": _latest_weather_fetches,
+}
+
+
+# -- statement triggers from supabase_schema.sql --------------------------------
+
+def _bump_emergency_heads_version(client):
+    row = client._rows["emergency_heads_version"].get((True,))
+    version = (row["version"] if row else 0) + 1
+    client._insert_rows("emergency_heads_version", [{"id": True, "version": version, "changed_at": _now()}], on_conflict=("id",))
+
+
+# table -> [(columns an update must touch, or None for any update, trigger)]
+TRIGGERS = {
+    "users": [(("role", "is_emergency_head"), _bump_emergency_heads_version)],
+    "emergency_units": [(("head_id",), _bump_emergency_heads_version)],
+}
+
+
+def client_from_config(config):
+    """Fake client tuned by FAKE_SUPABASE_*; FAKE_SUPABASE_SEED loads a JSON ``{table: [rows]}`` file"""
+    client = FakeSupabaseClient(latency=config.FAKE_SUPABASE_LATENCY, jitter=config.FAKE_SUPABASE_JITTER)
+    if config.FAKE_SUPABASE_SEED:
+        with open(config.FAKE_SUPABASE_SEED, encoding="utf-8") as f:
+            client.load(json.load(f))
+    return client
@@ -0,0 +1,49 @@
+"""
+Concurrent fan-out for independent reads.
+
+Dashboards issue several Supabase queries that don't depend on each other.
+``fan_out`` runs them on a small pool of its own (one thread per query, up to
+``max_workers``) and waits at most ``deadline`` seconds, so a page costs about
+as much as its slowest query and never queues behind other requests' queries. Failed
+or late queries come back as per-query errors with a default value, and the page
+renders with whatever did arrive.
+"""
+import contextvars
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+FanOutResult = namedtuple("FanOutResult", ["results", "errors"])
+
+
+def fan_out(queries, deadline=5.0, default=None, max_workers=8, pool=None):
+    """Run ``{name: callable}`` concurrently.
+
+    Returns ``FanOutResult(results, errors)``: ``results`` has an entry for every
+    name (``default()`` if it failed or missed the deadline, when ``default`` is
+    given) and ``errors`` maps the failed names to a short reason.
+    """
+    own_pool = pool is None and bool(queries)
+    if own_pool:
+        pool = ThreadPoolExecutor(max_workers=max(1, min(len(queries), max_workers)), thread_name_prefix="query-fanout")
+    # Each query runs in a copy of the caller's context, so it still sees the Flask request (route labels in metrics)
+    futures = {name: pool.submit(contextvars.copy_context().run, func) for name, func in queries.items()}
+    wait(futures.values(), timeout=deadline)
+    if own_pool:
+        # Don't wait for late queries: their threads finish in the background and exit
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    results, errors = {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            errors[name] = "timed out"
+        else:
+            try:
+                results[name] = future.result()
+                continue
+            except Exception as e:
+                errors[name] = str(e) or e.__class__.__name__
+        print(f"Query '{name}' failed: {errors[name]}")
+        if default is not None:
+            results[name] = default()
+    return FanOutResult(results, errors)
@@ -0,0 +1,100 @@
+"""
+Vectorized geographic helpers
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1 = np.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=float))
+    dlat = lats - lat1
+    dlon = np.radians(np.asarray(lons, dtype=float) - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_order(distances, limit=None, offset=0):
+    """Indices of ``distances`` ranked ``offset`` to ``offset + limit``, nearest first.
+
+    Uses a partial selection, so only the requested page is fully sorted.
+    """
+    distances = np.asarray(distances, dtype=float)
+    end = len(distances) if limit is None else min(offset + limit, len(distances))
+    if end <= offset:
+        return np.empty(0, dtype=np.intp)
+    if end < len(distances):
+        index = np.argpartition(distances, end - 1)[:end]
+    else:
+        index = np.arange(len(distances), dtype=np.intp)
+    index = index[np.argsort(distances[index], kind="stable")]
+    return index[offset:end]
+
+
+def bounding_box(lat, lon, radius_km):
+    """(south, west, north, east) box enclosing a radius around a point"""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlon = radius_km / max(KM_PER_DEGREE_LAT * np.cos(np.radians(lat)), 1e-6)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat, lon, precision=5):
+    """Standard base32 geohash of a point"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_bbox(geohash):
+    """(south, west, north, east) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def geohashes_covering(lat, lon, radius_km, precision=5):
+    """Geohash cells that intersect the bounding box of a radius around a point"""
+    south, west, north, east = bounding_box(lat, lon, radius_km)
+    s, w, n, e = geohash_bbox(geohash_encode(lat, lon, precision))
+    lat_step, lon_step = n - s, e - w
+    cells = []
+    row = south
+    while row < north + lat_step:
+        col = west
+        while col < east + lon_step:
+            cell = geohash_encode(min(row, north), min(col, east), precision)
+            if cell not in cells:
+                cells.append(cell)
+            col += lon_step
+        row += lat_step
+    return cells
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Geocoding service for Nominatim lookups.
+
+Normalized queries are answered from an in-memory LRU, then from a local SQLite
+store that survives restarts, and only then from Nominatim. Upstream calls are
+coalesced per query and spaced to respect Nominatim's one-request-per-second
+policy. Misses are cached too, for a shorter time.
+
+Pre-warm the cache for the places we care about:
+
+    python geocoding.py prewarm [queries.txt ...]
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from metrics import track
+from singleflight import SingleFlight
+from weather_cache import normalize_location
+
+GeocodedLocation = namedtuple("GeocodedLocation", ["latitude", "longitude", "address"])
+
+_MISSING = object()
+
+# Size of the last Nominatim response on this thread (for the metrics)
+_last_response = threading.local()
+
+
+def _sized_requests_adapter():
+    """geopy's requests adapter, noting each response's size in ``_last_response``"""
+    from geopy.adapters import RequestsAdapter
+
+    class SizedRequestsAdapter(RequestsAdapter):
+        def _request(self, url, *, timeout, headers):
+            resp = super()._request(url, timeout=timeout, headers=headers)
+            _last_response.bytes = len(resp.content)
+            return resp
+
+    return SizedRequestsAdapter
+
+
+class GeocodingService:
+    def __init__(self, db_path, max_entries=4096, min_interval=1.0, negative_ttl=86400,
+                 user_agent="disaster_management", geocoder=None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.min_interval = min_interval
+        self.negative_ttl = negative_ttl
+        self.user_agent = user_agent
+        self._geocoder = geocoder
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._throttle_lock = threading.Lock()
+        self._last_upstream = 0.0
+        self._flight = SingleFlight()
+        self._db = None
+
+    @property
+    def geocoder(self):
+        if self._geocoder is None:
+            from geopy.geocoders import Nominatim
+            self._geocoder = Nominatim(user_agent=self.user_agent, adapter_factory=_sized_requests_adapter())
+        return self._geocoder
+
+    def geocode(self, query):
+        """Coordinates for a free-text location, or ``None`` if it can't be found"""
+        key = normalize_location(query)
+        if not key:
+            return None
+
+        cached = self._memory_get(key)
+        if cached is not _MISSING:
+            return cached
+
+        stored = self._disk_get(key)
+        if stored is not _MISSING:
+            if stored is not None:
+                self._memory_put(key, stored)
+            return stored
+
+        return self._flight.do(key, self._lookup, key, query)
+
+    def is_cached(self, query):
+        key = normalize_location(query)
+        return self._memory_get(key) is not _MISSING or self._disk_get(key) is not _MISSING
+
+    def cached(self, query):
+        """Like ``geocode`` but never calls Nominatim: ``None`` unless the query is already cached"""
+        key = normalize_location(query)
+        if not key:
+            return None
+        cached = self._memory_get(key)
+        if cached is not _MISSING:
+            return cached
+        stored = self._disk_get(key)
+        if stored is _MISSING or stored is None:
+            return None
+        self._memory_put(key, stored)
+        return stored
+
+    def _lookup(self, key, query):
+        self._throttle()
+        _last_response.bytes = 0
+        with track("http", "nominatim") as call:
+            location = self.geocoder.geocode(query)
+            call["bytes"] = _last_response.bytes
+        result = GeocodedLocation(location.latitude, location.longitude, location.address) if location else None
+        # Misses only go to disk, where they expire after negative_ttl
+        if result is not None:
+            self._memory_put(key, result)
+        self._disk_put(key, result)
+        return result
+
+    def _throttle(self):
+        """Space upstream calls at least ``min_interval`` seconds apart across threads"""
+        with self._throttle_lock:
+            wait = self._last_upstream + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_upstream = time.monotonic()
+
+    def _memory_get(self, key):
+        with self._lock:
+            if key not in self._memory:
+                return _MISSING
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+    def _memory_put(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _connection(self):
+        if self._db is None:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("""
+                create table if not exists geocode_cache (
+                  query text primary key,
+                  latitude real,
+                  longitude real,
+                  address text,
+                  found integer not null,
+                  fetched_at real not null
+                )
+            """)
+            self._db.commit()
+        return self._db
+
+    def _disk_get(self, key):
+        if not self.db_path:
+            return _MISSING
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    "select latitude, longitude, address, found, fetched_at from geocode_cache where query = ?", (key,)
+                ).fetchone()
+        except Exception as e:
+            print(f"Error reading geocode cache: {e}")
+            return _MISSING
+        if row is None:
+            return _MISSING
+        latitude, longitude, address, found, fetched_at = row
+        if not found:
+            return None if time.time() - fetched_at < self.negative_ttl else _MISSING
+        return GeocodedLocation(latitude, longitude, address)
+
+    def _disk_put(self, key, value):
+        if not self.db_path:
+            return
+        try:
+            with self._db_lock:
+                db = self._connection()
+                db.execute(
+                    "insert or replace into geocode_cache (query, latitude, longitude, address, found, fetched_at) values (?, ?, ?, ?, ?, ?)",
+                    (key, value.latitude if value else None, value.longitude if value else None,
+                     value.address if value else None, 1 if value else 0, time.time()),
+                )
+                db.commit()
+        except Exception as e:
+            print(f"Error writing geocode cache: {e}")
+
+    def prewarm(self, queries):
+        """Geocode every query not already cached; returns ``(looked_up, found)``"""
+        looked_up = found = 0
+        for query in dict.fromkeys(q.strip() for q in queries if q and q.strip()):
+            if self.is_cached(query):
+                continue
+            try:
+                result = self.geocode(query)
+            except Exception as e:
+                print(f"❌ {query}: {e}")
+                continue
+            looked_up += 1
+            found += 1 if result else 0
+            print(f"{'✅' if result else '❌'} {query}")
+        return looked_up, found
+
+
+def _prewarm_queries(paths, client=None):
+    """Queries from text files, monitored cities and (if configured) known pincodes and pending incidents"""
+    from monitored_locations import load_locations_file
+
+    queries = list(load_locations_file())
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            queries.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    if client is not None:
+        for table in ("users", "incidents"):
+            try:
+                resp = client.table(table).select("pincode").execute()
+                queries.extend(f"{r['pincode']}, India" for r in (resp.data or []) if r.get("pincode"))
+            except Exception as e:
+                print(f"Could not load pincodes from {table}: {e}")
+        try:
+            # The shelter tile prefetcher only covers incidents whose location is cached
+            resp = client.table("incidents").select("location").eq("status", "pending").execute()
+            queries.extend(r["location"] for r in (resp.data or []) if r.get("location"))
+        except Exception as e:
+            print(f"Could not load pending incident locations: {e}")
+    return queries
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "prewarm":
+        print("Usage: python geocoding.py prewarm [queries.txt ...]")
+        sys.exit(1)
+
+    from app import geocoder, supabase
+
+    queries = _prewarm_queries(sys.argv[2:], supabase)
+    print(f"🌍 Pre-warming geocode cache with {len(queries)} queries (about 1 per second)...")
+    looked_up, found = geocoder.prewarm(queries)
+    print(f"📊 {looked_up} looked up, {found} found, the rest were already cached")
@@ -0,0 +1,132 @@
+"""
+Keyset (cursor) pagination and streaming export for Supabase tables.
+
+Pages are ordered by a timestamp column, newest first, with ``id`` as the tie
+breaker. A cursor holds the last ``(timestamp, id)`` seen and the next page
+asks for rows strictly after it, so each page costs the same no matter how deep
+you go (unlike ``offset``). Exports walk a whole table one fixed-size page at a
+time through generators, so memory stays flat however big the table is.
+"""
+import base64
+import csv
+import io
+import json
+import threading
+import time
+
+# table -> (columns, order column) for the admin data view
+DATA_VIEW_TABLES = {
+    "users": ("id, name, email, role, created_at", "created_at"),
+    "incidents": ("*", "timestamp"),
+    "donations": ("*", "timestamp"),
+    "announcements": ("*", "timestamp"),
+    "medical_requests": ("*", "created_at"),
+}
+
+
+class InvalidCursor(ValueError):
+    """A page cursor that doesn't decode (tampered, truncated or from an old link)"""
+
+
+def encode_cursor(row, order_column):
+    raw = json.dumps([row.get(order_column), row.get("id")], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """``(timestamp, id)`` from a cursor string; raises InvalidCursor if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+    return value, row_id
+
+
+def _quote(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def fetch_page(client, table, columns="*", order_column="created_at", cursor=None, limit=50):
+    """``(rows, next_cursor)``: up to ``limit`` rows after ``cursor``; ``next_cursor`` is ``None`` at the end"""
+    query = client.table(table).select(columns)
+    if cursor:
+        value, row_id = decode_cursor(cursor)
+        if value is None:
+            # Rows without a timestamp sort last; only the id moves the cursor on
+            query = query.or_(f"and({order_column}.is.null,id.lt.{_quote(row_id)})")
+        else:
+            query = query.or_(
+                f"{order_column}.lt.{_quote(value)},"
+                f"and({order_column}.eq.{_quote(value)},id.lt.{_quote(row_id)}),"
+                f"{order_column}.is.null"
+            )
+    resp = query.order(order_column, desc=True, nullsfirst=False).order("id", desc=True).limit(limit + 1).execute()
+    rows = resp.data or []
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1], order_column)
+    return rows, None
+
+
+def count_rows(client, table, method="planned"):
+    """Row count without fetching the rows; ``planned`` reads the planner's estimate instead of scanning"""
+    resp = client.table(table).select("id", count=method).limit(1).execute()
+    return resp.count if resp.count is not None else len(resp.data or [])
+
+
+class RowCounts:
+    """Approximate table sizes for the data view headers, re-counted at most every ``ttl`` seconds"""
+
+    def __init__(self, ttl=300, method="planned"):
+        self.ttl = ttl
+        self.method = method
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def get(self, client, table):
+        with self._lock:
+            cached = self._counts.get(table)
+        if cached and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        count = count_rows(client, table, self.method)
+        with self._lock:
+            self._counts[table] = (count, time.monotonic())
+        return count
+
+    def invalidate(self):
+        with self._lock:
+            self._counts.clear()
+
+
+def iter_rows(client, table, columns="*", order_column="created_at", chunk_size=500):
+    """Every row of ``table``, newest first, fetched ``chunk_size`` rows at a time"""
+    cursor = None
+    while True:
+        rows, cursor = fetch_page(client, table, columns, order_column, cursor, chunk_size)
+        yield from rows
+        if cursor is None:
+            return
+
+
+def _cell(value):
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+
+def csv_lines(rows):
+    """CSV text, header first, one chunk per row; columns come from the first row"""
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row.keys()), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({k: _cell(v) for k, v in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + "\n"
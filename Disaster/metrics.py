@@ -0,0 +1,257 @@
+"""
+In-process instrumentation for data access and outbound HTTP.
+
+Every Supabase ``execute()`` (through ``InstrumentedClient``) and every call to
+wttr.in, Overpass and Nominatim (through ``track``) records a latency histogram,
+an error count and the response size, labelled by Flask route and by table or
+service. Calls slower than the threshold are printed to the slow-query log.
+``render()`` produces the Prometheus text format served at ``/metrics``.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# name -> (type, help)
+METRICS = {
+    "supabase_query_seconds": ("histogram", "Supabase query latency by route and table"),
+    "supabase_query_errors_total": ("counter", "Supabase queries that raised, by route and table"),
+    "supabase_response_bytes_total": ("counter", "Estimated JSON size of Supabase responses, by route and table"),
+    "http_client_request_seconds": ("histogram", "Outbound HTTP latency by route and service"),
+    "http_client_errors_total": ("counter", "Outbound HTTP calls that raised, by route and service"),
+    "http_client_response_bytes_total": ("counter", "Outbound HTTP response bytes, by route and service"),
+    "app_request_seconds": ("histogram", "Flask request latency by route"),
+    "app_request_supabase_queries": ("histogram", "Supabase round trips per request, by route"),
+}
+
+_KINDS = {
+    "supabase": ("supabase_query_seconds", "supabase_query_errors_total", "supabase_response_bytes_total", "table"),
+    "http": ("http_client_request_seconds", "http_client_errors_total", "http_client_response_bytes_total", "service"),
+}
+
+settings = {"enabled": True, "slow_seconds": 0.5}
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            histograms = {k: (list(h.counts), h.count, h.sum, h.buckets) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), (counts, count, total, buckets) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(buckets, counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+            else:
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+registry = Registry()
+
+
+def configure(enabled=True, slow_seconds=0.5):
+    settings["enabled"] = enabled
+    settings["slow_seconds"] = slow_seconds
+
+
+def estimate_json_bytes(data):
+    """Approximate JSON size of a response: the first row's size times the row count.
+
+    Serializing every response again just to measure it would cost more than
+    many of the queries themselves.
+    """
+    if isinstance(data, list):
+        return len(json.dumps(data[0], default=str)) * len(data) if data else 0
+    return len(json.dumps(data, default=str))
+
+
+def current_route():
+    """The Flask endpoint handling the current request, or ``background`` outside one.
+
+    Streamed responses should wrap their generator in ``flask.stream_with_context``
+    so the queries it makes are still labelled with the route.
+    """
+    try:
+        from flask import has_request_context, request
+        if has_request_context():
+            return request.endpoint or request.path
+    except Exception:
+        pass
+    return "background"
+
+
+def _count_request_query():
+    try:
+        from flask import g, has_request_context
+        if has_request_context():
+            with registry._lock:
+                g.supabase_queries = g.get("supabase_queries", 0) + 1
+    except Exception:
+        pass
+
+
+@contextmanager
+def track(kind, target):
+    """Time a ``supabase`` query (target = table) or ``http`` call (target = service).
+
+    The yielded dict can be given a ``bytes`` entry with the response size.
+    """
+    if not settings["enabled"]:
+        yield {}
+        return
+    call = {}
+    route = current_route()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield call
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        latency_name, errors_name, bytes_name, target_label = _KINDS[kind]
+        labels = {"route": route, target_label: target}
+        registry.observe(latency_name, labels, seconds)
+        if error is not None:
+            registry.inc(errors_name, labels)
+        if call.get("bytes"):
+            registry.inc(bytes_name, labels, call["bytes"])
+        if kind == "supabase":
+            _count_request_query()
+        if seconds >= settings["slow_seconds"]:
+            status = f"failed: {error}" if error is not None else f"{call.get('bytes', 0)} bytes"
+            print(f"🐢 Slow {kind} call to {target} from {route}: {seconds * 1000:.0f} ms ({status})")
+
+
+class _InstrumentedQuery:
+    """Wraps a postgrest request builder so ``execute()`` is tracked"""
+
+    def __init__(self, builder, table):
+        self._builder = builder
+        self._table = table
+
+    def execute(self):
+        with track("supabase", self._table) as call:
+            resp = self._builder.execute()
+            data = getattr(resp, "data", None)
+            if data:
+                call["bytes"] = estimate_json_bytes(data)
+        return resp
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return _InstrumentedQuery(attr, self._table) if hasattr(attr, "execute") else attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _InstrumentedQuery(result, self._table) if hasattr(result, "execute") else result
+
+        return chained
+
+
+class InstrumentedClient:
+    """Drop-in wrapper around a Supabase client that tracks table and RPC queries"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _InstrumentedQuery(self._client.table(name), name)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        return _InstrumentedQuery(self._client.rpc(fn, params if params is not None else {}, *args, **kwargs), f"rpc:{fn}")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def init_app(app):
+    """Record per-request latency and Supabase round trips for every Flask route"""
+
+    @app.before_request
+    def _start_request_timer():
+        from flask import g
+        g.request_started = time.perf_counter()
+        g.supabase_queries = 0
+
+    @app.after_request
+    def _record_request(response):
+        from flask import g, request
+        if settings["enabled"] and "request_started" in g and request.endpoint != "metrics":
+            route = request.endpoint or "unknown"
+            registry.observe("app_request_seconds", {"route": route}, time.perf_counter() - g.request_started)
+            registry.observe("app_request_supabase_queries", {"route": route}, g.get("supabase_queries", 0), COUNT_BUCKETS)
+        return response
@@ -0,0 +1,130 @@
+"""
+Monitored locations and incremental weather-scan planning.
+
+The city list comes from the ``monitored_locations`` table when it exists and
+has rows, otherwise from ``monitored_locations.json`` next to this file.
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from weather_cache import normalize_location
+from weather_rules import set_location_regions
+
+DEFAULT_LOCATIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "monitored_locations.json")
+
+# PostgREST's default max-rows; latest_fetch_times pages by location at this size
+LATEST_FETCH_PAGE_SIZE = 1000
+
+
+def load_location_records_file(path=None):
+    """Active ``{"name", "region"}`` records from a JSON file of strings or ``{"name": ...}`` objects"""
+    with open(path or DEFAULT_LOCATIONS_FILE, encoding="utf-8") as f:
+        entries = json.load(f)
+    records = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            entry = {"name": entry}
+        if entry.get("name") and entry.get("active", True):
+            records.append({"name": entry["name"], "region": entry.get("region")})
+    return records
+
+
+def load_locations_file(path=None):
+    """Active location names from a locations file"""
+    return [r["name"] for r in load_location_records_file(path)]
+
+
+def load_monitored_location_records(client=None, path=None):
+    """Active ``{"name", "region"}`` records, preferring the database table over the file"""
+    if client is not None:
+        try:
+            resp = client.table("monitored_locations").select("name, region").eq("active", True).order("name").execute()
+            records = [r for r in (resp.data or []) if r.get("name")]
+            if records:
+                return records
+        except Exception as e:
+            print(f"Could not load monitored_locations table, using {os.path.basename(path or DEFAULT_LOCATIONS_FILE)}: {e}")
+    return load_location_records_file(path)
+
+
+def load_monitored_locations(client=None, path=None):
+    """Active monitored location names, preferring the database table over the file.
+
+    Their regions are handed to the alert rules, so region overrides follow
+    whichever source the names came from.
+    """
+    records = load_monitored_location_records(client, path)
+    set_location_regions(records)
+    return [r["name"] for r in records]
+
+
+def parse_timestamp(value):
+    """Parse a PostgREST timestamptz string into an aware datetime"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def latest_fetch_times(client, since, page_size=LATEST_FETCH_PAGE_SIZE):
+    """Latest ``fetched_at`` per normalized location since ``since``.
+
+    The ``latest_weather_fetches`` database function returns one row per location,
+    so this is one request per ``page_size`` locations however many readings there are.
+    """
+    latest = {}
+    after = None
+    while True:
+        resp = client.rpc("latest_weather_fetches", {"p_since": since.isoformat(), "p_after": after, "p_limit": page_size}).execute()
+        rows = resp.data or []
+        for row in rows:
+            key = normalize_location(row.get("location"))
+            fetched_at = parse_timestamp(row.get("fetched_at"))
+            if key and fetched_at and (key not in latest or fetched_at > latest[key]):
+                latest[key] = fetched_at
+        if len(rows) < page_size:
+            return latest
+        after = rows[-1]["location"]
+
+
+def active_alert_locations(client):
+    """Normalized locations that currently have a weather alert announcement"""
+    resp = client.table("announcements").select("weather_data(location)").eq("is_weather_alert", True).execute()
+    alerted = set()
+    for row in (resp.data or []):
+        weather = row.get("weather_data") or {}
+        if weather.get("location"):
+            alerted.add(normalize_location(weather["location"]))
+    return alerted
+
+
+def select_due_locations(locations, latest, alerted, fresh_window, alert_window, now=None):
+    """Locations whose last reading is older than their window.
+
+    Alerted locations use the shorter ``alert_window`` so they are rescanned
+    more often than calm ones. Windows are in seconds.
+    """
+    now = now or datetime.now(timezone.utc)
+    due = []
+    for location in locations:
+        key = normalize_location(location)
+        window = alert_window if key in alerted else fresh_window
+        last = latest.get(key)
+        if last is None or now - last >= timedelta(seconds=window):
+            due.append(location)
+    return due
+
+
+def plan_incremental_scan(client, locations, fresh_window, alert_window):
+    """Return ``(due_locations, alerted_locations)`` for an incremental scan"""
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(seconds=max(fresh_window, alert_window))
+    latest = latest_fetch_times(client, since)
+    alerted = active_alert_locations(client)
+    return select_due_locations(locations, latest, alerted, fresh_window, alert_window, now), alerted
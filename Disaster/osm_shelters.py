@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Offline OpenStreetMap shelters.
+
+Imports shelters, schools, community centres and civic buildings from a local
+OSM extract into a SQLite store next to the app, so shelter searches keep
+working when the public Overpass API can't be reached. Ways and multipolygon
+relations are reduced to the average of their vertices.
+
+    python osm_shelters.py import india-latest.osm.pbf     # full import (replaces the store)
+    python osm_shelters.py import shelters.geojson
+    python osm_shelters.py diff 123.osc.gz                 # apply an OSM change file
+
+``.osm.pbf``, ``.osm`` and ``.osc`` files need the optional ``osmium`` package
+(``pip install osmium``). GeoJSON (a FeatureCollection, or one feature per line)
+needs nothing extra.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from overpass_tiles import SHELTER_TAGS, is_shelter, shelter_element
+from shelter_index import ShelterIndex
+
+GEOJSON_SUFFIXES = (".geojson", ".json", ".geojsonl", ".geojsons", ".ndjson")
+OSM_TYPES = {"n": "node", "w": "way", "r": "relation", "node": "node", "way": "way", "relation": "relation"}
+
+
+class OsmShelterStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._db is None:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.executescript("""
+                create table if not exists osm_shelters (
+                  id text primary key,
+                  osm_type text not null,
+                  osm_id integer not null,
+                  name text,
+                  type text,
+                  latitude real not null,
+                  longitude real not null,
+                  generation integer not null
+                );
+                create table if not exists osm_meta (
+                  key text primary key,
+                  value text
+                );
+            """)
+            self._db.commit()
+        return self._db
+
+    def version(self):
+        """Changes whenever an import or diff is committed; ``None`` if nothing was ever imported"""
+        if not os.path.exists(self.db_path):
+            return None
+        try:
+            with self._lock:
+                row = self._connection().execute("select value from osm_meta where key = 'updated_at'").fetchone()
+        except Exception as e:
+            print(f"Error reading OSM shelter store: {e}")
+            return None
+        return row[0] if row else None
+
+    def rows(self):
+        """Every stored shelter, in the shape ``ShelterIndex`` expects"""
+        if not os.path.exists(self.db_path):
+            return []
+        with self._lock:
+            cursor = self._connection().execute(
+                "select id, osm_type, osm_id, name, type, latitude, longitude from osm_shelters"
+            )
+            return [
+                {"id": r[0], "osm_type": r[1], "osm_id": r[2], "name": r[3], "type": r[4], "latitude": r[5], "longitude": r[6]}
+                for r in cursor
+            ]
+
+    def next_generation(self):
+        with self._lock:
+            row = self._connection().execute("select coalesce(max(generation), 0) + 1 from osm_shelters").fetchone()
+        return row[0]
+
+    def upsert(self, elements, generation):
+        with self._lock:
+            db = self._connection()
+            db.executemany(
+                "insert or replace into osm_shelters (id, osm_type, osm_id, name, type, latitude, longitude, generation) values (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e["id"], e["osm_type"], e["osm_id"], e["name"], e["type"], e["latitude"], e["longitude"], generation) for e in elements],
+            )
+            db.commit()
+
+    def delete(self, ids):
+        with self._lock:
+            db = self._connection()
+            db.executemany("delete from osm_shelters where id = ?", [(i,) for i in ids])
+            db.commit()
+
+    def existing(self, ids):
+        """``{id: element}`` for the ids already in the store"""
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            db = self._connection()
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                cursor = db.execute(
+                    f"select id, osm_type, osm_id, name, type, latitude, longitude from osm_shelters where id in ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for r in cursor:
+                    found[r[0]] = {"id": r[0], "osm_type": r[1], "osm_id": r[2], "name": r[3], "type": r[4], "latitude": r[5], "longitude": r[6]}
+        return found
+
+    def finish(self, generation=None):
+        """Drop rows older than ``generation`` (after a full import) and bump the version"""
+        with self._lock:
+            db = self._connection()
+            removed = 0
+            if generation is not None:
+                removed = db.execute("delete from osm_shelters where generation < ?", (generation,)).rowcount
+            db.execute("insert or replace into osm_meta (key, value) values ('updated_at', ?)", (repr(time.time()),))
+            db.commit()
+        return removed
+
+
+class OfflineShelters:
+    """Spatial index over the store, reloaded whenever an import or diff lands"""
+
+    def __init__(self, store, cell_deg=0.1):
+        self.store = store
+        self.index = ShelterIndex(cell_deg=cell_deg)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        version = self.store.version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                rows = self.store.rows()
+                self.index.load(rows)
+                self._version = version
+                print(f"🗺️ Loaded {len(rows)} offline OSM shelters")
+
+    def available(self):
+        self._sync()
+        return len(self.index) > 0
+
+    def search(self, lat, lon, radius_km, limit=None, offset=0):
+        self._sync()
+        return self.index.within(lat, lon, radius_km, limit=limit, offset=offset)
+
+
+def _vertex_average(points):
+    points = [p for p in points if p is not None]
+    if not points:
+        return None
+    return sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)
+
+
+# --- GeoJSON ---------------------------------------------------------------
+
+def _geometry_points(geometry):
+    """(lat, lon) vertices of a GeoJSON geometry; polygons contribute their outer ring only"""
+    kind = geometry.get("type")
+    coords = geometry.get("coordinates") or []
+    if kind == "Point":
+        return [(coords[1], coords[0])]
+    if kind in ("LineString", "MultiPoint"):
+        return [(c[1], c[0]) for c in coords]
+    if kind == "Polygon":
+        ring = coords[0] if coords else []
+        return [(c[1], c[0]) for c in (ring[:-1] if len(ring) > 1 and ring[0] == ring[-1] else ring)]
+    if kind in ("MultiLineString", "MultiPolygon"):
+        points = []
+        for part in coords:
+            points.extend(_geometry_points({"type": "Polygon" if kind == "MultiPolygon" else "LineString", "coordinates": part}))
+        return points
+    if kind == "GeometryCollection":
+        points = []
+        for part in geometry.get("geometries") or []:
+            points.extend(_geometry_points(part))
+        return points
+    return []
+
+
+def _feature_osm_id(feature, props, lat, lon):
+    """(osm_type, osm_id) from the usual osmium/Overpass export conventions"""
+    for raw in (props.get("@id"), feature.get("id"), props.get("id")):
+        if isinstance(raw, str) and "/" in raw:
+            kind, _, number = raw.partition("/")
+            if kind in OSM_TYPES and number.lstrip("-").isdigit():
+                return OSM_TYPES[kind], int(number)
+        if isinstance(raw, str) and raw[:1] in ("n", "w", "r") and raw[1:].lstrip("-").isdigit():
+            return OSM_TYPES[raw[0]], int(raw[1:])
+    kind = OSM_TYPES.get(str(props.get("@type") or props.get("osm_type") or ""))
+    number = props.get("osm_id")
+    if kind and str(number).lstrip("-").isdigit():
+        return kind, int(number)
+    # No OSM id in the export: key on the position instead
+    return "geojson", int(round(lat * 1e6)) * 1000000000 + int(round(lon * 1e6))
+
+
+def _iter_geojson_features(path):
+    with open(path, encoding="utf-8") as f:
+        first = f.readline().strip().lstrip("\x1e")
+        try:
+            line_delimited = json.loads(first).get("type") == "Feature"
+        except ValueError:
+            line_delimited = False
+        f.seek(0)
+        if not line_delimited:
+            for feature in json.load(f).get("features") or []:
+                yield feature
+            return
+        # GeoJSON text sequence / newline-delimited features, streamed line by line
+        for line in f:
+            line = line.strip().lstrip("\x1e")
+            if line:
+                yield json.loads(line)
+
+
+def iter_geojson_shelters(path):
+    """Yield ``(element_or_None, id)`` for each shelter feature of a GeoJSON file"""
+    for feature in _iter_geojson_features(path):
+        props = feature.get("properties") or {}
+        tags = props.get("tags") if isinstance(props.get("tags"), dict) else props
+        if not is_shelter(tags):
+            continue
+        centre = _vertex_average(_geometry_points(feature.get("geometry") or {}))
+        if centre is None:
+            continue
+        osm_type, osm_id = _feature_osm_id(feature, props, *centre)
+        yield shelter_element(osm_type, osm_id, tags, *centre), f"{osm_type}/{osm_id}"
+
+
+# --- OSM PBF / XML / change files ------------------------------------------
+
+def _location(node_ref):
+    try:
+        location = node_ref.location
+        return (location.lat, location.lon) if location.valid() else None
+    except Exception:
+        return None
+
+
+def iter_osm_shelters(path, changes=False):
+    """Yield ``(element_or_None, id)`` from an OSM file via osmium, streaming.
+
+    With ``changes`` (an .osc diff) deleted objects and objects that lost their
+    shelter tags are yielded as ``(None, id)``, and ways or relations whose
+    geometry isn't in the file come back with ``latitude``/``longitude`` of ``None``.
+    """
+    try:
+        import osmium
+    except ImportError:
+        raise RuntimeError("Reading .osm.pbf/.osm/.osc files needs the osmium package: pip install osmium")
+
+    processor = osmium.FileProcessor(path).with_locations()
+    if not changes:
+        # Multipolygon relations are assembled into areas; only tagged objects reach Python
+        processor = processor.with_areas().with_filter(osmium.filter.KeyFilter(*sorted({k for k, _ in SHELTER_TAGS})))
+
+    for obj in processor:
+        if obj.is_area():
+            if obj.from_way():
+                continue
+            osm_type, osm_id = "relation", obj.orig_id()
+            points = [_location(n) for ring in obj.outer_rings() for n in list(ring)[:-1]]
+        elif obj.is_node():
+            osm_type, osm_id, points = "node", obj.id, [_location(obj)]
+        elif obj.is_way():
+            nodes = list(obj.nodes)
+            if len(nodes) > 1 and nodes[0].ref == nodes[-1].ref:
+                nodes = nodes[:-1]
+            osm_type, osm_id, points = "way", obj.id, [_location(n) for n in nodes]
+        elif obj.is_relation() and changes:
+            osm_type, osm_id, points = "relation", obj.id, []
+        else:
+            continue
+
+        key = f"{osm_type}/{osm_id}"
+        tags = {tag.k: tag.v for tag in obj.tags}
+        if (not obj.is_area() and obj.deleted) or not is_shelter(tags):
+            if changes:
+                yield None, key
+            continue
+        centre = _vertex_average(points)
+        element = shelter_element(osm_type, osm_id, tags, *(centre or (0.0, 0.0)))
+        if centre is None:
+            element["latitude"] = element["longitude"] = None
+        yield element, key
+
+
+def _is_change_file(path):
+    return path.lower().endswith((".osc", ".osc.gz", ".osc.bz2"))
+
+
+def _read(path, changes=False):
+    if path.lower().endswith(GEOJSON_SUFFIXES):
+        return iter_geojson_shelters(path)
+    return iter_osm_shelters(path, changes=changes or _is_change_file(path))
+
+
+def import_extract(store, paths, batch_size=5000):
+    """Full import: load every shelter in ``paths`` (one file or a list) and drop whatever
+    the store had before. All files share one generation, so later files don't remove
+    the shelters of earlier ones; nothing is dropped if a file fails."""
+    if isinstance(paths, str):
+        paths = [paths]
+    generation = store.next_generation()
+    imported, skipped = 0, 0
+    for path in paths:
+        file_imported, file_skipped = _load_extract(store, path, generation, batch_size)
+        imported += file_imported
+        skipped += file_skipped
+    removed = store.finish(generation)
+    return {"imported": imported, "removed": removed, "skipped": skipped}
+
+
+def _load_extract(store, path, generation, batch_size):
+    print(f"🗺️ Importing {path}...")
+    batch, imported, skipped = [], 0, 0
+    for element, _ in _read(path):
+        if element is None:
+            continue
+        if element["latitude"] is None:
+            skipped += 1
+            continue
+        batch.append(element)
+        if len(batch) >= batch_size:
+            store.upsert(batch, generation)
+            imported += len(batch)
+            batch = []
+            print(f"  ... {imported} shelters")
+    if batch:
+        store.upsert(batch, generation)
+        imported += len(batch)
+    return imported, skipped
+
+
+def apply_diff(store, path, batch_size=5000):
+    """Incremental update from an OSM change file (or a GeoJSON file of changed features)"""
+    generation = store.next_generation()
+    upserts, deletes, unresolved = {}, set(), {}
+    for element, key in _read(path, changes=True):
+        if element is None:
+            deletes.add(key)
+            upserts.pop(key, None)
+        elif element["latitude"] is None:
+            unresolved[key] = element
+        else:
+            upserts[key] = element
+            deletes.discard(key)
+
+    # A modified way whose nodes didn't change has no locations in the diff: keep its stored position
+    skipped = 0
+    known = store.existing(unresolved)
+    for key, element in unresolved.items():
+        if key in known:
+            element["latitude"], element["longitude"] = known[key]["latitude"], known[key]["longitude"]
+            upserts[key] = element
+            deletes.discard(key)
+        else:
+            skipped += 1
+
+    # Diffs mention every touched object; only delete the ones we actually stored
+    deleted = list(store.existing(deletes))
+    elements = list(upserts.values())
+    for start in range(0, len(elements), batch_size):
+        store.upsert(elements[start:start + batch_size], generation)
+    for start in range(0, len(deleted), batch_size):
+        store.delete(deleted[start:start + batch_size])
+    store.finish()
+    return {"upserted": len(elements), "deleted": len(deleted), "skipped": skipped}
+
+
+def main(argv=None):
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Import OpenStreetMap shelters for offline search")
+    parser.add_argument("command", choices=["import", "diff"])
+    parser.add_argument("paths", nargs="+", help=".osm.pbf, .osm, .osc(.gz) or GeoJSON files")
+    parser.add_argument("--db", default=Config.OSM_SHELTER_DB_PATH)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    store = OsmShelterStore(args.db)
+    if args.command == "import":
+        # One import across all files: they replace the store together
+        batches = [(", ".join(args.paths), lambda: import_extract(store, args.paths, args.batch_size))]
+    else:
+        batches = [(path, lambda path=path: apply_diff(store, path, args.batch_size)) for path in args.paths]
+    for label, run in batches:
+        started = time.monotonic()
+        if args.command == "diff":
+            print(f"🗺️ Applying {label}...")
+        try:
+            stats = run()
+        except Exception as e:
+            print(f"❌ {label}: {e}")
+            return 1
+        summary = ", ".join(f"{v} {k}" for k, v in stats.items())
+        print(f"✅ {label}: {summary} in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
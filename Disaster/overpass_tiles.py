@@ -0,0 +1,225 @@
+"""
+Geohash-tiled cache for Overpass shelter queries.
+
+A search is answered by merging the cached tiles that cover its radius. Only
+tiles that are missing or older than the TTL are fetched, all in a single
+Overpass query over their bounding box, and every fetched tile is stored (even
+when empty) so neighbouring searches reuse it.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from geo import geohash_bbox, geohash_encode, geohashes_covering, haversine_km, nearest_order
+from metrics import track
+from singleflight import SingleFlight
+
+# (element type, tag key, tag value) matched by the shelter search; nwr = nodes, ways and relations
+SHELTER_FILTERS = [
+    ("nwr", "amenity", "shelter"),
+    ("nwr", "building", "school"),
+    ("nwr", "amenity", "community_centre"),
+    ("nwr", "building", "civic"),
+]
+SHELTER_TAGS = {(key, value) for _, key, value in SHELTER_FILTERS}
+
+
+def is_shelter(tags):
+    """Whether an OSM tag mapping matches one of the shelter filters"""
+    return any(tags.get(key) == value for key, value in SHELTER_TAGS)
+
+
+def shelter_element(osm_type, osm_id, tags, lat, lon):
+    """The plain dict used for OSM shelters everywhere (tile cache, offline store, index)"""
+    return {
+        "id": f"{osm_type}/{osm_id}",
+        "osm_type": osm_type,
+        "osm_id": osm_id,
+        "name": tags.get("name", "Emergency Shelter"),
+        "type": tags.get("amenity", tags.get("building", "shelter")),
+        "latitude": float(lat),
+        "longitude": float(lon),
+    }
+
+
+# Elements of one tile plus their coordinates as arrays, so searches never rebuild them
+Tile = namedtuple("Tile", ["elements", "lats", "lons"])
+
+_SizedOverpass = None
+
+
+def _sized_overpass():
+    """overpy.Overpass that keeps the size of its last JSON response (for the metrics)"""
+    global _SizedOverpass
+    if _SizedOverpass is None:
+        import overpy
+
+        class SizedOverpass(overpy.Overpass):
+            response_bytes = 0
+
+            def parse_json(self, data, encoding="utf-8"):
+                self.response_bytes = len(data)
+                return super().parse_json(data, encoding)
+
+        _SizedOverpass = SizedOverpass
+    return _SizedOverpass
+
+
+def build_shelter_query(south, west, north, east, timeout=25):
+    """Overpass QL for shelter-like features inside a bounding box.
+
+    Nodes are printed with their coordinates; ways and relations with
+    ``out tags center``, i.e. one centre point plus tags instead of every member
+    node's geometry.
+    """
+    bbox = f"{south},{west},{north},{east}"
+    clauses = "\n".join(f'  {kind}["{key}"="{value}"]({bbox});' for kind, key, value in SHELTER_FILTERS)
+    return f"""
+[out:json][timeout:{timeout}];
+(
+{clauses}
+)->.shelters;
+node.shelters;
+out qt;
+(way.shelters; relation.shelters;);
+out tags center qt;
+"""
+
+
+def parse_shelter_result(result):
+    """One dict per matched node, way or relation (at its centre), deduplicated by OSM id"""
+    elements = {}
+    for node in result.nodes:
+        if is_shelter(node.tags):
+            elements[("node", node.id)] = shelter_element("node", node.id, node.tags, node.lat, node.lon)
+    for osm_type, items in (("way", result.ways), ("relation", result.relations)):
+        for item in items:
+            if item.center_lat is not None and is_shelter(item.tags):
+                elements[(osm_type, item.id)] = shelter_element(osm_type, item.id, item.tags, item.center_lat, item.center_lon)
+    return list(elements.values())
+
+
+class OverpassTileCache:
+    def __init__(self, precision=5, ttl=21600, max_tiles=20000, timeout=25, api_factory=None,
+                 query_builder=build_shelter_query, result_parser=parse_shelter_result):
+        self.precision = precision
+        self.ttl = ttl
+        self.max_tiles = max_tiles
+        self.timeout = timeout
+        self.api_factory = api_factory
+        self.query_builder = query_builder
+        self.result_parser = result_parser
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def _api(self):
+        if self.api_factory is not None:
+            return self.api_factory()
+        return _sized_overpass()()
+
+    def cached_tile(self, tile):
+        """A fresh cached ``Tile``, or ``None``"""
+        with self._lock:
+            entry = self._tiles.get(tile)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                return None
+            self._tiles.move_to_end(tile)
+            return entry[0]
+
+    def _store(self, tiles, elements):
+        grouped = {tile: [] for tile in tiles}
+        for element in elements:
+            tile = geohash_encode(element["latitude"], element["longitude"], self.precision)
+            if tile in grouped:
+                grouped[tile].append(element)
+        buckets = {
+            tile: Tile(items, np.array([e["latitude"] for e in items], dtype=float), np.array([e["longitude"] for e in items], dtype=float))
+            for tile, items in grouped.items()
+        }
+        now = time.monotonic()
+        with self._lock:
+            for tile, items in buckets.items():
+                self._tiles[tile] = (items, now)
+                self._tiles.move_to_end(tile)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+        return buckets
+
+    def _fetch_tiles(self, tiles):
+        boxes = [geohash_bbox(tile) for tile in tiles]
+        south = min(b[0] for b in boxes)
+        west = min(b[1] for b in boxes)
+        north = max(b[2] for b in boxes)
+        east = max(b[3] for b in boxes)
+        api = self._api()
+        with track("http", "overpass") as call:
+            result = api.query(self.query_builder(south, west, north, east, self.timeout))
+            call["bytes"] = getattr(api, "response_bytes", 0)
+        return self._store(tiles, self.result_parser(result))
+
+    def tiles_for(self, lat, lon, radius_km):
+        return geohashes_covering(lat, lon, radius_km, self.precision)
+
+    def split_cached(self, tiles):
+        """``({tile: Tile}, [missing tiles])`` without any network call"""
+        found, missing = {}, []
+        for tile in tiles:
+            cached = self.cached_tile(tile)
+            if cached is None:
+                missing.append(tile)
+            else:
+                found[tile] = cached
+        return found, missing
+
+    def fetch(self, tiles):
+        """Fetch ``tiles`` in one Overpass query, shared with concurrent callers asking for the same set"""
+        if not tiles:
+            return {}
+        key = tuple(sorted(tiles))
+        return self._flight.do(key, self._fetch_tiles, key)
+
+    def ensure_tiles(self, tiles):
+        """Fetch whichever tiles are missing or stale; returns ``{tile: Tile}`` for all of them"""
+        found, missing = self.split_cached(tiles)
+        found.update(self.fetch(missing))
+        return found
+
+    @staticmethod
+    def rank(lat, lon, radius_km, tiles, limit=None, offset=0):
+        """``[(element, distance_km), ...]`` from ``tiles`` within the radius, nearest first"""
+        tiles = [t for t in tiles if t.elements]
+        if not tiles:
+            return []
+        elements = [e for t in tiles for e in t.elements]
+        distances = haversine_km(lat, lon, np.concatenate([t.lats for t in tiles]), np.concatenate([t.lons for t in tiles]))
+        inside = (distances <= radius_km).nonzero()[0]
+        order = inside[nearest_order(distances[inside], limit, offset)]
+        return [(elements[i], float(distances[i])) for i in order]
+
+    def search(self, lat, lon, radius_km, limit=None, offset=0):
+        """``[(element, distance_km), ...]`` within the radius, nearest first"""
+        tiles = self.ensure_tiles(self.tiles_for(lat, lon, radius_km))
+        return self.rank(lat, lon, radius_km, tiles.values(), limit, offset)
+
+    def iter_search(self, lat, lon, radius_km):
+        """Yield the cached results first, then (if any tiles were missing) the freshly fetched ones.
+
+        Each batch is sorted by distance on its own.
+        """
+        found, missing = self.split_cached(self.tiles_for(lat, lon, radius_km))
+        yield self.rank(lat, lon, radius_km, found.values())
+        if missing:
+            yield self.rank(lat, lon, radius_km, self.fetch(missing).values())
+
+    def prefetch(self, points, radius_km):
+        """Warm the tiles around each ``(lat, lon)``; returns how many tiles were covered"""
+        covered = 0
+        for lat, lon in points:
+            try:
+                covered += len(self.ensure_tiles(self.tiles_for(lat, lon, radius_km)))
+            except Exception as e:
+                print(f"Error prefetching shelter tiles around {lat:.3f}, {lon:.3f}: {e}")
+        return covered
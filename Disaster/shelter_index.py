@@ -0,0 +1,143 @@
+"""
+In-memory spatial index over the shelters table.
+
+Shelters with coordinates are bucketed into a fixed-size lat/lon grid. Radius
+and k-nearest queries only look at the grid cells that can contain a match and
+compute distances for those candidates in one vectorized haversine pass.
+The index is refreshed incrementally from Supabase using ``updated_at``, with a
+periodic full reload to pick up deletions.
+"""
+import math
+import threading
+import time
+
+import numpy as np
+
+from geo import KM_PER_DEGREE_LAT, bounding_box, haversine_km, nearest_order
+
+SHELTER_COLUMNS = "id, name, location, capacity, available, latitude, longitude, updated_at"
+
+
+class _Snapshot:
+    """Immutable arrays + grid built from a set of shelter rows"""
+
+    def __init__(self, rows, cell_deg):
+        self.cell_deg = cell_deg
+        self.rows = list(rows)
+        located = [r for r in self.rows if r.get("latitude") is not None and r.get("longitude") is not None]
+        self.located = located
+        self.lats = np.array([float(r["latitude"]) for r in located], dtype=float)
+        self.lons = np.array([float(r["longitude"]) for r in located], dtype=float)
+        cells = {}
+        for i, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            cells.setdefault(self.cell(lat, lon), []).append(i)
+        self.cells = {k: np.array(v, dtype=np.intp) for k, v in cells.items()}
+
+    def cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def candidates(self, lat, lon, radius_km):
+        south, west, north, east = bounding_box(lat, lon, radius_km)
+        row0, col0 = self.cell(south, west)
+        row1, col1 = self.cell(north, east)
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self.cells):
+            return np.arange(len(self.located), dtype=np.intp)
+        hits = [self.cells[(r, c)] for r in range(row0, row1 + 1) for c in range(col0, col1 + 1) if (r, c) in self.cells]
+        return np.concatenate(hits) if hits else np.empty(0, dtype=np.intp)
+
+
+class ShelterIndex:
+    def __init__(self, cell_deg=0.1, full_reload_interval=3600, page_size=1000):
+        self.cell_deg = cell_deg
+        self.full_reload_interval = full_reload_interval
+        self.page_size = page_size
+        self._rows = {}
+        self._snapshot = _Snapshot([], cell_deg)
+        self._last_updated_at = None
+        self._last_full_reload = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._last_full_reload > 0
+
+    def __len__(self):
+        return len(self._snapshot.rows)
+
+    def all(self):
+        """Every indexed shelter row, with or without coordinates"""
+        return list(self._snapshot.rows)
+
+    def load(self, rows):
+        """Replace the index contents with ``rows`` (e.g. from a local import)"""
+        with self._lock:
+            self._rows = {r["id"]: r for r in rows}
+            self._last_updated_at = max((r.get("updated_at") for r in rows if r.get("updated_at")), default=None)
+            self._last_full_reload = time.monotonic()
+            self._snapshot = _Snapshot(self._rows.values(), self.cell_deg)
+
+    def upsert(self, rows):
+        """Merge changed rows into the index"""
+        if not rows:
+            return
+        with self._lock:
+            for r in rows:
+                self._rows[r["id"]] = r
+                if r.get("updated_at") and (self._last_updated_at is None or r["updated_at"] > self._last_updated_at):
+                    self._last_updated_at = r["updated_at"]
+            self._snapshot = _Snapshot(self._rows.values(), self.cell_deg)
+
+    def refresh(self, client):
+        """Pull changes from Supabase: incremental by updated_at, full reload when due"""
+        if client is None:
+            return 0
+        full = not self.loaded or time.monotonic() - self._last_full_reload >= self.full_reload_interval
+        if full:
+            rows = self._fetch(client, None)
+            self.load(rows)
+            return len(rows)
+        rows = self._fetch(client, self._last_updated_at)
+        self.upsert(rows)
+        return len(rows)
+
+    def _fetch(self, client, since):
+        rows = []
+        start = 0
+        while True:
+            query = client.table("shelters").select(SHELTER_COLUMNS)
+            if since:
+                query = query.gte("updated_at", since)
+            resp = query.order("id").range(start, start + self.page_size - 1).execute()
+            page = resp.data or []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            start += self.page_size
+
+    def within(self, lat, lon, radius_km, limit=None, offset=0):
+        """``[(shelter, distance_km), ...]`` within ``radius_km``, nearest first"""
+        snap = self._snapshot
+        index = snap.candidates(lat, lon, radius_km)
+        if not len(index):
+            return []
+        distances = haversine_km(lat, lon, snap.lats[index], snap.lons[index])
+        keep = distances <= radius_km
+        index, distances = index[keep], distances[keep]
+        order = nearest_order(distances, limit, offset)
+        return [(snap.located[i], float(d)) for i, d in zip(index[order], distances[order])]
+
+    def nearest(self, lat, lon, k=10, max_radius_km=None):
+        """The ``k`` nearest shelters, widening the search ring until enough are found"""
+        snap = self._snapshot
+        if not len(snap.located) or k <= 0:
+            return []
+        radius = self.cell_deg * KM_PER_DEGREE_LAT
+        while True:
+            found = self.within(lat, lon, radius, limit=k)
+            if len(found) >= k or len(found) == len(snap.located):
+                return found
+            if max_radius_km is not None and radius >= max_radius_km:
+                return found
+            radius = radius * 2 if max_radius_km is None else min(radius * 2, max_radius_km)
+            if radius > 20100:  # half the Earth's circumference: everything is in range
+                return self.within(lat, lon, 20100, limit=k)
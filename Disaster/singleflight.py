@@ -0,0 +1,53 @@
+"""
+Request coalescing: concurrent callers asking for the same key share one upstream call
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """The first caller for a key runs the function; concurrent callers wait for its result.
+
+    Nothing is remembered once the call finishes, so this complements a cache
+    rather than replacing it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        """Number of keys currently being fetched"""
+        with self._lock:
+            return len(self._calls)
@@ -65,6 +65,26 @@ create table if not exists public.shelters (
   created_at timestamptz default now()
 );
 
+-- Shelter coordinates for the in-memory spatial index; updated_at drives incremental refresh
+alter table if exists public.shelters add column if not exists latitude double precision;
+alter table if exists public.shelters add column if not exists longitude double precision;
+alter table if exists public.shelters add column if not exists updated_at timestamptz default now();
+
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at = now();
+  return new;
+end $$;
+
+drop trigger if exists shelters_touch_updated_at on public.shelters;
+create trigger shelters_touch_updated_at before update on public.shelters
+for each row execute function public.touch_updated_at();
+
+create index if not exists idx_shelters_updated_at on public.shelters(updated_at);
+
 -- Announcements from admins
 create table if not exists public.announcements (
   id bigserial primary key,
@@ -128,6 +148,15 @@ create table if not exists public.weather_data (
   fetched_at timestamptz default now()
 );
 
+-- Cities scanned for extreme weather (falls back to monitored_locations.json when empty)
+create table if not exists public.monitored_locations (
+  id bigserial primary key,
+  name text not null unique,
+  region text,
+  active boolean not null default true,
+  created_at timestamptz default now()
+);
+
 -- Update announcements table to include weather data
 alter table if exists public.announcements 
 add column if not exists weather_data_id bigint references public.weather_data(id),
@@ -152,6 +181,146 @@ end $$;
 -- Helpful index for embeds/filters
 create index if not exists idx_announcements_weather_data_id on public.announcements(weather_data_id);
 
+-- weather_data is an append-only time series: index the admin dashboard sort and per-location lookups
+create index if not exists idx_weather_data_fetched_at_extreme on public.weather_data(fetched_at desc, is_extreme desc);
+create index if not exists idx_weather_data_location_fetched_at on public.weather_data(location, fetched_at desc);
+
+-- Hourly/daily per-location aggregates of weather_data (kept after raw rows are pruned)
+create table if not exists public.weather_data_rollups (
+  location text not null,
+  granularity text not null check (granularity in ('hour', 'day')),
+  bucket_start timestamptz not null,
+  samples integer not null,
+  extreme_count integer not null default 0,
+  temperature_min numeric(5,2),
+  temperature_avg numeric(5,2),
+  temperature_max numeric(5,2),
+  humidity_avg numeric(5,2),
+  wind_speed_avg numeric(5,2),
+  wind_speed_max numeric(5,2),
+  primary key (location, granularity, bucket_start)
+);
+
+create index if not exists idx_weather_data_rollups_bucket on public.weather_data_rollups(granularity, bucket_start desc);
+
+-- How far each granularity has been rolled up. Raw rows before the lower of the two
+-- watermarks are summarized in weather_data_rollups and are the only ones pruned.
+create table if not exists public.weather_rollup_state (
+  granularity text primary key check (granularity in ('hour', 'day')),
+  rolled_up_to timestamptz not null
+);
+
+-- Recompute every bucket from the watermark (or p_since, if earlier; or the oldest raw
+-- row on the first run) up to now, then move the watermark to the current bucket.
+create or replace function public.rollup_weather_data(p_granularity text, p_since timestamptz default null)
+returns integer
+language plpgsql
+as $$
+declare
+  affected integer;
+  v_since timestamptz;
+  v_until timestamptz := date_trunc(p_granularity, now());
+begin
+  if p_granularity not in ('hour', 'day') then
+    raise exception 'unsupported granularity: %', p_granularity;
+  end if;
+
+  -- least() ignores nulls: the earlier of p_since and the watermark, whichever is set
+  select coalesce(
+    least(p_since, (select s.rolled_up_to from public.weather_rollup_state s where s.granularity = p_granularity)),
+    (select min(w.fetched_at) from public.weather_data w)
+  ) into v_since;
+  if v_since is null then
+    return 0;
+  end if;
+
+  insert into public.weather_data_rollups as r (
+    location, granularity, bucket_start, samples, extreme_count,
+    temperature_min, temperature_avg, temperature_max,
+    humidity_avg, wind_speed_avg, wind_speed_max
+  )
+  select
+    w.location,
+    p_granularity,
+    date_trunc(p_granularity, w.fetched_at),
+    count(*),
+    count(*) filter (where w.is_extreme),
+    min(w.temperature),
+    avg(w.temperature),
+    max(w.temperature),
+    avg(w.humidity),
+    avg(w.wind_speed),
+    max(w.wind_speed)
+  from public.weather_data w
+  where w.fetched_at >= date_trunc(p_granularity, v_since)
+  group by w.location, date_trunc(p_granularity, w.fetched_at)
+  on conflict (location, granularity, bucket_start) do update set
+    samples = excluded.samples,
+    extreme_count = excluded.extreme_count,
+    temperature_min = excluded.temperature_min,
+    temperature_avg = excluded.temperature_avg,
+    temperature_max = excluded.temperature_max,
+    humidity_avg = excluded.humidity_avg,
+    wind_speed_avg = excluded.wind_speed_avg,
+    wind_speed_max = excluded.wind_speed_max;
+
+  get diagnostics affected = row_count;
+
+  insert into public.weather_rollup_state as s (granularity, rolled_up_to)
+  values (p_granularity, v_until)
+  on conflict (granularity) do update set rolled_up_to = greatest(s.rolled_up_to, excluded.rolled_up_to);
+
+  return affected;
+end $$;
+
+-- Delete up to p_batch_size raw readings older than p_before, oldest first. Only rows
+-- already rolled up at both granularities (before both watermarks) are deleted, and rows
+-- still referenced by an announcement are kept. Returns the number deleted.
+create or replace function public.prune_weather_data(p_before timestamptz, p_batch_size integer default 5000)
+returns integer
+language plpgsql
+as $$
+declare
+  deleted integer;
+  v_watermark timestamptz;
+begin
+  select case when count(*) = 2 then min(s.rolled_up_to) end into v_watermark
+  from public.weather_rollup_state s
+  where s.granularity in ('hour', 'day');
+  if v_watermark is null then
+    return 0;
+  end if;
+
+  delete from public.weather_data
+  where id in (
+    select w.id
+    from public.weather_data w
+    where w.fetched_at < least(p_before, v_watermark)
+      and not exists (select 1 from public.announcements a where a.weather_data_id = w.id)
+    order by w.fetched_at
+    limit p_batch_size
+  );
+
+  get diagnostics deleted = row_count;
+  return deleted;
+end $$;
+
+-- Latest reading per location since p_since, one row per location in location order
+-- (served by idx_weather_data_location_fetched_at). Paged by location with p_after so
+-- long location lists aren't cut off by PostgREST's max-rows.
+create or replace function public.latest_weather_fetches(p_since timestamptz, p_after text default null, p_limit integer default 1000)
+returns table (location text, fetched_at timestamptz)
+language sql
+stable
+as $$
+  select distinct on (w.location) w.location, w.fetched_at
+  from public.weather_data w
+  where w.fetched_at >= p_since
+    and (p_after is null or w.location > p_after)
+  order by w.location, w.fetched_at desc
+  limit p_limit;
+$$;
+
 -- Emergency response: teams, assignments, and updates
 create table if not exists public.emergency_assignments (
   id bigserial primary key,
@@ -199,6 +368,103 @@ create table if not exists public.emergency_notifications (
   created_at timestamptz default now()
 );
 
+-- Emergency-head lookups for notifications (explicit heads, then the emergency role)
+create index if not exists idx_users_emergency_heads on public.users(id) where is_emergency_head;
+create index if not exists idx_users_role on public.users(role);
+
+-- Bumped (by statement triggers) whenever roles, head flags or unit heads change,
+-- so app instances can tell their cached emergency-head directory is stale even
+-- when the change was made outside the app (SQL editor, dashboard)
+create table if not exists public.emergency_heads_version (
+  id boolean primary key default true check (id),
+  version bigint not null default 0,
+  changed_at timestamptz not null default now()
+);
+insert into public.emergency_heads_version (id) values (true) on conflict do nothing;
+
+create or replace function public.bump_emergency_heads_version()
+returns trigger
+language plpgsql
+as $$
+begin
+  insert into public.emergency_heads_version (id, version) values (true, 1)
+  on conflict (id) do update set version = emergency_heads_version.version + 1, changed_at = now();
+  return null;
+end $$;
+
+drop trigger if exists users_bump_emergency_heads_version on public.users;
+create trigger users_bump_emergency_heads_version after insert or delete or update of role, is_emergency_head on public.users
+for each statement execute function public.bump_emergency_heads_version();
+
+drop trigger if exists emergency_units_bump_emergency_heads_version on public.emergency_units;
+create trigger emergency_units_bump_emergency_heads_version after insert or delete or update of head_id on public.emergency_units
+for each statement execute function public.bump_emergency_heads_version();
+
+-- Dispatch a head's unit to a request in one transaction: the unit only moves
+-- Free -> Busy if it is still Free, so two heads can't dispatch it twice. Then
+-- the assignment is created and the head's notification acknowledged. Raises
+-- 'unit_not_free' / 'unit_not_found' / 'request_not_found' (nothing is changed).
+create or replace function public.head_assign_unit(p_request_id bigint, p_unit_id bigint, p_head_id uuid)
+returns public.emergency_assignments
+language plpgsql
+as $$
+declare
+  v_unit public.emergency_units;
+  v_location text;
+  v_assignment public.emergency_assignments;
+begin
+  update public.emergency_units
+  set status = 'Busy', last_update = now()
+  where id = p_unit_id and head_id = p_head_id and status = 'Free'
+  returning * into v_unit;
+
+  if not found then
+    if exists (select 1 from public.emergency_units where id = p_unit_id and head_id = p_head_id) then
+      raise exception 'unit_not_free';
+    end if;
+    raise exception 'unit_not_found';
+  end if;
+
+  select i.location into v_location
+  from public.requests r
+  left join public.incidents i on i.id = r.incident_id
+  where r.id = p_request_id;
+
+  if not found then
+    raise exception 'request_not_found';
+  end if;
+
+  insert into public.emergency_assignments (request_id, team_name, team_type, team_lead_id, location_text, notes, status)
+  values (p_request_id, v_unit.unit_name, v_unit.unit_category, p_head_id, v_location, 'Assigned unit #' || v_unit.id, 'Assigned')
+  returning * into v_assignment;
+
+  update public.emergency_notifications
+  set status = 'Acknowledged'
+  where request_id = p_request_id and head_id = p_head_id;
+
+  return v_assignment;
+end $$;
+
+-- Hot-path indexes: one per route filter + order (benchmark_indexes.py measures them).
+-- The admin data view pages by (column desc nulls last, id desc), dashboards by column desc
+-- (the admin dashboard's recent incidents use nulls last so idx_incidents_timestamp serves both).
+create index if not exists idx_users_phone on public.users(phone);
+create index if not exists idx_users_created_at on public.users(created_at desc nulls last, id desc);
+create index if not exists idx_incidents_user_timestamp on public.incidents(user_id, timestamp desc);
+create index if not exists idx_incidents_timestamp on public.incidents(timestamp desc nulls last, id desc);
+create index if not exists idx_donations_user_timestamp on public.donations(user_id, timestamp desc);
+create index if not exists idx_donations_timestamp on public.donations(timestamp desc nulls last, id desc);
+create index if not exists idx_announcements_timestamp on public.announcements(timestamp desc nulls last, id desc);
+create index if not exists idx_medical_requests_created_at on public.medical_requests(created_at desc nulls last, id desc);
+create index if not exists idx_requests_timestamp on public.requests(timestamp desc);
+create index if not exists idx_team_allocations_assigned_at on public.team_allocations(assigned_at desc);
+create index if not exists idx_emergency_assignments_lead_assigned_at on public.emergency_assignments(team_lead_id, assigned_at desc);
+create index if not exists idx_emergency_assignments_assigned_at on public.emergency_assignments(assigned_at desc);
+create index if not exists idx_emergency_updates_assignment_created_at on public.emergency_updates(assignment_id, created_at desc, id desc);
+create index if not exists idx_emergency_notifications_head_created_at on public.emergency_notifications(head_id, created_at desc);
+create index if not exists idx_emergency_notifications_request_head on public.emergency_notifications(request_id, head_id);
+create index if not exists idx_emergency_units_head_name on public.emergency_units(head_id, unit_name);
+
 -- Insert sample shelters
 insert into public.shelters (name, location, capacity, available) values
 ('Central Emergency Shelter', 'Downtown District', 200, 150),
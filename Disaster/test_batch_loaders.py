@@ -0,0 +1,52 @@
+"""
+Batched child loaders against the in-process fake Supabase backend.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from batch_loaders import load_children, load_latest_updates
+
+
+@pytest.fixture
+def updates(fake, add_users):
+    """Seven assignments; every one but the first has five updates a minute apart"""
+    head_id, = add_users("emergency")
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    fake.load({
+        "incidents": [{"user_id": head_id, "location": "Ward 1", "pincode": "302001", "description": "Synthetic"}],
+        "requests": [{"admin_id": head_id, "incident_id": 1}],
+        "emergency_assignments": [{"request_id": 1, "team_name": f"Unit {a}", "team_type": "Rescue", "team_lead_id": head_id}
+                                  for a in range(7)],
+        "emergency_updates": [{"assignment_id": a + 1, "author_id": head_id, "message": f"Update {u}",
+                               "created_at": now + timedelta(minutes=u)}
+                              for a in range(1, 7) for u in range(5)],
+    })
+    fake.stats.clear()
+    return fake
+
+
+def test_latest_updates_capped_and_newest_first(updates):
+    grouped = load_latest_updates(updates, [1, 2, 3, None, 2], per_assignment=3)
+    assert set(grouped) == {1, 2, 3}
+    assert grouped[1] == []
+    assert [u["message"] for u in grouped[2]] == ["Update 4", "Update 3", "Update 2"]
+    assert len(grouped[3]) == 3
+
+
+def test_chunks_and_pages_past_the_row_cap(updates):
+    ids = list(range(1, 8))
+    grouped = load_children(updates, "emergency_updates", "assignment_id", ids, order_column="created_at",
+                            chunk_size=3, page_size=4)
+    assert sum(len(rows) for rows in grouped.values()) == 30
+    assert all(len(grouped[i]) == 5 for i in ids[1:])
+    # Chunks of 3, 3 and 1 ids hold 10, 15 and 5 rows: 3 + 4 + 2 pages of at most 4
+    assert updates.stats["calls"] == 9
+
+
+def test_cap_stops_paging_once_every_parent_is_full(updates):
+    grouped = load_children(updates, "emergency_updates", "assignment_id", [2, 3], per_parent=2,
+                            order_column="created_at", page_size=4)
+    assert [len(grouped[2]), len(grouped[3])] == [2, 2]
+    # The first page of 4 fills both parents
+    assert updates.stats["calls"] == 1
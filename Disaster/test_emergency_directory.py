@@ -0,0 +1,124 @@
+"""
+EmergencyHeadDirectory: who gets notified, caching, invalidation and the schema's version triggers.
+"""
+from emergency_directory import EmergencyHeadDirectory
+
+
+def _unit(head_id, name="Rescue 1"):
+    return {"head_id": head_id, "unit_name": name, "unit_category": "Rescue"}
+
+
+def test_explicit_heads_first(fake, add_users):
+    _, head = add_users("admin", "emergency")
+    fake.table("users").insert({"id": "00000000-0000-4000-8000-000000000099", "name": "Crew", "email": "crew@example.com",
+                                "phone": "9000000099", "role": "emergency", "is_emergency_head": False}).execute()
+
+    assert EmergencyHeadDirectory().head_ids(fake) == [head]
+
+
+def test_falls_back_to_role_then_unit_owners(fake, add_users):
+    gov, user = add_users("government", "user")
+    fake.table("emergency_units").insert([_unit(gov), _unit(gov, "Rescue 2")]).execute()
+    assert EmergencyHeadDirectory().head_ids(fake) == [gov]
+
+    fake.table("users").update({"role": "emergency"}).eq("id", user).execute()
+    assert EmergencyHeadDirectory().head_ids(fake) == [user]
+
+
+def test_cached_until_invalidated(fake, add_users):
+    head, = add_users("emergency")
+    directory = EmergencyHeadDirectory(ttl=300, check_interval=300)
+    assert directory.head_ids(fake) == [head]
+    selects = fake.stats["users.select"]
+
+    assert directory.head_ids(fake) == [head]
+    assert fake.stats["users.select"] == selects
+
+    second, = add_users("emergency")
+    directory.invalidate()
+    assert sorted(directory.head_ids(fake)) == sorted([head, second])
+
+
+def test_empty_result_is_not_cached(fake, add_users):
+    directory = EmergencyHeadDirectory()
+    assert directory.head_ids(fake) == []
+    head, = add_users("emergency")
+    assert directory.head_ids(fake) == [head]
+
+
+def test_resolve_from_an_older_generation_is_not_cached(fake, add_users):
+    head, = add_users("emergency")
+    directory = EmergencyHeadDirectory(ttl=300, check_interval=300)
+    resolve = directory._resolve
+
+    def slow_resolve(client):
+        head_ids = resolve(client)
+        # The user is demoted and the app invalidates while this resolve is in flight
+        fake.table("users").update({"role": "user", "is_emergency_head": False}).eq("id", head).execute()
+        directory.invalidate()
+        return head_ids
+
+    directory._resolve = slow_resolve
+    assert directory.head_ids(fake) == [head]
+    directory._resolve = resolve
+
+    gov, = add_users("government")
+    fake.table("emergency_units").insert(_unit(gov)).execute()
+    assert directory.head_ids(fake) == [gov]
+
+
+def test_version_bumps_on_role_and_head_changes(fake, add_users):
+    head, admin = add_users("emergency", "admin")
+    version = lambda: fake.table("emergency_heads_version").select("version").execute().data
+
+    fake.table("users").update({"name": "Renamed"}).eq("id", head).execute()
+    assert version() == []
+
+    fake.table("users").update({"role": "admin"}).eq("id", admin).execute()
+    assert version() == [{"version": 1}]
+    fake.table("emergency_units").insert(_unit(head)).execute()
+    fake.table("emergency_units").update({"status": "Busy"}).eq("head_id", head).execute()
+    assert version() == [{"version": 2}]
+    fake.table("emergency_units").update({"head_id": admin}).eq("head_id", head).execute()
+    assert version() == [{"version": 3}]
+
+
+def test_picks_up_changes_made_outside_the_app(fake, add_users, monkeypatch):
+    head, other = add_users("emergency", "user")
+    clock = [1000.0]
+    monkeypatch.setattr("emergency_directory.time.monotonic", lambda: clock[0])
+    directory = EmergencyHeadDirectory(ttl=300, check_interval=30)
+    assert directory.head_ids(fake) == [head]
+
+    # Promoted straight in the database: no invalidate(), only the version row moves
+    fake.table("users").update({"is_emergency_head": True, "role": "emergency"}).eq("id", other).execute()
+    clock[0] += 10
+    assert directory.head_ids(fake) == [head]
+
+    clock[0] += 30
+    assert sorted(directory.head_ids(fake)) == sorted([head, other])
+
+    # An unchanged version keeps the cached heads without resolving again
+    selects = fake.stats["users.select"]
+    clock[0] += 30
+    assert sorted(directory.head_ids(fake)) == sorted([head, other])
+    assert fake.stats["users.select"] == selects
+    assert fake.stats["emergency_heads_version.select"] == 3
+
+
+def test_ttl_only_without_version_table(fake, add_users, monkeypatch):
+    head, = add_users("emergency")
+    del fake.schema["emergency_heads_version"]
+    clock = [1000.0]
+    monkeypatch.setattr("emergency_directory.time.monotonic", lambda: clock[0])
+    directory = EmergencyHeadDirectory(ttl=300, check_interval=30)
+    assert directory.head_ids(fake) == [head]
+
+    selects = fake.stats["users.select"]
+    clock[0] += 60
+    assert directory.head_ids(fake) == [head]
+    assert fake.stats["users.select"] == selects
+
+    clock[0] += 300
+    assert directory.head_ids(fake) == [head]
+    assert fake.stats["users.select"] == selects + 1
@@ -0,0 +1,59 @@
+"""
+Dashboard query fan-out: deadlines, failures and defaults.
+"""
+import threading
+import time
+
+from fake_supabase import FakeSupabaseClient
+from fanout import fan_out
+
+
+def test_results_and_failures():
+    def broken():
+        raise RuntimeError("relation does not exist")
+
+    result = fan_out({"ok": lambda: [1, 2], "broken": broken, "empty": lambda: []}, deadline=2, default=list)
+    assert result.results == {"ok": [1, 2], "broken": [], "empty": []}
+    assert result.errors == {"broken": "relation does not exist"}
+
+
+def test_deadline():
+    release = threading.Event()
+    started = time.monotonic()
+    result = fan_out({"fast": lambda: "done", "slow": lambda: release.wait(5)}, deadline=0.2, default=dict)
+    release.set()
+    assert time.monotonic() - started < 2
+    assert result.results == {"fast": "done", "slow": {}}
+    assert result.errors == {"slow": "timed out"}
+
+
+def test_without_default_failed_names_are_missing():
+    result = fan_out({"broken": lambda: 1 / 0}, deadline=2)
+    assert result.results == {}
+    assert result.errors == {"broken": "division by zero"}
+
+
+def test_queries_overlap():
+    client = FakeSupabaseClient(latency=0.2)
+    queries = {f"q{i}": (lambda: client.table("users").select("*").execute().data) for i in range(4)}
+    started = time.monotonic()
+    result = fan_out(queries, deadline=5, default=list)
+    assert not result.errors
+    # Four 0.2 s round trips in parallel, not back to back
+    assert time.monotonic() - started < 0.6
+
+
+def test_concurrent_requests_dont_queue_behind_each_other():
+    outcomes = []
+
+    def dashboard():
+        queries = {f"q{i}": (lambda: time.sleep(0.3) or []) for i in range(8)}
+        outcomes.append(fan_out(queries, deadline=1.5, default=list, max_workers=8))
+
+    # Eight dashboards of eight 0.3 s queries: 2.4 s if they all shared eight threads
+    requests = [threading.Thread(target=dashboard) for _ in range(8)]
+    for r in requests:
+        r.start()
+    for r in requests:
+        r.join()
+    assert [o.errors for o in outcomes] == [{}] * 8
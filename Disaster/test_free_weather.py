@@ -1,10 +1,13 @@
 """
 Simple test for free weather API (wttr.in) used by the app.
 Returns True if a basic request succeeds and returns JSON structure.
+The replay test runs offline against the recorded payloads in fixtures/wttr.
 """
 from urllib.parse import quote
 import requests
 
+from weather_providers import ProviderHTTPError, ReplayWeatherProvider
+
 
 def test_free_weather_api() -> bool:
     try:
@@ -18,6 +21,22 @@ def test_free_weather_api() -> bool:
         return False
 
 
+def test_replay_weather_provider():
+    provider = ReplayWeatherProvider(backoff=0)
+    hot = provider.fetch("Jaipur, Rajasthan, India")
+    assert hot["is_extreme"] and hot["temperature"] == 44.0
+    assert provider.fetch("Somewhere, India")["location"] == "Somewhere, India"
+
+    # Every call is throttled: retries are exhausted and the 429 surfaces
+    throttled = ReplayWeatherProvider(throttle_rate=1.0, retries=2, backoff=0)
+    try:
+        throttled.fetch("Delhi, India")
+        assert False, "expected a 429"
+    except ProviderHTTPError as e:
+        assert e.status == 429
+    assert throttled.stats["calls"] == 3
+
+
 if __name__ == "__main__": 
     ok = test_free_weather_api()
     print("OK" if ok else "FAIL")
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+GeocodingService: memory and SQLite cache layers, negative caching and Nominatim throttling.
+"""
+import threading
+import time
+
+import pytest
+
+import geocoding
+from geocoding import GeocodingService
+
+
+class Place:
+    def __init__(self, query):
+        self.latitude, self.longitude, self.address = 28.6, 77.2, f"{query}, India"
+
+
+class FakeNominatim:
+    """Knows every query except those containing "nowhere"; records when it was called"""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def geocode(self, query):
+        self.calls.append((query, time.monotonic()))
+        time.sleep(self.delay)
+        return None if "nowhere" in query.lower() else Place(query)
+
+
+@pytest.fixture
+def nominatim():
+    return FakeNominatim()
+
+
+@pytest.fixture
+def service(tmp_path, nominatim):
+    def make(**options):
+        options.setdefault("min_interval", 0)
+        return GeocodingService(str(tmp_path / "geocode.sqlite3"), geocoder=nominatim, **options)
+    return make
+
+
+def test_repeat_queries_are_served_from_memory(service, nominatim):
+    geo = service()
+    first = geo.geocode("Delhi, India")
+    assert geo.geocode(" delhi,india ") == first and first.address == "Delhi, India, India"
+    assert len(nominatim.calls) == 1
+
+
+def test_the_disk_cache_survives_a_restart(service, nominatim):
+    service().geocode("Delhi, India")
+    restarted = service()
+    assert restarted.cached("Delhi, India").latitude == 28.6
+    assert restarted.geocode("Delhi, India") is not None
+    assert len(nominatim.calls) == 1
+
+
+def test_misses_are_cached_until_the_negative_ttl(service, nominatim, monkeypatch):
+    geo = service(negative_ttl=60)
+    assert geo.geocode("Nowhere, India") is None
+    assert geo.geocode("Nowhere, India") is None
+    assert len(nominatim.calls) == 1
+
+    later = time.time() + 61
+    monkeypatch.setattr(geocoding.time, "time", lambda: later)
+    assert geo.geocode("Nowhere, India") is None
+    assert len(nominatim.calls) == 2
+
+
+def test_cached_never_calls_upstream(service, nominatim):
+    geo = service()
+    assert geo.cached("Delhi, India") is None
+    geo.geocode("Delhi, India")
+    geo.geocode("Nowhere, India")
+    assert geo.cached("Delhi, India") is not None and geo.cached("Nowhere, India") is None
+    assert len(nominatim.calls) == 2
+
+
+def test_upstream_calls_are_spaced(service, nominatim):
+    geo = service(min_interval=0.1)
+    for city in ("Delhi", "Pune", "Agra"):
+        geo.geocode(city)
+    times = [t for _, t in nominatim.calls]
+    assert all(b - a >= 0.095 for a, b in zip(times, times[1:]))
+
+
+def test_concurrent_misses_share_one_lookup(tmp_path):
+    nominatim = FakeNominatim(delay=0.2)
+    geo = GeocodingService(str(tmp_path / "geocode.sqlite3"), geocoder=nominatim, min_interval=0)
+    threads = [threading.Thread(target=geo.geocode, args=("Delhi, India",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(nominatim.calls) == 1
+
+
+def test_memory_is_bounded(nominatim):
+    geo = GeocodingService("", geocoder=nominatim, min_interval=0, max_entries=2)
+    for city in ("Delhi", "Pune", "Agra", "Delhi"):
+        geo.geocode(city)
+    assert [q for q, _ in nominatim.calls] == ["Delhi", "Pune", "Agra", "Delhi"]
+
+
+def test_prewarm_skips_cached_queries(service, nominatim):
+    geo = service()
+    geo.geocode("Delhi")
+    assert geo.prewarm(["Delhi", "Pune", "pune", "Nowhere", ""]) == (2, 1)
+    assert [q for q, _ in nominatim.calls] == ["Delhi", "Pune", "Nowhere"]
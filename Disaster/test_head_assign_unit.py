@@ -0,0 +1,67 @@
+"""
+Unit dispatch through the head_assign_unit database function, on the fake backend.
+"""
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def dispatch(web, fake, add_users):
+    """Two requests for one incident, a notified head with one free unit, and another head's unit"""
+    admin_id, head_id, other_head_id = add_users("admin", "emergency", "emergency")
+    fake.load({
+        "incidents": [{"user_id": admin_id, "location": "Ward 1, Jaipur", "pincode": "302001", "description": "Flood"}],
+        "requests": [{"admin_id": admin_id, "incident_id": 1}, {"admin_id": admin_id, "incident_id": 1}],
+        "emergency_notifications": [{"request_id": 1, "gov_id": admin_id, "head_id": head_id}],
+        "emergency_units": [{"head_id": head_id, "unit_name": "Rescue 1", "unit_category": "Rescue"},
+                            {"head_id": other_head_id, "unit_name": "Rescue 2", "unit_category": "Rescue"}],
+    })
+
+    def assign(request_id, unit_id):
+        """Post the form as the head; returns the flashed ``(category, message)`` pairs"""
+        client = web.app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(user="Head", user_id=head_id, user_role="emergency")
+        resp = client.post("/head_assign_unit", data={"request_id": request_id, "unit_id": unit_id})
+        assert resp.status_code == 302
+        with client.session_transaction() as sess:
+            return sess.get("_flashes", [])
+
+    return assign
+
+
+def test_assigns_and_acknowledges(fake, dispatch):
+    assert dispatch(1, 1) == [("success", "Unit assigned and government notified.")]
+    assignment = fake.table("emergency_assignments").select("*").execute().data
+    assert [(a["request_id"], a["team_name"], a["location_text"]) for a in assignment] == [(1, "Rescue 1", "Ward 1, Jaipur")]
+    assert fake.table("emergency_units").select("status").eq("id", 1).execute().data[0]["status"] == "Busy"
+    assert fake.table("emergency_notifications").select("status").execute().data[0]["status"] == "Acknowledged"
+
+
+@pytest.mark.parametrize("request_id, unit_id, code", [
+    (1, 2, "unit_not_found"),  # another head's unit
+    (1, 99, "unit_not_found"),
+    (99, 1, "request_not_found"),
+])
+def test_error_mapping(web, fake, dispatch, request_id, unit_id, code):
+    assert dispatch(request_id, unit_id) == [("warning", web.ASSIGN_UNIT_ERRORS[code])]
+    assert fake.table("emergency_assignments").select("id").execute().data == []
+
+
+def test_racing_requests_dispatch_a_unit_once(web, fake, dispatch):
+    flashes = []
+    barrier = threading.Barrier(6)
+
+    def worker(request_id):
+        barrier.wait()
+        flashes.extend(dispatch(request_id, 1))
+
+    workers = [threading.Thread(target=worker, args=(1 + n % 2,)) for n in range(6)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert sorted(category for category, _ in flashes) == ["success"] + ["warning"] * 5
+    assert {message for category, message in flashes if category == "warning"} == {web.ASSIGN_UNIT_ERRORS["unit_not_free"]}
+    assert len(fake.table("emergency_assignments").select("id").execute().data) == 1
@@ -0,0 +1,97 @@
+"""
+Call instrumentation: histograms, error and byte counters, route labels and the /metrics page.
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from geocoding import GeocodingService, _sized_requests_adapter
+from metrics import InstrumentedClient, estimate_json_bytes, track
+from overpass_tiles import OverpassTileCache
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(metrics, "settings", {"enabled": True, "slow_seconds": 60})
+    metrics.registry.clear()
+    yield metrics.registry
+    metrics.registry.clear()
+
+
+def _counter(name, **labels):
+    return metrics.registry._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def _histogram(name, **labels):
+    return metrics.registry._histograms.get((name, tuple(sorted(labels.items()))))
+
+
+def test_track_records_latency_errors_and_bytes():
+    with track("http", "wttr") as call:
+        call["bytes"] = 1200
+    with pytest.raises(TimeoutError):
+        with track("http", "wttr"):
+            raise TimeoutError()
+    assert _histogram("http_client_request_seconds", route="background", service="wttr").count == 2
+    assert _counter("http_client_errors_total", route="background", service="wttr") == 1
+    assert _counter("http_client_response_bytes_total", route="background", service="wttr") == 1200
+
+
+def test_render_is_prometheus_text():
+    with track("supabase", "users"):
+        pass
+    text = metrics.registry.render()
+    assert "# TYPE supabase_query_seconds histogram" in text
+    assert 'supabase_query_seconds_bucket{route="background",table="users",le="+Inf"} 1' in text
+    assert 'supabase_query_seconds_count{route="background",table="users"} 1' in text
+
+
+def test_response_size_is_estimated_from_one_row():
+    rows = [{"id": n, "name": "Shelter"} for n in range(100)]
+    assert estimate_json_bytes(rows) == len('{"id": 0, "name": "Shelter"}') * 100
+    assert estimate_json_bytes([]) == 0 and estimate_json_bytes({"id": 1}) == len('{"id": 1}')
+
+
+def test_instrumented_client_labels_tables_and_functions(fake, add_users):
+    add_users("admin", "public")
+    client = InstrumentedClient(fake)
+    client.table("users").select("id, name").eq("role", "public").execute()
+    client.rpc("prune_weather_data", {"p_before": "2000-01-01T00:00:00+00:00"}).execute()
+    assert _histogram("supabase_query_seconds", route="background", table="users").count == 1
+    assert _counter("supabase_response_bytes_total", route="background", table="users") > 0
+    assert _histogram("supabase_query_seconds", route="background", table="rpc:prune_weather_data").count == 1
+
+
+def test_overpass_response_size():
+    api = SimpleNamespace(response_bytes=5000, query=lambda text: SimpleNamespace(nodes=[], ways=[], relations=[]))
+    OverpassTileCache(api_factory=lambda: api).search(28.6, 77.2, 1)
+    assert _counter("http_client_response_bytes_total", route="background", service="overpass") == 5000
+
+
+def test_nominatim_response_size(monkeypatch):
+    from geopy.geocoders import Nominatim
+
+    body = json.dumps([{"lat": "28.61", "lon": "77.20", "display_name": "New Delhi, India"}]).encode()
+    adapter = _sized_requests_adapter()(proxies=None, ssl_context=None)
+    response = SimpleNamespace(status_code=200, content=body, json=lambda: json.loads(body))
+    monkeypatch.setattr(adapter.session, "get", lambda url, **kwargs: response)
+    service = GeocodingService("", min_interval=0, geocoder=Nominatim(user_agent="test", adapter_factory=lambda **kwargs: adapter))
+    assert service.geocode("New Delhi").latitude == 28.61
+    assert _counter("http_client_response_bytes_total", route="background", service="nominatim") == len(body)
+
+
+def test_streamed_exports_are_labelled_with_their_route(web, fake, add_users, monkeypatch):
+    admin_id, = add_users("admin")
+    monkeypatch.setattr(web, "supabase", InstrumentedClient(fake))
+    client = web.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user="Admin", user_id=admin_id, user_role="admin")
+    resp = client.get("/admin/data_view/export/users?format=ndjson")
+    assert resp.status_code == 200 and admin_id in resp.get_data(as_text=True)
+    assert _histogram("supabase_query_seconds", route="admin_data_export", table="users").count >= 1
+    assert _histogram("supabase_query_seconds", route="background", table="users") is None
+
+    assert client.get("/metrics").status_code == 200
+    assert web.app.test_client().get("/metrics").status_code == 401
@@ -0,0 +1,70 @@
+"""
+Monitored location loading and incremental scan planning against the fake backend.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from monitored_locations import (latest_fetch_times, load_locations_file, load_monitored_locations,
+                                 plan_incremental_scan, select_due_locations)
+
+NOW = datetime.now(timezone.utc)
+
+
+def _readings(location, *hours_ago):
+    return [{"location": location, "temperature": 30, "humidity": 50, "wind_speed": 10, "weather_condition": "Clear",
+             "fetched_at": NOW - timedelta(hours=h)} for h in hours_ago]
+
+
+def test_locations_file_skips_inactive_entries(tmp_path):
+    path = tmp_path / "cities.json"
+    path.write_text(json.dumps(["Delhi, India", {"name": "Pune, India"}, {"name": "Goa, India", "active": False}]))
+    assert load_locations_file(str(path)) == ["Delhi, India", "Pune, India"]
+
+
+def test_table_is_preferred_over_the_file(fake, tmp_path):
+    path = tmp_path / "cities.json"
+    path.write_text(json.dumps(["Delhi, India"]))
+    assert load_monitored_locations(fake, str(path)) == ["Delhi, India"]
+    fake.load({"monitored_locations": [{"name": "Pune, India"}, {"name": "Agra, India"}, {"name": "Goa, India", "active": False}]})
+    assert load_monitored_locations(fake, str(path)) == ["Agra, India", "Pune, India"]
+
+
+def test_latest_fetch_time_per_location(fake):
+    fake.load({"weather_data": _readings("Delhi, India", 5, 1, 3) + _readings("delhi,india", 2) + _readings("Pune, India", 30, 8)})
+    latest = latest_fetch_times(fake, NOW - timedelta(hours=12))
+    assert sorted(latest) == ["delhi, india", "pune, india"]
+    assert abs(latest["delhi, india"] - (NOW - timedelta(hours=1))) < timedelta(seconds=1)
+    assert abs(latest["pune, india"] - (NOW - timedelta(hours=8))) < timedelta(seconds=1)
+
+
+def test_latest_fetch_times_pages_by_location_not_by_reading(fake):
+    cities = [f"City {n:02d}, India" for n in range(7)]
+    fake.load({"weather_data": [r for city in cities for r in _readings(city, *range(1, 40))]})
+    calls = fake.stats["calls"]
+    latest = latest_fetch_times(fake, NOW - timedelta(days=2), page_size=3)
+    # 273 readings, but only 7 locations: pages of 3, 3 and 1
+    assert len(latest) == 7 and fake.stats["calls"] - calls == 3
+
+
+def test_alerted_locations_use_the_shorter_window():
+    latest = {"delhi, india": NOW - timedelta(minutes=20), "pune, india": NOW - timedelta(minutes=20)}
+    due = select_due_locations(["Delhi, India", "Pune, India", "Agra, India"], latest, {"pune, india"},
+                               fresh_window=3600, alert_window=900, now=NOW)
+    assert due == ["Pune, India", "Agra, India"]
+
+
+@pytest.fixture
+def alert(fake, add_users):
+    """An active weather alert for Pune"""
+    admin_id, = add_users("admin")
+    fake.load({"weather_data": _readings("Pune, India", 0.3)})
+    fake.load({"announcements": [{"title": "Extreme Weather Alert - Pune", "description": "Heat", "admin_id": admin_id,
+                                  "weather_data_id": 1, "is_weather_alert": True}]})
+
+
+def test_plan_incremental_scan(fake, alert):
+    fake.load({"weather_data": _readings("Delhi, India", 0.3)})
+    due, alerted = plan_incremental_scan(fake, ["Delhi, India", "Pune, India", "Agra, India"], fresh_window=3600, alert_window=900)
+    assert due == ["Pune, India", "Agra, India"] and alerted == {"pune, india"}
@@ -0,0 +1,40 @@
+"""
+Offline OSM shelter store: multi-file imports replace the store together.
+"""
+import json
+
+from osm_shelters import OsmShelterStore, main
+
+
+def _extract(path, features):
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "id": osm_id, "properties": {"amenity": "shelter", "name": name},
+         "geometry": {"type": "Point", "coordinates": [lon, lat]}}
+        for osm_id, name, lat, lon in features
+    ]}))
+    return str(path)
+
+
+def test_import_several_extracts(tmp_path):
+    db = str(tmp_path / "shelters.sqlite")
+    north = _extract(tmp_path / "north.geojson", [("node/1", "North A", 28.6, 77.2), ("node/2", "North B", 28.7, 77.1)])
+    south = _extract(tmp_path / "south.geojson", [("node/3", "South A", 12.9, 77.6)])
+
+    assert main(["import", north, south, "--db", db, "--batch-size", "1"]) == 0
+    assert sorted(r["id"] for r in OsmShelterStore(db).rows()) == ["node/1", "node/2", "node/3"]
+
+    # Importing the same files again keeps everything; a later single-file import replaces the store
+    assert main(["import", north, south, "--db", db]) == 0
+    assert len(OsmShelterStore(db).rows()) == 3
+    assert main(["import", south, "--db", db]) == 0
+    assert [r["id"] for r in OsmShelterStore(db).rows()] == ["node/3"]
+
+
+def test_failed_import_keeps_store(tmp_path):
+    db = str(tmp_path / "shelters.sqlite")
+    north = _extract(tmp_path / "north.geojson", [("node/1", "North A", 28.6, 77.2)])
+    assert main(["import", north, "--db", db]) == 0
+
+    south = _extract(tmp_path / "south.geojson", [("node/3", "South A", 12.9, 77.6)])
+    assert main(["import", south, str(tmp_path / "missing.geojson"), "--db", db]) == 1
+    assert "node/1" in {r["id"] for r in OsmShelterStore(db).rows()}
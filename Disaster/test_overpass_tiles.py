@@ -0,0 +1,118 @@
+"""
+Geohash-tiled Overpass cache against a fake Overpass API.
+"""
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import overpass_tiles
+from geo import haversine_km
+from overpass_tiles import OverpassTileCache, build_shelter_query, parse_shelter_result
+
+DELHI = (28.6139, 77.2090)
+
+
+def _node(osm_id, lat, lon, **tags):
+    return SimpleNamespace(id=osm_id, lat=lat, lon=lon, tags=tags)
+
+
+# A grid of shelters around Delhi, one every ~1.1 km, plus a café that isn't one
+NODES = [_node(n * 100 + m, DELHI[0] + (n - 10) * 0.01, DELHI[1] + (m - 10) * 0.01, amenity="shelter", name=f"S{n}-{m}")
+         for n in range(21) for m in range(21)] + [_node(1, DELHI[0], DELHI[1], amenity="cafe")]
+
+
+class FakeOverpass:
+    """Answers with the NODES inside the query's bounding box"""
+
+    def __init__(self, delay=0.0):
+        self.queries = []
+        self.delay = delay
+
+    def query(self, text):
+        self.queries.append(text)
+        time.sleep(self.delay)
+        south, west, north, east = map(float, re.search(r"\(([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)\)", text).groups())
+        nodes = [n for n in NODES if south <= n.lat <= north and west <= n.lon <= east]
+        return SimpleNamespace(nodes=nodes, ways=[], relations=[])
+
+
+@pytest.fixture
+def api():
+    return FakeOverpass()
+
+
+@pytest.fixture
+def cache(api):
+    return OverpassTileCache(precision=5, ttl=600, api_factory=lambda: api)
+
+
+def test_query_and_parsing():
+    query = build_shelter_query(28.5, 77.1, 28.7, 77.3)
+    assert '["amenity"="shelter"](28.5,77.1,28.7,77.3)' in query and "out tags center" in query
+    way = SimpleNamespace(id=7, center_lat=28.6, center_lon=77.2, tags={"building": "school", "name": "School"})
+    untagged = SimpleNamespace(id=8, center_lat=None, center_lon=None, tags={"building": "school"})
+    result = SimpleNamespace(nodes=NODES[:1] + NODES[:1] + NODES[-1:], ways=[way, untagged], relations=[])
+    assert [e["id"] for e in parse_shelter_result(result)] == ["node/0", "way/7"]
+
+
+def test_search_ranks_within_the_radius(cache):
+    found = cache.search(*DELHI, 3)
+    distances = [d for _, d in found]
+    assert distances == sorted(distances) and distances[-1] <= 3
+    inside = [n for n in NODES[:-1] if haversine_km(*DELHI, [n.lat], [n.lon])[0] <= 3]
+    assert len(found) == len(inside)
+    # The grid has ties, so compare the page by distance
+    assert [d for _, d in cache.search(*DELHI, 3, limit=5, offset=2)] == distances[2:7]
+
+
+def test_tiles_are_reused_by_repeat_and_neighbouring_searches(cache, api):
+    cache.search(*DELHI, 3)
+    cache.search(*DELHI, 3)
+    assert len(api.queries) == 1
+    _, missing = cache.split_cached(cache.tiles_for(DELHI[0] + 0.05, DELHI[1], 3))
+    cache.search(DELHI[0] + 0.05, DELHI[1], 3)
+    assert len(api.queries) == 2 and missing
+    assert cache.split_cached(cache.tiles_for(DELHI[0] + 0.05, DELHI[1], 3))[1] == []
+
+
+def test_empty_tiles_are_cached(cache, api):
+    assert cache.search(10.0, 10.0, 2) == []
+    assert cache.search(10.0, 10.0, 2) == []
+    assert len(api.queries) == 1
+
+
+def test_stale_tiles_are_fetched_again(cache, api, monkeypatch):
+    cache.search(*DELHI, 2)
+    later = time.monotonic() + 601
+    monkeypatch.setattr(overpass_tiles.time, "monotonic", lambda: later)
+    cache.search(*DELHI, 2)
+    assert len(api.queries) == 2
+
+
+def test_iter_search_yields_cached_results_first(cache, api):
+    cache.search(*DELHI, 1)
+    batches = list(cache.iter_search(*DELHI, 5))
+    cached, fetched = ({e["id"] for e, _ in batch} for batch in batches)
+    assert cached and fetched and not cached & fetched
+    assert cached | fetched == {e["id"] for e, _ in cache.search(*DELHI, 5)}
+    assert len(api.queries) == 2
+
+
+def test_tile_count_is_bounded(api):
+    cache = OverpassTileCache(precision=6, max_tiles=4, api_factory=lambda: api)
+    cache.search(*DELHI, 3)
+    assert len(cache._tiles) == 4
+
+
+def test_concurrent_searches_share_one_query():
+    api = FakeOverpass(delay=0.2)
+    cache = OverpassTileCache(api_factory=lambda: api)
+    threads = [threading.Thread(target=cache.search, args=(*DELHI, 3)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(api.queries) == 1
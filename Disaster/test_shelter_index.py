@@ -0,0 +1,96 @@
+"""
+Geographic helpers and the in-memory shelter spatial index, checked against brute force.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from geo import bounding_box, geohash_bbox, geohash_encode, geohashes_covering, haversine_km, nearest_order
+from shelter_index import ShelterIndex
+
+DELHI = (28.6139, 77.2090)
+MUMBAI = (19.0760, 72.8777)
+
+
+def test_haversine():
+    assert haversine_km(*DELHI, [MUMBAI[0]], [MUMBAI[1]])[0] == pytest.approx(1150, abs=15)
+    assert haversine_km(*DELHI, [DELHI[0]], [DELHI[1]])[0] == 0
+
+
+def test_nearest_order_pages_match_a_full_sort():
+    distances = np.random.default_rng(1).random(200)
+    ranked = list(np.argsort(distances, kind="stable"))
+    assert list(nearest_order(distances, limit=10)) == ranked[:10]
+    assert list(nearest_order(distances, limit=10, offset=190)) == ranked[190:]
+    assert list(nearest_order(distances)) == ranked
+    assert len(nearest_order(distances, limit=10, offset=300)) == 0
+
+
+def test_geohash():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    south, west, north, east = geohash_bbox(geohash_encode(*DELHI, 6))
+    assert south <= DELHI[0] <= north and west <= DELHI[1] <= east
+
+
+def test_geohash_cells_cover_the_radius():
+    cells = geohashes_covering(*DELHI, 10, precision=5)
+    assert geohash_encode(*DELHI, 5) in cells and len(cells) == len(set(cells))
+    south, west, north, east = bounding_box(*DELHI, 10)
+    for lat in np.linspace(south, north, 7):
+        for lon in np.linspace(west, east, 7):
+            assert geohash_encode(lat, lon, 5) in cells
+
+
+def _shelters(count, seed=0):
+    rng = random.Random(seed)
+    rows = [{"id": n + 1, "name": f"Shelter {n + 1}", "location": "Delhi", "capacity": 100, "available": 50,
+             "latitude": DELHI[0] + rng.uniform(-1, 1), "longitude": DELHI[1] + rng.uniform(-1, 1)}
+            for n in range(count)]
+    rows.append({"id": count + 1, "name": "Unmapped", "location": "Delhi", "capacity": 10, "available": 10,
+                 "latitude": None, "longitude": None})
+    return rows
+
+
+def _brute_force(rows, lat, lon):
+    located = [r for r in rows if r["latitude"] is not None]
+    distances = haversine_km(lat, lon, [r["latitude"] for r in located], [r["longitude"] for r in located])
+    return sorted(zip([r["id"] for r in located], distances), key=lambda pair: pair[1])
+
+
+@pytest.fixture
+def index():
+    index = ShelterIndex(cell_deg=0.1)
+    index.load(_shelters(500))
+    return index
+
+
+@pytest.mark.parametrize("radius", [2, 15, 60])
+def test_within_matches_brute_force(index, radius):
+    expected = [(i, d) for i, d in _brute_force(index.all(), *DELHI) if d <= radius]
+    found = index.within(*DELHI, radius)
+    assert [s["id"] for s, _ in found] == [i for i, _ in expected]
+    assert [d for _, d in found] == pytest.approx([d for _, d in expected])
+    assert index.within(*DELHI, radius, limit=3, offset=1) == found[1:4]
+
+
+def test_nearest_widens_until_it_has_k(index):
+    far = (DELHI[0] + 1.5, DELHI[1] + 1.5)  # outside the shelters' area
+    expected = [i for i, _ in _brute_force(index.all(), *far)[:7]]
+    assert [s["id"] for s, _ in index.nearest(*far, k=7)] == expected
+    assert index.nearest(*far, k=7, max_radius_km=5) == []
+
+
+def test_unmapped_shelters_are_listed_but_not_located(index):
+    assert len(index) == 501 and len(index.nearest(*DELHI, k=1000)) == 500
+
+
+def test_refresh_from_the_database(fake):
+    fake.load({"shelters": _shelters(25)})
+    index = ShelterIndex(page_size=10, full_reload_interval=3600)
+    assert index.refresh(fake) == 26 and index.loaded
+
+    fake.table("shelters").update({"latitude": MUMBAI[0], "longitude": MUMBAI[1], "updated_at": "2100-01-01T00:00:00+00:00"}).eq("id", 3).execute()
+    # Only rows changed since the last refresh (>=, so the newest one is read again)
+    assert index.refresh(fake) <= 2
+    assert index.nearest(*MUMBAI, k=1)[0][0]["id"] == 3
@@ -0,0 +1,97 @@
+"""
+SingleFlight request coalescing, on its own and behind WeatherCache misses.
+"""
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+from weather_cache import WeatherCache
+
+
+def _run_together(count, target):
+    """Start ``count`` threads at once on ``target()`` and collect what they return or raise"""
+    barrier = threading.Barrier(count)
+    outcomes = []
+
+    def worker():
+        barrier.wait()
+        try:
+            outcomes.append(target())
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return outcomes
+
+
+class SlowCounter:
+    def __init__(self, result="reading", error=None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+
+    def __call__(self, *args):
+        self.calls += 1
+        time.sleep(0.2)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_callers_share_one_call():
+    flight, func = SingleFlight(), SlowCounter()
+    assert _run_together(8, lambda: flight.do("delhi", func)) == ["reading"] * 8
+    assert func.calls == 1 and flight.in_flight() == 0
+
+
+def test_the_error_reaches_every_waiter():
+    flight, func = SingleFlight(), SlowCounter(error=TimeoutError("upstream timed out"))
+    outcomes = _run_together(5, lambda: flight.do("delhi", func))
+    assert func.calls == 1
+    assert all(isinstance(o, TimeoutError) for o in outcomes)
+
+
+def test_keys_are_independent_and_nothing_is_remembered():
+    flight = SingleFlight()
+    delhi, mumbai = SlowCounter("d"), SlowCounter("m")
+    assert sorted(_run_together(4, lambda: flight.do("delhi", delhi)) + _run_together(4, lambda: flight.do("mumbai", mumbai))) == ["d"] * 4 + ["m"] * 4
+    flight.do("delhi", delhi)
+    assert (delhi.calls, mumbai.calls) == (2, 1)
+
+
+def test_in_flight_counts_running_keys():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=flight.do, args=("delhi", blocked))
+    thread.start()
+    assert started.wait(5)
+    assert flight.in_flight() == 1
+    release.set()
+    thread.join(5)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.parametrize("spellings", [["Delhi, India"] * 6, ["Delhi, India", "delhi,india", " DELHI, INDIA "] * 2])
+def test_cache_misses_for_one_location_load_once(spellings):
+    loader = SlowCounter({"location": "Delhi"})
+    cache = WeatherCache(loader, ttl=60)
+    names = iter(spellings)
+    lock = threading.Lock()
+
+    def get():
+        with lock:
+            name = next(names)
+        return cache.get(name)
+
+    assert _run_together(len(spellings), get) == [{"location": "Delhi"}] * len(spellings)
+    assert loader.calls == 1
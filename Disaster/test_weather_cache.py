@@ -0,0 +1,102 @@
+"""
+WeatherCache: TTL expiry, stale-while-revalidate and LRU eviction.
+"""
+import threading
+
+import pytest
+
+import weather_cache
+from weather_cache import WeatherCache, normalize_location
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(weather_cache.time, "monotonic", clock)
+    return clock
+
+
+class Loader:
+    """Counts calls and returns a new reading each time"""
+
+    def __init__(self):
+        self.calls = []
+        self.refreshed = threading.Event()
+
+    def __call__(self, location):
+        self.calls.append(location)
+        self.refreshed.set()
+        return {"location": location, "version": len(self.calls)}
+
+
+def test_normalize_location():
+    assert normalize_location(" Delhi,india ") == normalize_location("delhi, India") == "delhi, india"
+
+
+def test_fresh_entries_are_served_from_memory(clock):
+    loader = Loader()
+    cache = WeatherCache(loader, ttl=60, stale_ttl=0)
+    assert cache.get("Delhi, India")["version"] == 1
+    clock.now += 59
+    assert cache.get("delhi,india")["version"] == 1
+    assert len(loader.calls) == 1
+
+
+def test_expired_entries_load_inline(clock):
+    loader = Loader()
+    cache = WeatherCache(loader, ttl=60, stale_ttl=0)
+    cache.get("Delhi")
+    clock.now += 61
+    assert cache.get("Delhi")["version"] == 2
+
+
+def test_stale_entries_are_served_while_one_refresh_runs(clock):
+    release = threading.Event()
+    loader = Loader()
+
+    def slow(location):
+        if loader.calls:
+            release.wait(5)
+        return loader(location)
+
+    cache = WeatherCache(slow, ttl=60, stale_ttl=600)
+    cache.get("Delhi")
+    loader.refreshed.clear()
+    clock.now += 120
+    # Stale: answered immediately with the old reading, one refresh in the background
+    assert [cache.get("Delhi")["version"] for _ in range(5)] == [1] * 5
+    release.set()
+    assert loader.refreshed.wait(5)
+    cache._executor.shutdown(wait=True)
+    assert len(loader.calls) == 2
+    assert cache.get("Delhi")["version"] == 2
+
+
+def test_failed_loads_are_not_cached(clock):
+    calls = []
+    cache = WeatherCache(lambda location: calls.append(location), ttl=60)
+    assert cache.get("Delhi") is None
+    assert cache.get("Delhi") is None
+    assert len(calls) == 2 and len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    loader = Loader()
+    cache = WeatherCache(loader, ttl=60, max_entries=2)
+    cache.get("Delhi")
+    cache.get("Mumbai")
+    cache.get("Delhi")  # Mumbai is now the oldest
+    cache.set("Jaipur", {"location": "Jaipur"})
+    assert len(cache) == 2
+    cache.get("Delhi")
+    cache.get("Mumbai")
+    assert loader.calls == ["Delhi", "Mumbai", "Mumbai"]
+
@@ -0,0 +1,73 @@
+"""
+Sharded weather monitoring: partitioning, per-shard rate budgets and deadlines.
+"""
+import queue
+import threading
+
+import pytest
+
+import weather_monitor
+from weather_monitor import partition, scan_sharded
+from weather_scanner import scan_deadline
+
+CITIES = [f"City {n}, India" for n in range(40)]
+
+
+def test_partition_is_stable_and_covers_every_location():
+    parts = partition(CITIES + ["city 3,india", "City 3, India"], 4)
+    assert sorted(sum(parts, [])) == sorted(CITIES + ["city 3,india"])
+    assert partition(list(reversed(CITIES)), 4) == [p[::-1] for p in partition(CITIES, 4)]
+    # Spellings of one location land on the same shard
+    assert any("City 3, India" in p and "city 3,india" in p for p in parts)
+
+
+def test_scan_deadline_covers_the_rate_budget():
+    assert scan_deadline(46, 20, 60) == 60
+    assert scan_deadline(750, 5, 60, request_timeout=8) == 158
+    assert scan_deadline(750, 0, 60) == 60 and scan_deadline(750, 5, None) is None
+
+
+class ThreadContext:
+    """Runs shard workers as threads, so the test can see what each one was given"""
+
+    class Queue(queue.Queue):
+        def close(self):
+            pass
+
+    class Process(threading.Thread):
+        def terminate(self):
+            pass
+
+
+@pytest.fixture
+def shard_options(monkeypatch):
+    seen = []
+
+    async def fake_iter_scan(locations, provider=None, **options):
+        seen.append(dict(options, locations=len(locations)))
+        for location in locations:
+            yield location, {"location": location}
+
+    monkeypatch.setattr(weather_monitor.multiprocessing, "get_context", lambda method: ThreadContext)
+    monkeypatch.setattr(weather_monitor, "iter_scan", fake_iter_scan)
+    return seen
+
+
+def test_every_shard_gets_the_full_rate_budget(shard_options):
+    readings = scan_sharded(CITIES, shards=4, provider_spec={"name": "replay"}, rate_per_host=20, deadline=60)
+    assert len(readings) == len(CITIES) and len(shard_options) == 4
+    assert {o["rate_per_host"] for o in shard_options} == {20}
+
+
+def test_the_shard_rate_share_is_configurable(shard_options):
+    scan_sharded(CITIES, shards=4, provider_spec={"name": "wttr"}, shard_rate_share=0.25, deadline=60)
+    assert {o["rate_per_host"] for o in shard_options} == {5}
+
+
+def test_sharded_scan_in_worker_processes():
+    cities = ["Jaipur, Rajasthan, India", "Kolkata, West Bengal, India", "Pune, India", "Goa, India", "Agra, India"]
+    results = {}
+    readings = scan_sharded(cities, shards=2, provider_spec={"name": "replay"}, deadline=30,
+                            on_result=lambda location, data: results.update({location: data}))
+    assert sorted(results) == sorted(cities)
+    assert sorted(r["location"] for r in readings) == sorted(cities)
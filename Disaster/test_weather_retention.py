@@ -0,0 +1,54 @@
+"""
+weather_data rollups and retention against the in-process fake Supabase backend.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from weather_retention import prune_weather_data, run_weather_maintenance
+
+
+@pytest.fixture
+def history(fake):
+    """Six days of readings every six hours for two cities; returns when they end"""
+    now = datetime.now(timezone.utc)
+    fake.load({"weather_data": [
+        {"location": location, "temperature": 30 + i, "humidity": 50, "wind_speed": 10, "weather_condition": "Clear",
+         "is_extreme": i == 0, "fetched_at": now - timedelta(hours=6 * i + 1)}
+        for location in ("Jaipur", "Delhi") for i in range(24)
+    ]})
+    return now
+
+
+def _raw(client):
+    return client.table("weather_data").select("id, fetched_at").execute().data
+
+
+def test_prune_waits_for_a_rollup(fake, history):
+    assert prune_weather_data(fake, retention_days=2) == 0
+    assert len(_raw(fake)) == 48
+
+
+def test_rollup_then_prune(fake, history):
+    summary = run_weather_maintenance(fake, retention_days=2, batch_size=5)
+    assert summary["rollups"]["hour"] == 48
+    assert summary["rollups"]["day"] >= 12
+
+    cutoff = (history - timedelta(days=2)).isoformat()
+    remaining = _raw(fake)
+    assert remaining and all(r["fetched_at"] >= cutoff for r in remaining)
+    assert summary["pruned"] == 48 - len(remaining)
+
+    # Every pruned reading is still counted in the daily rollups
+    daily = fake.table("weather_data_rollups").select("samples").eq("granularity", "day").execute().data
+    assert sum(r["samples"] for r in daily) == 48
+
+    # Nothing new to roll up or prune on the next run
+    assert run_weather_maintenance(fake, retention_days=2)["pruned"] == 0
+
+
+def test_retention_shorter_than_the_rollup_window(fake, history):
+    with pytest.raises(ValueError):
+        prune_weather_data(fake, retention_days=1)
+    assert run_weather_maintenance(fake, retention_days=1) is None
+    assert len(_raw(fake)) == 48
@@ -0,0 +1,88 @@
+"""
+Alert rules: batch classification, region overrides and where regions come from.
+"""
+import json
+
+import pytest
+
+import weather_rules
+from monitored_locations import load_monitored_locations
+from weather_providers import ReplayWeatherProvider
+from weather_rules import RuleEngine, classify, region_for, set_location_regions
+
+RULES = {
+    "rules": [
+        {"name": "hot", "when": [{"field": "temperature", "op": ">", "value": 40}], "level": "extreme",
+         "severity": "critical", "message": "Extreme temperature: {temperature}°C"},
+        {"name": "windy", "when": [{"field": "wind_speed", "op": ">", "value": 20}], "level": "warning",
+         "message": "High wind speed: {wind_speed} km/h"},
+        {"name": "storm", "when": [{"field": "weather_condition", "op": "contains_any", "value": ["storm"]}],
+         "level": "extreme"},
+    ],
+    "regions": {"Western": {"hot": {"when": [{"field": "temperature", "op": ">", "value": 45}]}}},
+}
+
+
+def _reading(location, temperature=30, wind_speed=5, condition="Clear"):
+    return {"location": location, "temperature": temperature, "humidity": 40, "wind_speed": wind_speed,
+            "weather_condition": condition}
+
+
+@pytest.fixture
+def engine():
+    return RuleEngine(RULES["rules"], RULES["regions"])
+
+
+@pytest.fixture(autouse=True)
+def regions(monkeypatch):
+    """Each test starts with no regions loaded"""
+    monkeypatch.setattr(weather_rules, "_location_regions", None)
+
+
+def test_levels_severities_and_messages(engine):
+    readings = classify([_reading("A", 42), _reading("B", wind_speed=30), _reading("C", condition="Thunderstorm"), _reading("D")], engine)
+    assert [(r["is_extreme"], r["severity"]) for r in readings] == [(True, "critical"), (False, None), (True, "high"), (False, None)]
+    assert [r["weather_alert"] for r in readings] == ["Extreme temperature: 42°C", "High wind speed: 30 km/h", None, None]
+
+
+def test_region_overrides(engine):
+    set_location_regions([{"name": "Jaipur, India", "region": "Northern"}, {"name": "Ahmedabad, India", "region": "Western"}])
+    readings = classify([_reading("jaipur,india", 43), _reading("Ahmedabad, India", 43), _reading("Ahmedabad, India", 46)], engine)
+    assert [r["is_extreme"] for r in readings] == [True, False, True]
+
+
+def test_regions_come_from_the_monitored_locations_table(fake):
+    fake.load({"monitored_locations": [{"name": "Surat, India", "region": "Western"}, {"name": "Agra, India"}]})
+    assert load_monitored_locations(fake) == ["Agra, India", "Surat, India"]
+    assert region_for("Surat, India") == "Western" and region_for("Agra, India") is None
+    assert region_for("Delhi, India") is None  # in the default file, but not in the loaded list
+
+
+def test_regions_fall_back_to_the_configured_file(tmp_path, monkeypatch):
+    from config import Config
+
+    path = tmp_path / "cities.json"
+    path.write_text(json.dumps([{"name": "Pune, India", "region": "Western"}]))
+    monkeypatch.setattr(Config, "MONITORED_LOCATIONS_FILE", str(path))
+    assert region_for("pune, india") == "Western"
+
+
+def test_parsing_leaves_classification_to_the_caller():
+    provider = ReplayWeatherProvider()
+    payload = provider.get_payload("Jaipur, Rajasthan, India")
+    assert provider.parse("Jaipur, Rajasthan, India", payload)["weather_alert"] is None
+    assert provider.fetch("Jaipur, Rajasthan, India")["is_extreme"]
+
+
+def test_a_scan_is_classified_in_one_pass(web, monkeypatch):
+    batches = []
+
+    def counting_classify(readings, engine=None):
+        batches.append(len(readings))
+        return classify(readings, engine)
+
+    monkeypatch.setattr(web, "classify", counting_classify)
+    monkeypatch.setattr(web, "weather_provider", ReplayWeatherProvider())
+    readings = web.scan_weather(["Jaipur, Rajasthan, India", "Kolkata, West Bengal, India", "Pune, India", "Goa, India"])
+    assert batches == [4]
+    assert sorted(r["location"] for r in readings if r["is_extreme"]) == ["Jaipur, Rajasthan, India", "Kolkata, West Bengal, India"]
@@ -0,0 +1,58 @@
+"""
+Batched weather_data and alert inserts: a bad row doesn't sink the batch, and an
+ambiguous failure is never retried into duplicate rows.
+"""
+import pytest
+
+
+def _reading(location, is_extreme=False, humidity=50):
+    return {"location": location, "temperature": 44 if is_extreme else 30, "humidity": humidity, "wind_speed": 10,
+            "weather_condition": "Sunny", "is_extreme": is_extreme, "weather_alert": "Heat wave" if is_extreme else None}
+
+
+def _locations(fake):
+    return sorted(r["location"] for r in fake.table("weather_data").select("location").execute().data)
+
+
+@pytest.fixture
+def admin(add_users):
+    return add_users("admin")[0]
+
+
+def test_saves_readings_and_alerts_in_one_insert_each(web, fake, admin):
+    calls = fake.stats["calls"]
+    summary = web.save_weather_data_batch([_reading("Jaipur", True), _reading("Pune"), _reading("Delhi", True)])
+    assert len(summary["saved"]) == 3 and len(summary["announcements"]) == 2
+    # weather_data insert, admin lookup, announcements insert
+    assert fake.stats["calls"] - calls == 3
+
+
+def test_a_rejected_row_is_reported_and_the_rest_saved_once(web, fake, admin):
+    summary = web.save_weather_data_batch([_reading("Jaipur"), _reading("Pune", humidity="lots"), _reading("Delhi")])
+    assert [f["location"] for f in summary["failed"]] == ["Pune"]
+    assert _locations(fake) == ["Delhi", "Jaipur"]
+
+
+def test_a_failure_after_the_insert_is_not_retried(web, fake, admin, monkeypatch):
+    table = fake.table
+
+    class LostResponse:
+        """Runs the insert, then loses the response like a dropped connection"""
+
+        def __init__(self, name):
+            self._query = table(name)
+
+        def insert(self, rows):
+            self._query = self._query.insert(rows)
+            return self
+
+        def execute(self):
+            self._query.execute()
+            raise ConnectionError("connection reset by peer")
+
+    monkeypatch.setattr(fake, "table", LostResponse)
+    summary = web.save_weather_data_batch([_reading("Jaipur"), _reading("Delhi")])
+    monkeypatch.setattr(fake, "table", table)
+
+    assert summary["saved"] == [] and len(summary["failed"]) == 2
+    assert _locations(fake) == ["Delhi", "Jaipur"]
@@ -0,0 +1,98 @@
+"""
+Async bulk weather scanner: per-host rate limiting, deadlines and streaming results.
+"""
+import asyncio
+import time
+
+from weather_providers import ReplayWeatherProvider, WttrProvider
+from weather_scanner import HostRateLimiter, scan_locations
+
+CITIES = [f"City {i}, India" for i in range(12)]
+
+
+def _acquire_times(limiter, hosts):
+    async def run():
+        started = time.monotonic()
+        times = []
+        for host in hosts:
+            await limiter.acquire(host)
+            times.append(time.monotonic() - started)
+        return times
+
+    return asyncio.run(run())
+
+
+def test_rate_limiter_spaces_requests_after_the_burst():
+    times = _acquire_times(HostRateLimiter(rate=20, burst=2), ["a"] * 6)
+    # Two from the burst straight away, then one every 50 ms
+    assert times[1] < 0.02
+    assert 0.18 <= times[-1] < 0.4
+
+
+def test_rate_limiter_budgets_are_per_host():
+    times = _acquire_times(HostRateLimiter(rate=5, burst=1), ["a", "b", "c"])
+    assert times[-1] < 0.05
+
+
+def test_rate_limiter_zero_is_unlimited():
+    assert _acquire_times(HostRateLimiter(rate=0), ["a"] * 100)[-1] < 0.05
+
+
+def test_scan_uses_the_providers_rate_by_default():
+    class Limited(ReplayWeatherProvider):
+        rate_per_host = 10.0
+
+    started = time.monotonic()
+    readings = scan_locations(CITIES, provider=Limited(), concurrency=12)
+    # A burst of 10, then two more at 10 per second
+    assert len(readings) == 12 and time.monotonic() - started >= 0.15
+    assert WttrProvider.rate_per_host > 5 and ReplayWeatherProvider.rate_per_host == 0
+
+
+def test_results_stream_before_the_scan_finishes():
+    arrivals = []
+    started = time.monotonic()
+    readings = scan_locations(CITIES, provider=ReplayWeatherProvider(latency=0.05, jitter=0.3, seed=1), concurrency=12,
+                              on_result=lambda location, data: arrivals.append(time.monotonic() - started))
+    total = time.monotonic() - started
+    assert len(readings) == len(arrivals) == 12
+    assert arrivals == sorted(arrivals) and arrivals[0] < total / 2
+
+
+def test_deadline_drops_slow_locations():
+    started = time.monotonic()
+    readings = scan_locations(CITIES, provider=ReplayWeatherProvider(latency=2), concurrency=12, deadline=0.2)
+    assert readings == [] and time.monotonic() - started < 1.5
+
+
+class SlowKolkata(ReplayWeatherProvider):
+    """Jaipur answers at once, Kolkata half a second later"""
+
+    async def get_payload_async(self, location, client=None):
+        if location.startswith("Kolkata"):
+            await asyncio.sleep(0.5)
+        return await super().get_payload_async(location, client)
+
+
+def test_extreme_readings_are_saved_during_the_scan(web, fake, add_users, monkeypatch):
+    add_users("admin")
+    saves = []
+    save_batch = web.save_weather_data_batch
+
+    def recording_save(batch, **kwargs):
+        saves.append((time.monotonic(), [w["location"] for w in batch]))
+        return save_batch(batch, **kwargs)
+
+    monkeypatch.setattr(web, "save_weather_data_batch", recording_save)
+    monkeypatch.setattr(web, "weather_provider", SlowKolkata())
+    monkeypatch.setattr(web.Config, "WEATHER_SCAN_CLASSIFY_INTERVAL", 0)
+    saver = web.WeatherSaver()
+    web.scan_weather(["Jaipur, Rajasthan, India", "Kolkata, West Bengal, India", "Pune, India"],
+                     on_reading=lambda w: saver.add(w) if w["is_extreme"] else None)
+    scan_finished = time.monotonic()
+    summary = saver.close()
+
+    # Jaipur's reading was stored before the slow Kolkata fetch let the scan finish
+    assert saves[0][1] == ["Jaipur, Rajasthan, India"] and saves[0][0] < scan_finished - 0.2
+    assert len(summary["saved"]) == len(summary["announcements"]) == 2
+    assert len(fake.table("announcements").select("id").execute().data) == 2
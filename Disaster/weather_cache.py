@@ -0,0 +1,104 @@
+"""
+TTL + stale-while-revalidate cache for weather lookups
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from singleflight import SingleFlight
+
+
+def normalize_location(location):
+    """Normalize a location string so 'Delhi,india ' and 'delhi, India' share a cache entry"""
+    parts = [" ".join(part.split()) for part in (location or "").lower().split(",")]
+    return ", ".join(part for part in parts if part)
+
+
+class WeatherCache:
+    """Bounded LRU cache keyed by normalized location.
+
+    Fresh entries (younger than ``ttl``) are returned directly. Stale entries
+    (younger than ``ttl + stale_ttl``) are returned immediately while a single
+    background refresh runs. Anything older, or missing, is loaded inline.
+    Failed loads (``None``) are never cached, and concurrent loads of the same
+    key are coalesced into one upstream call.
+    """
+
+    def __init__(self, loader, ttl=300, stale_ttl=1800, max_entries=256, refresh_workers=2):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="weather-cache")
+
+    def get(self, location):
+        """Return the weather reading for a location, loading it if necessary"""
+        key = normalize_location(location)
+        if not key:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._executor.submit(self._refresh, key, location)
+                    return value
+
+        return self._load(key, location)
+
+    def set(self, location, value):
+        """Store a reading obtained elsewhere (e.g. by a bulk scan)"""
+        key = normalize_location(location)
+        if key and value is not None:
+            self._store(key, value)
+
+    def invalidate(self, location=None):
+        """Drop one location, or every entry when no location is given"""
+        with self._lock:
+            if location is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(normalize_location(location), None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _load(self, key, location):
+        return self._flight.do(key, self._load_and_store, key, location)
+
+    def _load_and_store(self, key, location):
+        value = self.loader(location)
+        if value is not None:
+            self._store(key, value)
+        return value
+
+    def _refresh(self, key, location):
+        try:
+            self._load(key, location)
+        except Exception as e:
+            print(f"Error refreshing cached weather for {location}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
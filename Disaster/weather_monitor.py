@@ -0,0 +1,117 @@
+"""
+Sharded, multi-process weather monitoring.
+
+The location set is partitioned across worker processes. Each shard runs its
+own async scanner (weather_scanner.iter_scan) with its own provider instance,
+connection pool and rate budget, and streams readings back over a queue that
+the parent merges into a single ``(location, weather_data)`` stream.
+"""
+import asyncio
+import multiprocessing
+import queue as queue_module
+import time
+import zlib
+
+from weather_cache import normalize_location
+from weather_providers import default_rate_per_host, provider_from_spec
+from weather_scanner import iter_scan, scan_deadline
+
+_SHARD_DONE = "__shard_done__"
+
+
+def partition(locations, shards):
+    """Split locations into ``shards`` lists by a stable hash of the normalized name"""
+    shards = max(1, int(shards))
+    parts = [[] for _ in range(shards)]
+    for location in dict.fromkeys(locations):
+        key = normalize_location(location).encode("utf-8")
+        parts[zlib.crc32(key) % shards].append(location)
+    return parts
+
+
+def _shard_worker(shard_id, locations, provider_spec, options, results):
+    async def run():
+        provider = provider_from_spec(provider_spec)
+        async for location, weather_data in iter_scan(locations, provider=provider, **options):
+            results.put((shard_id, location, weather_data))
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        print(f"Error in weather shard {shard_id}: {e}")
+    finally:
+        results.put((shard_id, _SHARD_DONE, None))
+
+
+def iter_sharded_scan(locations, shards=4, provider_spec=None, deadline=60.0, rate_per_host=None,
+                      shard_rate_share=1.0, **options):
+    """Yield ``(location, weather_data_or_None)`` from ``shards`` worker processes as results arrive.
+
+    Each shard may use ``shard_rate_share`` of the per-host ``rate_per_host``
+    budget: with the default of 1 every shard gets the full budget, so more
+    shards scan faster (and the upstream sees up to ``shards`` times the rate).
+    The deadline is stretched per shard to what its share of the locations
+    needs at that rate. Other ``options`` are passed to each shard's ``iter_scan``.
+    """
+    parts = [p for p in partition(locations, shards) if p]
+    if not parts:
+        return
+
+    if rate_per_host is None:
+        rate_per_host = default_rate_per_host(provider_spec)
+    shard_rate = rate_per_host * shard_rate_share if rate_per_host else 0
+    shard_options = dict(options, deadline=deadline, rate_per_host=shard_rate)
+    request_timeout = options.get("request_timeout", 8.0)
+    longest = max(scan_deadline(len(p), shard_rate, deadline, request_timeout) for p in parts) if deadline else 3600
+    # spawn, not fork: the web process has threads (cache refresh, schedulers) that fork would copy mid-flight
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=_shard_worker,
+            args=(shard_id, part, provider_spec, shard_options, results),
+            name=f"weather-shard-{shard_id}",
+            daemon=True,
+        )
+        for shard_id, part in enumerate(parts)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Allow for process start-up on top of the slowest shard's deadline
+    end_at = time.monotonic() + longest + 10
+    remaining = len(workers)
+    try:
+        while remaining:
+            timeout = end_at - time.monotonic()
+            if timeout <= 0:
+                print(f"⏱ Sharded weather scan deadline reached, {remaining} shards still running")
+                break
+            try:
+                shard_id, location, weather_data = results.get(timeout=timeout)
+            except queue_module.Empty:
+                continue
+            if location == _SHARD_DONE:
+                remaining -= 1
+                continue
+            yield location, weather_data
+    finally:
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.terminate()
+        results.close()
+
+
+def scan_sharded(locations, shards=4, on_result=None, **options):
+    """Synchronous wrapper: run a sharded scan and return the successful readings"""
+    readings = []
+    for location, weather_data in iter_sharded_scan(locations, shards=shards, **options):
+        if on_result is not None:
+            try:
+                on_result(location, weather_data)
+            except Exception as e:
+                print(f"Error handling weather result for {location}: {e}")
+        if weather_data:
+            readings.append(weather_data)
+    return readings
@@ -0,0 +1,273 @@
+"""
+Pluggable weather providers.
+
+``WttrProvider`` talks to wttr.in and is the default. ``ReplayWeatherProvider``
+serves recorded ``format=j1`` payloads from disk with configurable latency,
+error rate and 429 behaviour, so scans, the alert reconciler and retry/backoff
+settings can be benchmarked offline and deterministically.
+"""
+import abc
+import asyncio
+import glob
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import wttr
+from metrics import track
+from weather_cache import normalize_location
+from weather_rules import classify
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+DEFAULT_REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "wttr")
+
+
+class ProviderHTTPError(Exception):
+    """Upstream answered with an HTTP error status"""
+
+    def __init__(self, status, message=""):
+        super().__init__(message or f"HTTP {status}")
+        self.status = status
+
+    @property
+    def retryable(self):
+        return self.status in RETRY_STATUSES
+
+
+def is_retryable(error):
+    """Whether a failed upstream call is worth retrying"""
+    if isinstance(error, ProviderHTTPError):
+        return error.retryable
+    return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError, requests.ConnectionError, requests.Timeout))
+
+
+class WeatherProvider(abc.ABC):
+    """Base class: subclasses return raw payloads, the base class parses and retries"""
+
+    name = "base"
+    host = None
+    # Default bulk-scan request budget per second for ``host`` (0 = unlimited)
+    rate_per_host = 0.0
+
+    def __init__(self, retries=3, backoff=0.5):
+        self.retries = retries
+        self.backoff = backoff
+
+    @abc.abstractmethod
+    def get_payload(self, location):
+        """Raw ``format=j1`` payload for one location"""
+
+    @abc.abstractmethod
+    async def get_payload_async(self, location, client=None):
+        """``get_payload`` for the async bulk scanner"""
+
+    def async_client(self, concurrency, request_timeout):
+        """Shared client handed to ``get_payload_async`` during a scan (``None`` if unused)"""
+        return None
+
+    def parse(self, location, payload):
+        """Unclassified reading for a payload (the bulk scanner classifies a whole scan at once)"""
+        return wttr.parse_payload(location, payload)
+
+    def fetch(self, location):
+        """Fetch, parse and classify one reading, retrying retryable failures with exponential backoff"""
+        for attempt in range(self.retries + 1):
+            try:
+                reading = self.parse(location, self.get_payload(location))
+                return classify([reading])[0] if reading else reading
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    raise
+                time.sleep(self.backoff * (2 ** attempt))
+        return None
+
+
+class WttrProvider(WeatherProvider):
+    """wttr.in, queried directly by location name"""
+
+    name = "wttr"
+    host = wttr.WTTR_HOST
+    # About what the old 10-thread pool sent at wttr.in's usual latency
+    rate_per_host = 20.0
+
+    def __init__(self, retries=3, backoff=0.5, timeout=(3, 8)):
+        super().__init__(retries, backoff)
+        self.timeout = timeout
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(wttr.WTTR_HEADERS)
+                self._session = session
+            return self._session
+
+    def get_payload(self, location):
+        with track("http", "wttr") as call:
+            response = self.session.get(wttr.build_url(location), timeout=self.timeout)
+            call["bytes"] = len(response.content)
+        if response.status_code >= 400:
+            raise ProviderHTTPError(response.status_code)
+        return response.json()
+
+    def async_client(self, concurrency, request_timeout):
+        import httpx
+
+        return httpx.AsyncClient(
+            headers=wttr.WTTR_HEADERS,
+            timeout=httpx.Timeout(request_timeout, connect=3.0),
+            limits=httpx.Limits(max_connections=max(1, concurrency), max_keepalive_connections=max(1, concurrency)),
+        )
+
+    async def get_payload_async(self, location, client=None):
+        import httpx
+
+        try:
+            with track("http", "wttr") as call:
+                response = await client.get(wttr.build_url(location))
+                call["bytes"] = len(response.content)
+        except httpx.TransportError as e:
+            raise ConnectionError(repr(e)) from e
+        if response.status_code >= 400:
+            raise ProviderHTTPError(response.status_code)
+        return response.json()
+
+
+class ReplayWeatherProvider(WeatherProvider):
+    """Serve recorded wttr.in j1 payloads with simulated latency and failures.
+
+    Payloads are loaded from ``<fixtures_dir>/*.json``; the file name (e.g.
+    ``jaipur_rajasthan_india.json``) is matched against the normalized location
+    and ``default.json`` answers everything else. ``error_rate`` and
+    ``throttle_rate`` are probabilities of a 503 or 429 per call;
+    ``max_requests_per_second`` makes the provider answer 429 once exceeded,
+    like a real upstream limit. A fixed ``seed`` makes runs repeatable.
+    """
+
+    name = "replay"
+    host = "replay.local"
+
+    def __init__(self, fixtures_dir=None, payloads=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, max_requests_per_second=None, seed=0, retries=3, backoff=0.5):
+        super().__init__(retries, backoff)
+        self.payloads = dict(payloads or {})
+        if not payloads:
+            self.payloads.update(self._load_fixtures(fixtures_dir or DEFAULT_REPLAY_DIR))
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_requests_per_second = max_requests_per_second
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0, "throttled": 0}
+
+    @staticmethod
+    def _load_fixtures(fixtures_dir):
+        payloads = {}
+        for path in glob.glob(os.path.join(fixtures_dir, "*.json")):
+            key = os.path.splitext(os.path.basename(path))[0]
+            with open(path, encoding="utf-8") as f:
+                payloads[key] = json.load(f)
+        return payloads
+
+    def _lookup(self, location):
+        key = normalize_location(location).replace(", ", "_").replace(" ", "_")
+        payload = self.payloads.get(key) or self.payloads.get("default")
+        if payload is None:
+            raise ProviderHTTPError(404, f"no recorded payload for {location}")
+        return payload
+
+    def _decide(self):
+        """Pick this call's delay and failure status (``None`` for success)"""
+        with self._lock:
+            self.stats["calls"] += 1
+            now = time.monotonic()
+            status = None
+            if self.max_requests_per_second:
+                while self._recent and now - self._recent[0] >= 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.max_requests_per_second:
+                    status = 429
+                else:
+                    self._recent.append(now)
+            roll = self._random.random()
+            if status is None and roll < self.throttle_rate:
+                status = 429
+            elif status is None and roll < self.throttle_rate + self.error_rate:
+                status = 503
+            if status == 429:
+                self.stats["throttled"] += 1
+            elif status is not None:
+                self.stats["errors"] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        return delay, status
+
+    def get_payload(self, location):
+        delay, status = self._decide()
+        if delay:
+            time.sleep(delay)
+        if status is not None:
+            raise ProviderHTTPError(status)
+        return self._lookup(location)
+
+    async def get_payload_async(self, location, client=None):
+        delay, status = self._decide()
+        if delay:
+            await asyncio.sleep(delay)
+        if status is not None:
+            raise ProviderHTTPError(status)
+        return self._lookup(location)
+
+
+PROVIDERS = {
+    "wttr": WttrProvider,
+    "replay": ReplayWeatherProvider,
+}
+
+
+def provider_spec_from_config(config):
+    """Picklable ``{"name": ..., **options}`` description of the WEATHER_PROVIDER provider"""
+    name = (config.WEATHER_PROVIDER or "wttr").lower()
+    spec = {"name": name, "retries": config.WEATHER_FETCH_RETRIES, "backoff": config.WEATHER_FETCH_BACKOFF}
+    if name == "replay":
+        spec.update(
+            fixtures_dir=config.WEATHER_REPLAY_DIR or None,
+            latency=config.WEATHER_REPLAY_LATENCY,
+            error_rate=config.WEATHER_REPLAY_ERROR_RATE,
+            throttle_rate=config.WEATHER_REPLAY_THROTTLE_RATE,
+        )
+    return spec
+
+
+def default_rate_per_host(spec):
+    """The scan rate budget of the provider a spec describes, without building it"""
+    return PROVIDERS.get((spec or {}).get("name", "wttr"), WttrProvider).rate_per_host
+
+
+def provider_from_spec(spec):
+    """Build a provider from a spec (used to recreate providers inside worker processes)"""
+    options = dict(spec or {})
+    name = options.pop("name", "wttr")
+    if name not in PROVIDERS:
+        print(f"Unknown WEATHER_PROVIDER '{name}', using wttr")
+        name = "wttr"
+    return PROVIDERS[name](**options)
+
+
+def provider_from_config(config):
+    """Build the provider selected by WEATHER_PROVIDER"""
+    return provider_from_spec(provider_spec_from_config(config))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Retention and rollups for the weather_data time series.
+
+Calls the ``rollup_weather_data`` and ``prune_weather_data`` database functions
+from supabase_schema.sql. Rollups continue from a watermark stored in
+``weather_rollup_state`` (backfilling everything on the first run), and pruning
+only deletes raw rows that are behind it, so nothing is deleted unsummarized.
+Runs periodically inside the web process, or once with ``python weather_retention.py``.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+ROLLUP_GRANULARITIES = ("hour", "day")
+# Raw rows must outlive the longest rollup bucket (a day) plus a missed maintenance run
+MIN_RETENTION_DAYS = 2
+
+
+def _rpc_int(client, name, params):
+    resp = client.rpc(name, params).execute()
+    data = resp.data if resp else None
+    if isinstance(data, list):
+        data = data[0] if data else 0
+    return int(data or 0)
+
+
+def rollup_weather_data(client):
+    """Refresh the hourly and daily aggregates from each granularity's watermark up to now"""
+    counts = {}
+    for granularity in ROLLUP_GRANULARITIES:
+        counts[granularity] = _rpc_int(client, "rollup_weather_data", {"p_granularity": granularity})
+    return counts
+
+
+def prune_weather_data(client, retention_days, batch_size=5000, max_batches=100, now=None):
+    """Delete rolled-up raw readings older than ``retention_days`` in batches; returns rows deleted"""
+    if retention_days < MIN_RETENTION_DAYS:
+        raise ValueError(f"WEATHER_RETENTION_DAYS must be at least {MIN_RETENTION_DAYS} (got {retention_days})")
+    now = now or datetime.now(timezone.utc)
+    before = (now - timedelta(days=retention_days)).isoformat()
+    total = 0
+    for _ in range(max_batches):
+        deleted = _rpc_int(client, "prune_weather_data", {"p_before": before, "p_batch_size": batch_size})
+        total += deleted
+        if deleted < batch_size:
+            break
+    return total
+
+
+def run_weather_maintenance(client, retention_days, batch_size=5000):
+    """Roll up recent readings, then prune expired raw rows"""
+    if client is None:
+        return None
+    if retention_days < MIN_RETENTION_DAYS:
+        print(f"❌ WEATHER_RETENTION_DAYS must be at least {MIN_RETENTION_DAYS} (got {retention_days}); weather_data maintenance skipped")
+        return None
+    start_time = time.time()
+    try:
+        rollups = rollup_weather_data(client)
+        pruned = prune_weather_data(client, retention_days, batch_size)
+    except Exception as e:
+        print(f"Error maintaining weather_data: {e}")
+        return None
+    print(f"🧹 weather_data maintenance: {rollups} rollup buckets, {pruned} raw rows pruned in {time.time() - start_time:.2f} seconds")
+    return {"rollups": rollups, "pruned": pruned}
+
+
+if __name__ == "__main__":
+    from config import Config
+    from app import supabase
+
+    if supabase is None:
+        print("❌ Supabase is not configured")
+    else:
+        run_weather_maintenance(supabase, Config.WEATHER_RETENTION_DAYS, Config.WEATHER_PRUNE_BATCH_SIZE)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Declarative, vectorized alert rules for weather readings.
+
+Rules live in weather_rules.json (or WEATHER_RULES_FILE). Each rule has a list of
+``when`` conditions (matched if any holds, or all with ``"match": "all"``), and
+may set an alert ``level`` ("warning" or "extreme"), an announcement
+``severity`` and a ``message`` template. Rules are applied in order: the level
+and severity are the highest matched, the message comes from the last matching
+rule that has one. ``regions`` maps a region name to per-rule overrides, e.g.
+``{"Western": {"extreme_temperature": {"when": [...]}, "high_wind": {"enabled": false}}}``.
+
+A whole batch of readings is evaluated at once as NumPy arrays, so re-evaluating
+a scan or backtesting a rule change over all of weather_data is cheap:
+
+    python weather_rules.py candidate_rules.json
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from weather_cache import normalize_location
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_rules.json")
+
+LEVELS = ["none", "warning", "extreme"]
+SEVERITIES = [None, "low", "medium", "high", "critical"]
+NUMERIC_FIELDS = ("temperature", "humidity", "wind_speed")
+TEXT_FIELDS = ("weather_condition",)
+
+_COMPARISONS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+class _Fields(dict):
+    def __missing__(self, key):
+        return "Unknown"
+
+
+class Rule:
+    def __init__(self, name, when, match="any", level=None, severity=None, message=None, enabled=True):
+        self.name = name
+        self.when = list(when)
+        self.match = match
+        self.level = LEVELS.index(level) if level else 0
+        self.severity = SEVERITIES.index(severity) if severity else 0
+        self.message = message
+        self.enabled = enabled
+        for cond in self.when:
+            field, op = cond["field"], cond["op"]
+            if field not in NUMERIC_FIELDS + TEXT_FIELDS:
+                raise ValueError(f"rule {name}: unknown field {field}")
+            if op not in _COMPARISONS and op not in ("in", "contains_any"):
+                raise ValueError(f"rule {name}: unknown op {op}")
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def mask(self, columns, size):
+        """Boolean array of readings matching this rule"""
+        result = np.zeros(size, dtype=bool) if self.match == "any" else np.ones(size, dtype=bool)
+        for cond in self.when:
+            values = columns[cond["field"]]
+            op, target = cond["op"], cond["value"]
+            if op == "in":
+                hit = np.isin(values, list(target))
+            elif op == "contains_any":
+                lowered = columns["_lower_" + cond["field"]]
+                hit = np.zeros(size, dtype=bool)
+                for keyword in target:
+                    hit |= np.char.find(lowered, str(keyword).lower()) >= 0
+            else:
+                with np.errstate(invalid="ignore"):
+                    hit = _COMPARISONS[op](values, target)
+            result = (result | hit) if self.match == "any" else (result & hit)
+        return result
+
+
+class RuleEngine:
+    def __init__(self, rules, regions=None):
+        self.rule_dicts = [dict(r) for r in rules]
+        self.region_overrides = dict(regions or {})
+        self.default_rules = [Rule.from_dict(r) for r in self.rule_dicts]
+        self._region_rules = {}
+
+    @classmethod
+    def from_file(cls, path=None):
+        with open(path or DEFAULT_RULES_FILE, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config.get("rules", []), config.get("regions"))
+
+    def rules_for(self, region):
+        if not region or region not in self.region_overrides:
+            return self.default_rules
+        if region not in self._region_rules:
+            overrides = self.region_overrides[region]
+            self._region_rules[region] = [
+                Rule.from_dict({**r, **overrides.get(r["name"], {})}) for r in self.rule_dicts
+            ]
+        return self._region_rules[region]
+
+    @staticmethod
+    def _columns(readings):
+        columns = {}
+        for field in NUMERIC_FIELDS:
+            columns[field] = np.array(
+                [float(r[field]) if r.get(field) not in (None, "") else np.nan for r in readings],
+                dtype=float,
+            )
+        for field in TEXT_FIELDS:
+            text = np.array([r.get(field) if isinstance(r.get(field), str) else "" for r in readings], dtype=str)
+            columns[field] = text
+            columns["_lower_" + field] = np.char.lower(text)
+        return columns
+
+    def evaluate_arrays(self, readings, regions=None):
+        """Return ``(level_codes, severity_codes, message_rules)`` arrays for a batch"""
+        size = len(readings)
+        levels = np.zeros(size, dtype=np.int8)
+        severities = np.zeros(size, dtype=np.int8)
+        message_rules = np.full(size, None, dtype=object)
+        if not size:
+            return levels, severities, message_rules
+
+        columns = self._columns(readings)
+        if regions is None:
+            groups = {None: np.arange(size)}
+        else:
+            regions = np.array([r or "" for r in regions], dtype=object)
+            groups = {region: np.flatnonzero(regions == region) for region in set(regions)}
+
+        for region, index in groups.items():
+            sub = columns if len(index) == size else {k: v[index] for k, v in columns.items()}
+            sub_levels = levels[index]
+            sub_severities = severities[index]
+            sub_messages = message_rules[index]
+            for rule in self.rules_for(region):
+                if not rule.enabled:
+                    continue
+                hit = rule.mask(sub, len(index))
+                if rule.level:
+                    sub_levels[hit] = np.maximum(sub_levels[hit], rule.level)
+                if rule.severity:
+                    sub_severities[hit] = np.maximum(sub_severities[hit], rule.severity)
+                if rule.message:
+                    sub_messages[hit] = rule
+            levels[index] = sub_levels
+            severities[index] = sub_severities
+            message_rules[index] = sub_messages
+
+        # Extreme readings without an explicit severity get the default "high"
+        severities[(levels == LEVELS.index("extreme")) & (severities == 0)] = SEVERITIES.index("high")
+        return levels, severities, message_rules
+
+    def evaluate(self, readings, regions=None):
+        """Per-reading ``{'alert_level', 'is_extreme', 'weather_alert', 'severity'}`` dicts"""
+        levels, severities, message_rules = self.evaluate_arrays(readings, regions)
+        results = []
+        for reading, level, severity, rule in zip(readings, levels, severities, message_rules):
+            results.append({
+                "alert_level": LEVELS[level],
+                "is_extreme": bool(level == LEVELS.index("extreme")),
+                "weather_alert": rule.message.format_map(_Fields(reading)) if rule is not None else None,
+                "severity": SEVERITIES[severity],
+            })
+        return results
+
+
+_engine = None
+_location_regions = None
+
+
+def get_engine():
+    """Process-wide engine loaded from WEATHER_RULES_FILE (or weather_rules.json)"""
+    global _engine
+    if _engine is None:
+        from config import Config
+        _engine = RuleEngine.from_file(Config.WEATHER_RULES_FILE or None)
+    return _engine
+
+
+def set_location_regions(records):
+    """Take regions from these monitored location records (``{"name", "region"}`` dicts)"""
+    global _location_regions
+    _location_regions = {normalize_location(r["name"]): r.get("region") for r in records if r.get("name")}
+
+
+def region_for(location):
+    """Region of a monitored location, or None.
+
+    Regions come from the monitored locations last loaded (the table's ``region``
+    column or the locations file); before any load, from MONITORED_LOCATIONS_FILE.
+    """
+    if _location_regions is None:
+        from config import Config
+        from monitored_locations import load_location_records_file
+        try:
+            set_location_regions(load_location_records_file(Config.MONITORED_LOCATIONS_FILE or None))
+        except Exception as e:
+            print(f"Could not load location regions: {e}")
+            set_location_regions([])
+    return _location_regions.get(normalize_location(location))
+
+
+def classify(readings, engine=None):
+    """Evaluate readings in place, setting is_extreme, weather_alert and severity"""
+    engine = engine or get_engine()
+    regions = [region_for(r.get("location")) for r in readings]
+    for reading, result in zip(readings, engine.evaluate(readings, regions)):
+        reading["is_extreme"] = result["is_extreme"]
+        reading["weather_alert"] = result["weather_alert"]
+        reading["severity"] = result["severity"]
+    return readings
+
+
+def _load_weather_history(client, page_size=1000):
+    rows = []
+    start = 0
+    while True:
+        resp = client.table("weather_data").select("location, temperature, humidity, wind_speed, weather_condition, is_extreme").order("id").range(start, start + page_size - 1).execute()
+        page = resp.data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+def backtest(readings, current, candidate):
+    """Compare two engines over the same readings"""
+    regions = [region_for(r.get("location")) for r in readings]
+    before, _, _ = current.evaluate_arrays(readings, regions)
+    after, _, _ = candidate.evaluate_arrays(readings, regions)
+    extreme = LEVELS.index("extreme")
+    return {
+        "readings": len(readings),
+        "extreme_before": int((before == extreme).sum()),
+        "extreme_after": int((after == extreme).sum()),
+        "newly_extreme": int(((after == extreme) & (before != extreme)).sum()),
+        "no_longer_extreme": int(((before == extreme) & (after != extreme)).sum()),
+        "level_changed": int((before != after).sum()),
+    }
+
+
+if __name__ == "__main__":
+    import time
+    from app import supabase
+
+    if len(sys.argv) < 2:
+        print("Usage: python weather_rules.py candidate_rules.json")
+        sys.exit(1)
+    if supabase is None:
+        print("❌ Supabase is not configured")
+        sys.exit(1)
+
+    history = _load_weather_history(supabase)
+    start_time = time.time()
+    summary = backtest(history, get_engine(), RuleEngine.from_file(sys.argv[1]))
+    print(f"📊 Backtest over {summary['readings']} readings in {time.time() - start_time:.2f} seconds")
+    for key, value in summary.items():
+        print(f"   {key}: {value}")
@@ -0,0 +1,138 @@
+"""
+asyncio-based bulk weather scanner.
+
+Fetches many locations concurrently through a weather provider (wttr.in over one
+shared connection pool by default) with a concurrency limit, a per-host
+request-rate budget, per-request deadlines and an overall scan deadline. Results are streamed as they arrive and have the same
+shape as ``fetch_weather_data``.
+"""
+import asyncio
+import time
+
+from weather_providers import WttrProvider, is_retryable
+
+
+class HostRateLimiter:
+    """Token bucket per host: at most ``rate`` requests per second, bursting to ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._buckets = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, host):
+        if self.rate <= 0:
+            return
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(host, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                if tokens >= 1:
+                    self._buckets[host] = (tokens - 1, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+def scan_deadline(count, rate_per_host, deadline, request_timeout=8.0):
+    """``deadline`` stretched to what ``count`` requests need at ``rate_per_host``.
+
+    A rate-limited scan can't finish in less than ``count / rate_per_host``
+    seconds, so a fixed deadline would drop the tail of every large scan.
+    """
+    if not deadline or not rate_per_host or rate_per_host <= 0:
+        return deadline
+    return max(deadline, count / rate_per_host + request_timeout)
+
+
+async def _fetch_one(provider, client, limiter, semaphore, location, request_timeout, retries, backoff):
+    async with semaphore:
+        for attempt in range(retries + 1):
+            await limiter.acquire(provider.host)
+            try:
+                payload = await asyncio.wait_for(provider.get_payload_async(location, client), timeout=request_timeout)
+                return provider.parse(location, payload)
+            except Exception as e:
+                if attempt >= retries or not is_retryable(e):
+                    print(f"Error fetching weather for {location}: {e!r}")
+                    return None
+                await asyncio.sleep(backoff * (2 ** attempt))
+    return None
+
+
+async def iter_scan(locations, provider=None, concurrency=10, rate_per_host=None, request_timeout=8.0,
+                    deadline=60.0, retries=2, backoff=0.5, client=None):
+    """Async generator yielding ``(location, weather_data_or_None)`` in completion order.
+
+    ``provider`` defaults to wttr.in and ``rate_per_host`` to the provider's own
+    budget. Stops once ``deadline`` seconds have elapsed (or as long as the rate
+    budget needs for this many locations, if longer); locations still in flight
+    are cancelled and not yielded.
+    """
+    locations = list(dict.fromkeys(locations))
+    if not locations:
+        return
+
+    provider = provider or WttrProvider()
+    if rate_per_host is None:
+        rate_per_host = provider.rate_per_host
+    deadline = scan_deadline(len(locations), rate_per_host, deadline, request_timeout)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = HostRateLimiter(rate_per_host)
+    own_client = client is None
+    if own_client:
+        client = provider.async_client(concurrency, request_timeout)
+
+    loop = asyncio.get_running_loop()
+    end_at = loop.time() + deadline if deadline else None
+    tasks = {}
+    try:
+        for location in locations:
+            task = asyncio.ensure_future(
+                _fetch_one(provider, client, limiter, semaphore, location, request_timeout, retries, backoff)
+            )
+            tasks[task] = location
+
+        pending = set(tasks)
+        while pending:
+            timeout = None if end_at is None else end_at - loop.time()
+            if timeout is not None and timeout <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield tasks[task], task.result()
+
+        if pending:
+            print(f"⏱ Weather scan deadline reached, {len(pending)} locations not fetched")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if own_client and client is not None:
+            await client.aclose()
+
+
+def scan_locations(locations, on_result=None, **options):
+    """Run a scan from synchronous code and return the successful readings.
+
+    ``on_result(location, weather_data)`` is called as each location completes,
+    so callers can act on extreme readings before the whole scan finishes.
+    ``options`` are passed through to ``iter_scan``.
+    """
+    async def _collect():
+        results = []
+        async for location, weather_data in iter_scan(locations, **options):
+            if on_result is not None:
+                try:
+                    on_result(location, weather_data)
+                except Exception as e:
+                    print(f"Error handling weather result for {location}: {e}")
+            if weather_data:
+                results.append(weather_data)
+        return results
+
+    return asyncio.run(_collect())
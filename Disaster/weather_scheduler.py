@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Periodic weather-alert reconciliation, off the request path.
+
+Runs inside the web process as a daemon thread (started on the first request),
+or standalone with ``python weather_scheduler.py`` when the in-process worker
+is disabled via WEATHER_ALERT_SCHEDULER_ENABLED=false. ``--scan`` runs
+incremental weather scans on the same loop instead.
+"""
+import sys
+import threading
+import time
+
+
+class PeriodicTask:
+    """Run a callable every ``interval`` seconds on a daemon thread"""
+
+    def __init__(self, func, interval, name="periodic-task"):
+        self.func = func
+        self.interval = interval
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker thread once; later calls are no-ops"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        """Run the task a single time, logging instead of raising"""
+        start_time = time.time()
+        try:
+            self.func()
+        except Exception as e:
+            print(f"Error in {self.name}: {e}")
+        return time.time() - start_time
+
+    def _run(self):
+        while not self._stop.is_set():
+            duration = self.run_once()
+            # Keep a fixed cadence; a slow run doesn't push the next one further out
+            self._stop.wait(max(0.0, self.interval - duration))
+
+
+def main(argv=None):
+    """Run the weather-alert reconciler (or, with --scan, incremental weather scans) in the foreground"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    scan = "--scan" in argv
+    if scan:
+        argv.remove("--scan")
+    from config import Config
+    from app import check_and_update_weather_alerts, run_incremental_weather_scan
+
+    if scan:
+        interval = int(argv[0]) if argv else (Config.WEATHER_SCAN_INTERVAL or 600)
+        task = PeriodicTask(run_incremental_weather_scan, interval, name="weather-incremental-scan")
+        label = "Incremental weather scan"
+    else:
+        interval = int(argv[0]) if argv else Config.WEATHER_ALERT_CHECK_INTERVAL
+        task = PeriodicTask(check_and_update_weather_alerts, interval, name="weather-alert-reconciler")
+        label = "Weather alert check"
+
+    print(f"🕒 {label} every {interval} seconds (Ctrl+C to stop)")
+    try:
+        while True:
+            duration = task.run_once()
+            print(f"✅ {label} completed in {duration:.2f} seconds")
+            time.sleep(max(0.0, interval - duration))
+    except KeyboardInterrupt:
+        print(f"Stopped {task.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+wttr.in (format=j1) helpers shared by the synchronous fetcher and the async scanner
+"""
+from urllib.parse import quote
+
+WTTR_HOST = "wttr.in"
+WTTR_HEADERS = {
+    "User-Agent": "DisasterManagement/1.0 (+wttr fetch)",
+    "Accept": "application/json"
+}
+
+
+def build_url(location):
+    """wttr.in JSON URL for a location name (avoids geocoding failures/rate limits)"""
+    return f"https://{WTTR_HOST}/{quote(location)}?format=j1"
+
+
+def parse_payload(location, weather_data):
+    """Turn a wttr.in j1 payload into the reading dict used across the app.
+
+    The reading is not classified yet: callers run weather_rules.classify over
+    the whole batch (a scan's readings) in one pass.
+    """
+    if not weather_data:
+        return None
+
+    # Extract weather information from wttr.in response
+    current_condition = (weather_data.get('current_condition') or [{}])[0]
+    temp_c = current_condition.get('temp_C')
+    humidity = current_condition.get('humidity')
+    wind_speed = current_condition.get('windspeedKmph')
+    weather_desc = (current_condition.get('weatherDesc') or [{}])[0].get('value', 'Unknown')
+
+    # Optional coordinates from nearest_area, if present
+    nearest = (weather_data.get('nearest_area') or [{}])
+    nearest0 = nearest[0] if nearest else {}
+    lat_str = (nearest0.get('latitude') or [None])
+    lon_str = (nearest0.get('longitude') or [None])
+    try:
+        lat = float(lat_str if isinstance(lat_str, str) else (lat_str[0] if lat_str else None)) if lat_str else None
+        lon = float(lon_str if isinstance(lon_str, str) else (lon_str[0] if lon_str else None)) if lon_str else None
+    except Exception:
+        lat = None
+        lon = None
+
+    # Convert to numeric values
+    temp = float(temp_c) if temp_c not in (None, "") else None
+    humidity = int(humidity) if humidity not in (None, "") else None
+    wind_speed = float(wind_speed) if wind_speed not in (None, "") else None
+
+    reading = {
+        'location': location,
+        'temperature': temp,
+        'humidity': humidity,
+        'wind_speed': wind_speed,
+        'weather_condition': weather_desc,
+        'weather_description': weather_desc,
+        'is_extreme': False,
+        'weather_alert': None,
+        'coordinates': {'lat': lat, 'lon': lon}
+    }
+    return reading